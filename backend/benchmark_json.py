@@ -0,0 +1,96 @@
+"""
+Benchmark: JSON serialization of a 5,000-student /students payload and of response_model lists.
+
+Compares FastAPI's usual path (jsonable_encoder + stdlib json) with FastJSONResponse (orjson when installed) and
+the trusted path used by get_students (serialize the plain dicts once). For response_model routes it compares
+Pydantic re-validation of List[UserRecord] with trusted_list. No database is needed.
+
+Run from the backend folder:
+  python benchmark_json.py [--students 5000] [--users 500] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import time
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from server import (  # noqa: E402
+    _ORJSON_AVAILABLE,
+    FastJSONResponse,
+    StudentRecord,
+    UserRecord,
+    enrich_student,
+    trusted_list,
+)
+
+SCORE_FIELDS = [
+    "attendance", "participation", "behavior", "homework", "quiz1", "quiz2", "quiz3", "quiz4",
+    "chapter_test1_practical", "chapter_test2_practical", "quarter1_practical", "quarter1_theory",
+]
+
+
+def make_students(count: int):
+    rng = random.Random(42)
+    students = []
+    for i in range(count):
+        student = StudentRecord(full_name=f"طالب رقم {i}", class_id=f"class-{i % 100}", class_name=f"{4 + i % 5}A").model_dump()
+        for field in SCORE_FIELDS:
+            student[field] = round(rng.uniform(0, 5), 1) if rng.random() > 0.05 else None
+        student["assessment_combined_total"] = round(rng.uniform(20, 50), 2)
+        student["assessment_performance_level"] = rng.choice(["on_level", "approach", "below"])
+        students.append(enrich_student(student))
+    return students
+
+
+def make_users(count: int):
+    return [
+        UserRecord(
+            name=f"معلم {i}", email=f"teacher{i}@school.test", username=f"teacher{i}", role_id="teacher",
+            role_name="Teacher", subjects=["Science"], assigned_class_ids=[f"class-{i % 100}"],
+        ).model_dump()
+        for i in range(count)
+    ]
+
+
+def timed(label: str, func, repeat: int):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+    print(f"{label:<44} {elapsed_ms:9.2f} ms  {len(body) / 1024:8.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"orjson installed: {_ORJSON_AVAILABLE}")
+    students = make_students(args.students)
+    print(f"\n/students with {args.students} enriched students, {args.repeat} runs each")
+    timed("jsonable_encoder + stdlib json", lambda: JSONResponse(jsonable_encoder(students)).body, args.repeat)
+    timed("jsonable_encoder + FastJSONResponse", lambda: FastJSONResponse(jsonable_encoder(students)).body, args.repeat)
+    timed("FastJSONResponse only (trusted)", lambda: FastJSONResponse(students).body, args.repeat)
+
+    users = make_users(args.users)
+    adapter = TypeAdapter(List[UserRecord])
+    print(f"\n/users with {args.users} users")
+    timed(
+        "response_model validation + stdlib json",
+        lambda: JSONResponse(jsonable_encoder(adapter.dump_python(adapter.validate_python(users), mode="json"))).body,
+        args.repeat,
+    )
+    timed("trusted_list", lambda: trusted_list(users, UserRecord).body, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
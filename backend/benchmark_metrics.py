@@ -0,0 +1,66 @@
+"""
+Benchmark: per-request overhead of RequestProfilingMiddleware (Server-Timing + Prometheus metrics).
+
+Drives a trivial FastAPI endpoint in-process through httpx.ASGITransport with and without the middleware, and
+times the raw histogram/counter calls. No database is needed.
+
+Run from the backend folder (needs httpx):
+  python benchmark_metrics.py [--requests 5000]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from server import CACHE_REQUESTS, HTTP_REQUEST_DURATION, RequestProfilingMiddleware  # noqa: E402
+
+
+def build_app(with_middleware: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: str):
+        return {"id": item_id, "name": "benchmark"}
+
+    if with_middleware:
+        app.add_middleware(RequestProfilingMiddleware)
+    return app
+
+
+async def time_requests(app: FastAPI, count: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for i in range(100):
+            await http.get(f"/items/{i}")
+        started = time.perf_counter()
+        for i in range(count):
+            await http.get(f"/items/{i}")
+        return (time.perf_counter() - started) * 1_000_000 / count
+
+
+def time_observe(count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        HTTP_REQUEST_DURATION.observe(("GET", "/api/bench", "200"), 0.012)
+        CACHE_REQUESTS.inc(("bench", "hit"))
+    return (time.perf_counter() - started) * 1_000_000_000 / count
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    baseline = await time_requests(build_app(False), args.requests)
+    instrumented = await time_requests(build_app(True), args.requests)
+    print(f"without middleware   {baseline:8.1f} us/request")
+    print(f"with middleware      {instrumented:8.1f} us/request  (+{instrumented - baseline:.1f} us)")
+    print(f"observe + inc        {time_observe(100_000):8.0f} ns/call pair")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
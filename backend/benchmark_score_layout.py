@@ -0,0 +1,87 @@
+"""
+Benchmark: student_scores (one document per student x week) against student_score_buckets (one document per
+student x semester x quarter) on the synthetic school of benchmark_suite.py.
+
+Generates the school (documents layout), converts it with convert_scores_to_buckets, then prints document count,
+data/storage/index size of both collections and the latency of the score reads and writes in each layout.
+
+Run from the backend folder against a local mongod (BENCH_MONGO_URL / BENCH_DB_NAME as in benchmark_suite.py):
+  python benchmark_score_layout.py [--classes 20] [--students 30] [--repeat 10] [--skip-generate]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import benchmark_suite
+import server
+
+
+async def collection_stats(name: str):
+    stats = await server.client[server.tenant_db_name(server.DEFAULT_SCHOOL_ID)].command("collStats", name)
+    return {
+        "documents": stats.get("count", 0),
+        "size_kib": stats.get("size", 0) / 1024,
+        "storage_kib": stats.get("storageSize", 0) / 1024,
+        "index_kib": stats.get("totalIndexSize", 0) / 1024,
+    }
+
+
+async def timed(func, repeat: int) -> float:
+    await func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+async def measure(repeat: int):
+    students = await server.db.students.find({}, {"_id": 0, "id": 1, "class_id": 1}).to_list(None)
+    student_ids = [s["id"] for s in students]
+    first_class = students[0]["class_id"]
+    class_ids = [s["id"] for s in students if s["class_id"] == first_class]
+    week = await server.db.weeks.find_one({"semester": 1, "quarter": 1, "number": 4}, {"_id": 0})
+    entries = [(student_id, week["id"], {"attendance": 2.5, "homework": 4, "updated_at": server.iso_now()}) for student_id in class_ids]
+    scenarios = [
+        ("quarter score map (all students)", lambda: server.build_quarter_score_map(student_ids, 1, 1)),
+        ("full year score map (all students)", lambda: server.build_full_year_score_map(student_ids)),
+        ("one week, one class (get_students)", lambda: server.find_scores([week["id"]], class_ids)),
+        ("bulk write, one class (bulk scores)", lambda: server.write_scores(entries)),
+    ]
+    results = {}
+    for layout in ("documents", "buckets"):
+        server.SCORE_STORAGE = layout
+        for label, func in scenarios:
+            results[(layout, label)] = await timed(func, repeat)
+    print(f"\n{'p50 latency':<40} {'documents':>12} {'buckets':>12}")
+    for label, _ in scenarios:
+        print(f"{label:<40} {results[('documents', label)]:9.1f} ms {results[('buckets', label)]:9.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--students", type=int, default=30, help="students per class")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--skip-generate", action="store_true", help="reuse the school from a previous run")
+    args = parser.parse_args()
+
+    await server.client.admin.command("ping")
+    if not args.skip_generate:
+        await benchmark_suite.generate(args.classes, args.students, seed=7)
+    started = time.perf_counter()
+    buckets = await server.convert_scores_to_buckets()
+    print(f"Converted to {buckets} buckets in {time.perf_counter() - started:.1f}s")
+
+    documents_stats = await collection_stats("student_scores")
+    buckets_stats = await collection_stats(server.SCORE_BUCKET_COLLECTION)
+    print(f"\n{'':<22} {'documents':>12} {'data KiB':>10} {'storage KiB':>12} {'index KiB':>10}")
+    for name, stats in (("student_scores", documents_stats), (server.SCORE_BUCKET_COLLECTION, buckets_stats)):
+        print(f"{name:<22} {stats['documents']:>12} {stats['size_kib']:>10.0f} {stats['storage_kib']:>12.0f} {stats['index_kib']:>10.0f}")
+    await measure(args.repeat)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,236 @@
+"""
+Offline benchmark suite: synthetic school in a local mongod, API driven in-process through httpx.ASGITransport.
+
+  python benchmark_suite.py generate --classes 20 --students 30          # (re)create the synthetic school
+  python benchmark_suite.py run --repeat 10                              # run scenarios, write JSON results
+  python benchmark_suite.py run --compare benchmark_results/<old>.json   # print p50 change against an older run
+
+Uses BENCH_MONGO_URL (default mongodb://localhost:27017) and BENCH_DB_NAME (default school_db_bench); the
+database is dropped by `generate`, so never point it at real data. Results go to benchmark_results/<commit>.json.
+The same scenarios run as pytest-benchmark tests in tests/test_api_benchmarks.py.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017")
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "school_db_bench")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+import httpx  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import server  # noqa: E402
+
+RESULTS_DIR = Path(__file__).parent / "benchmark_results"
+FIRST_NAMES = ["Ahmed", "Mohammed", "Omar", "Ali", "Yousef", "Khalid", "Fatima", "Sara", "Noura", "Maryam", "Huda", "Layla"]
+LAST_NAMES = ["Al-Harbi", "Al-Qahtani", "Al-Otaibi", "Al-Zahrani", "Al-Ghamdi", "Al-Shehri", "Al-Dosari", "Al-Mutairi"]
+# (field, max) per weekly score; quizzes/chapter tests/finals only on their (quarter, week number).
+WEEKLY_FIELDS = [("attendance", 2.5), ("participation", 2.5), ("behavior", 5), ("homework", 5)]
+ASSESSMENT_FIELDS = {
+    (1, 4): [("quiz1", 5), ("quiz2", 5), ("chapter_test1_practical", 10)],
+    (1, 9): [("quarter1_practical", 10), ("quarter1_theory", 10)],
+    (2, 16): [("quiz3", 5), ("quiz4", 5), ("chapter_test2_practical", 10)],
+    (2, 17): [("quarter2_practical", 10)],
+    (2, 18): [("quarter2_theory", 10)],
+}
+
+
+def _score(rng: random.Random, maximum: float, ability: float):
+    if rng.random() < 0.05:
+        return None  # missed
+    return round(min(maximum, max(0, rng.gauss(ability * maximum, maximum * 0.15))), 1)
+
+
+async def generate(class_count: int, students_per_class: int, seed: int):
+    """Full school year: every (semester, quarter) has its 9 weeks, so 36 weeks of scores per student."""
+    await server.client.drop_database(os.environ["DB_NAME"])
+    server.cache_invalidate_local("weeks")
+    await server.run_schema_migrations()
+    rng = random.Random(seed)
+    await server.db.classes.delete_many({})
+    classes = []
+    for i in range(class_count):
+        grade = 4 + i % 5
+        section = chr(65 + i // 5 % 26)
+        suffix = "" if i < 130 else str(i)
+        name = f"{grade}{section}{suffix}"
+        classes.append(server.ClassRecord(name=name, grade=grade, section=section, name_key=server.class_name_key(name)).model_dump())
+    await server.db.classes.insert_many([dict(c) for c in classes])
+    weeks = await server.db.weeks.find({}, {"_id": 0}).to_list(None)
+    students = []
+    for class_item in classes:
+        for _ in range(students_per_class):
+            students.append(server.StudentRecord(
+                full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {len(students)}",
+                class_id=class_item["id"],
+                class_name=class_item["name"],
+            ).model_dump())
+    await server.db.students.insert_many([dict(s) for s in students])
+    abilities = {s["id"]: rng.uniform(0.45, 0.98) for s in students}
+    batch = []
+    score_count = 0
+    for week in weeks:
+        fields = WEEKLY_FIELDS + ASSESSMENT_FIELDS.get((week["quarter"], week["number"]), [])
+        for student in students:
+            doc = {"student_id": student["id"], "week_id": week["id"]}
+            for field, maximum in fields:
+                doc[field] = _score(rng, maximum, abilities[student["id"]])
+            batch.append(server.StudentScoreRecord(**doc).model_dump())
+            if len(batch) >= 5000:
+                await server.db.student_scores.insert_many(batch)
+                score_count += len(batch)
+                batch = []
+    if batch:
+        await server.db.student_scores.insert_many(batch)
+        score_count += len(batch)
+    print(f"Generated {len(classes)} classes, {len(students)} students, {len(weeks)} weeks, {score_count} score docs")
+
+
+def _import_workbook(students, class_name: str) -> bytes:
+    rows = [
+        {"Student Name": s["full_name"], "Class": class_name, "Attendance": 2.5, "Participation": 2, "Behavior": 5, "Homework": 4}
+        for s in students
+    ]
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+async def build_scenarios():
+    admin = await server.db.users.find_one({"role_name": "Admin"}, {"_id": 0})
+    token = server.create_access_token({"sub": admin["id"], "role": admin["role_name"], "school_id": server.DEFAULT_SCHOOL_ID})
+    first_class = await server.db.classes.find_one({}, {"_id": 0}, sort=[("name", 1)])
+    week = await server.db.weeks.find_one({"semester": 1, "quarter": 1, "number": 4}, {"_id": 0})
+    class_students = await server.db.students.find({"class_id": first_class["id"]}, {"_id": 0}).to_list(None)
+    bulk_payload = {
+        "week_id": week["id"],
+        "updates": [{"id": s["id"], "attendance": 2.5, "homework": 4} for s in class_students],
+    }
+    workbook = _import_workbook(class_students, first_class["name"])
+    grade = first_class["grade"]
+    scenarios = [
+        ("students_by_week", "GET", f"/api/students?week_id={week['id']}", {}),
+        ("students_by_class_week", "GET", f"/api/students?class_id={first_class['id']}&week_id={week['id']}", {}),
+        ("analytics_overview", "GET", "/api/analytics/overview?semester=1&quarter=1", {}),
+        ("classes_summary", "GET", "/api/classes/summary?semester=1&quarter=1", {}),
+        ("grade_report", "GET", f"/api/reports/grade?grade={grade}&semester=1&quarter=1", {}),
+        ("missed_assessments", "GET", "/api/analytics/missed-assessments?semester=1&quarter=1", {}),
+        ("bulk_scores", "POST", "/api/students/bulk-scores", {"json": bulk_payload}),
+        ("import_excel", "POST", f"/api/import/excel?week_id={week['id']}", {
+            "files": {"file": ("bench.xlsx", workbook, server.EXCEL_MEDIA_TYPE)},
+        }),
+        ("export_students_excel", "GET", f"/api/students/export?week_id={week['id']}", {}),
+        ("export_grade_report_pdf", "GET", f"/api/reports/grade/export?grade={grade}&format=pdf", {}),
+        ("export_grade_report_excel", "GET", f"/api/reports/grade/export?grade={grade}&format=excel", {}),
+        ("export_analytics_summary_pdf", "GET", "/api/analytics/summary/export?format=pdf", {}),
+        ("export_classes_summary_excel", "GET", "/api/classes/summary/export?format=excel", {}),
+    ]
+    return token, scenarios
+
+
+async def run(repeat: int, only=None):
+    token, scenarios = await build_scenarios()
+    transport = httpx.ASGITransport(app=server.app)
+    headers = {"Authorization": f"Bearer {token}"}
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=600) as http:
+        for name, method, url, kwargs in scenarios:
+            if only and name not in only:
+                continue
+            timings = []
+            sizes = []
+            status_code = None
+            for _ in range(repeat + 1):
+                started = time.perf_counter()
+                response = await http.request(method, url, **kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+                sizes.append(len(response.content))
+                status_code = response.status_code
+            timings = sorted(timings[1:])  # first request warms caches and connections
+            results[name] = {
+                "method": method,
+                "url": url,
+                "status": status_code,
+                "runs": repeat,
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 2),
+                "mean_ms": round(statistics.fmean(timings), 2),
+                "bytes": sizes[-1],
+            }
+            print(f"{name:<32} {status_code}  p50 {results[name]['p50_ms']:9.1f} ms  p95 {results[name]['p95_ms']:9.1f} ms")
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def dataset_info():
+    return {
+        "classes": await server.db.classes.count_documents({}),
+        "students": await server.db.students.count_documents({}),
+        "weeks": await server.db.weeks.count_documents({}),
+        "scores": await server.db.student_scores.estimated_document_count(),
+    }
+
+
+def compare(results, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())["scenarios"]
+    print(f"\nChange in p50 against {baseline_path}:")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        delta = current["p50_ms"] - old["p50_ms"]
+        pct = (delta / old["p50_ms"] * 100) if old["p50_ms"] else 0
+        print(f"  {name:<32} {old['p50_ms']:9.1f} -> {current['p50_ms']:9.1f} ms  ({pct:+.1f}%)")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate")
+    gen.add_argument("--classes", type=int, default=20)
+    gen.add_argument("--students", type=int, default=30, help="students per class")
+    gen.add_argument("--seed", type=int, default=7)
+    bench = sub.add_parser("run")
+    bench.add_argument("--repeat", type=int, default=10)
+    bench.add_argument("--only", nargs="*")
+    bench.add_argument("--output")
+    bench.add_argument("--compare")
+    args = parser.parse_args()
+
+    await server.client.admin.command("ping")
+    if args.command == "generate":
+        await generate(args.classes, args.students, args.seed)
+        return
+    results = await run(args.repeat, args.only)
+    commit = git_commit()
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "created_at": server.iso_now(),
+        "python": sys.version.split()[0],
+        "dataset": await dataset_info(),
+        "scenarios": results,
+    }, indent=2))
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
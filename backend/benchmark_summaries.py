@@ -0,0 +1,75 @@
+"""
+Benchmark: class/grade summary aggregation at 100 classes x 3,000 students.
+
+Compares the old per-class list comprehension (O(classes x students)) with the single grouped pass used by
+get_grade_report / export_analytics_summary, and times summarize_levels / build_summary on the same data.
+No database is needed; students are synthetic and already enriched.
+
+Run from the backend folder:
+  python benchmark_summaries.py [--classes 100] [--students 3000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from server import _class_breakdown, build_summary, summarize_levels  # noqa: E402
+
+LEVELS = ["on_level", "approach", "below", "no_data"]
+
+
+def make_data(class_count: int, student_count: int):
+    rng = random.Random(42)
+    classes = [{"id": f"class-{i}", "name": f"{4 + i % 5}{chr(65 + i // 5 % 26)}{i}"} for i in range(class_count)]
+    students = []
+    for i in range(student_count):
+        class_item = classes[rng.randrange(class_count)]
+        level = rng.choice(LEVELS)
+        total = None if level == "no_data" else round(rng.uniform(20, 100), 2)
+        students.append({
+            "id": f"student-{i}",
+            "class_id": class_item["id"],
+            "class_name": class_item["name"],
+            "performance_level": level,
+            "semester_total": total,
+            "total_score_normalized": total,
+        })
+    return classes, students
+
+
+def quadratic_breakdown(classes, students):
+    return [
+        {"class_name": c["name"], "student_count": len([s for s in students if s["class_id"] == c["id"]])}
+        for c in classes
+    ]
+
+
+def timed(label: str, func, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+    print(f"{label:<28} {elapsed_ms:9.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=100)
+    parser.add_argument("--students", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    classes, students = make_data(args.classes, args.students)
+    print(f"{args.classes} classes x {args.students} students, {args.repeat} runs each")
+    old = timed("class breakdown (per class)", lambda: quadratic_breakdown(classes, students), args.repeat)
+    new = timed("class breakdown (grouped)", lambda: _class_breakdown(classes, students), args.repeat)
+    assert old == new, "grouped breakdown differs from per-class breakdown"
+    timed("summarize_levels", lambda: summarize_levels(students), args.repeat)
+    timed("build_summary", lambda: build_summary(students, classes), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Load test: per-request latency of one school while other schools are added to the deployment.
+
+Logs in as the default school's admin, measures the read endpoints, registers --tenants extra schools through
+POST /api/schools (each gets its own database with seeded classes/weeks), measures again and removes them.
+Latency should stay flat because every school is a separate database.
+
+Use a staging deployment, not production:
+  python load_test_tenants.py --base-url http://localhost:8000 --username admin --password Admin@123 --tenants 20
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+import requests
+
+ENDPOINTS = [
+    "/api/students",
+    "/api/classes/summary",
+    "/api/analytics/overview",
+    "/api/analytics/missed-assessments",
+    "/api/reports/grade?grade=4&semester=1&quarter=1",
+]
+
+
+def measure(session: requests.Session, base_url: str, requests_per_endpoint: int):
+    results = {}
+    for endpoint in ENDPOINTS:
+        timings = []
+        for _ in range(requests_per_endpoint):
+            started = time.perf_counter()
+            response = session.get(f"{base_url}{endpoint}", timeout=120)
+            timings.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+        timings.sort()
+        results[endpoint] = {
+            "p50": statistics.median(timings),
+            "p95": timings[max(0, int(len(timings) * 0.95) - 1)],
+        }
+    return results
+
+
+def print_results(label: str, results):
+    print(f"\n{label}")
+    for endpoint, stats in results.items():
+        print(f"  {endpoint:<55} p50 {stats['p50']:8.1f} ms   p95 {stats['p95']:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="Admin@123")
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint per phase")
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip("/")
+
+    session = requests.Session()
+    login = session.post(f"{base_url}/api/auth/login", json={"username": args.username, "password": args.password}, timeout=60)
+    login.raise_for_status()
+    session.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+    before = measure(session, base_url, args.requests)
+    print_results("Before adding schools", before)
+
+    created = []
+    try:
+        for i in range(args.tenants):
+            school_id = f"lt{i}-{uuid.uuid4().hex[:6]}"
+            response = session.post(f"{base_url}/api/schools", json={"id": school_id, "name": f"Load test {i}"}, timeout=120)
+            response.raise_for_status()
+            created.append(school_id)
+        after = measure(session, base_url, args.requests)
+        print_results(f"After adding {len(created)} schools", after)
+        print("\nChange in p50:")
+        for endpoint in ENDPOINTS:
+            delta = after[endpoint]["p50"] - before[endpoint]["p50"]
+            print(f"  {endpoint:<55} {delta:+8.1f} ms")
+    finally:
+        for school_id in created:
+            session.delete(f"{base_url}/api/schools/{school_id}", timeout=120)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Convert live scores between the two SCORE_STORAGE layouts for every school (or one with --school).
+
+  python migrate_score_layout.py to-buckets                 # student_scores -> student_score_buckets
+  python migrate_score_layout.py to-documents               # student_score_buckets -> student_scores
+  python migrate_score_layout.py to-buckets --drop-source   # also empty the old collection afterwards
+
+Stop the API first, run the conversion, then set SCORE_STORAGE in backend/.env to the new layout and start it
+again. Conversions are server-side $merge pipelines and can be re-run; without --drop-source the old collection is
+kept so switching back needs no conversion as long as no scores were written in between.
+"""
+import argparse
+import asyncio
+import time
+
+import server
+
+
+async def convert(direction: str, school_id: str, drop_source: bool):
+    with server.school_context(school_id):
+        started = time.perf_counter()
+        if direction == "to-buckets":
+            source = server.db.student_scores
+            count = await server.convert_scores_to_buckets()
+            print(f"[{school_id}] {await source.estimated_document_count()} score documents -> {count} buckets", end="")
+        else:
+            source = server.db[server.SCORE_BUCKET_COLLECTION]
+            count = await server.convert_buckets_to_scores()
+            print(f"[{school_id}] {await source.estimated_document_count()} buckets -> {count} score documents", end="")
+        print(f" in {time.perf_counter() - started:.1f}s")
+        if drop_source:
+            await source.delete_many({})
+            print(f"[{school_id}] emptied {source.name}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("direction", choices=["to-buckets", "to-documents"])
+    parser.add_argument("--school", help="only this school id (default: every school)")
+    parser.add_argument("--drop-source", action="store_true")
+    args = parser.parse_args()
+
+    await server.client.admin.command("ping")
+    school_ids = [args.school] if args.school else await server.list_school_ids()
+    for school_id in school_ids:
+        await convert(args.direction, school_id, args.drop_source)
+    layout = "buckets" if args.direction == "to-buckets" else "documents"
+    print(f"\nDone. Set SCORE_STORAGE={layout} in backend/.env before starting the API.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,6 @@
-from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Query, Depends, status
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Query, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse, JSONResponse
 from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -18,10 +18,22 @@ logger = logging.getLogger(__name__)
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Dict, Any
 import uuid
+import contextvars
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+import asyncio
+import time
+import smtplib
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from email.message import EmailMessage
 from datetime import datetime, timezone, timedelta
 import pandas as pd
 import re
 import io
+import csv
+import tempfile
 import base64
 from xml.sax.saxutils import escape
 from zoneinfo import ZoneInfo
@@ -31,8 +43,9 @@ import matplotlib
 
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+from openpyxl import Workbook
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, Image as RLImage, PageBreak
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.utils import ImageReader
@@ -49,11 +62,14 @@ from sendgrid.helpers.mail import (
     Email as SGEmail,
 )
 import requests
-from pymongo import UpdateOne
+from pymongo import UpdateOne, UpdateMany, CursorType, IndexModel, ReadPreference
+from pymongo.errors import BulkWriteError, DuplicateKeyError, CollectionInvalid
+from pymongo import monitoring
 from twilio.rest import Client as TwilioClient
 import jwt
 from passlib.context import CryptContext
 import re
+import json
 
 try:
     from google.oauth2 import id_token as google_id_token
@@ -62,6 +78,18 @@ try:
 except ImportError:
     _GOOGLE_AUTH_AVAILABLE = False
 
+try:
+    from pyinstrument import Profiler
+    _PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    _PYINSTRUMENT_AVAILABLE = False
+
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -71,7 +99,7 @@ if not mongo_url:
     raise ValueError("MONGO_URL environment variable is not set. Please check your .env file.")
 
 # URL encode special characters in password if needed
-from urllib.parse import quote_plus
+from urllib.parse import parse_qs, quote_plus
 if '@' in mongo_url and '://' in mongo_url:
     # Extract and encode password if it contains special characters
     try:
@@ -88,13 +116,505 @@ if '@' in mongo_url and '://' in mongo_url:
     except Exception:
         pass  # If encoding fails, use original URL
 
+# Prometheus metrics, kept in-process (text exposition format rendered by GET /metrics). Each worker exposes its own
+# series; scrape every worker or aggregate by instance. observe()/inc() are a dict lookup plus a lock.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricCounter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class MetricHistogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        # labels -> [count per bucket..., count above last bucket, sum]
+        self._series: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+HTTP_REQUEST_DURATION = MetricHistogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status")
+)
+HTTP_REQUEST_SIZE = MetricHistogram("http_request_size_bytes", "Request body size (imports).", ("route",), SIZE_BUCKETS)
+HTTP_RESPONSE_SIZE = MetricHistogram("http_response_size_bytes", "Response body size (exports).", ("route",), SIZE_BUCKETS)
+MONGO_COMMAND_DURATION = MetricHistogram(
+    "mongodb_command_duration_seconds", "Mongo command latency.", ("collection", "command", "outcome")
+)
+EVENT_LOOP_LAG = MetricHistogram("event_loop_lag_seconds", "Delay of a periodic asyncio sleep beyond its interval.")
+SCHEDULED_JOB_DURATION = MetricHistogram(
+    "scheduled_job_duration_seconds", "Scheduled job duration.", ("job", "status"), LATENCY_BUCKETS + (60, 300, 900)
+)
+CACHE_REQUESTS = MetricCounter("cache_requests_total", "In-process cache lookups.", ("namespace", "result"))
+ALL_METRICS = [
+    HTTP_REQUEST_DURATION, HTTP_REQUEST_SIZE, HTTP_RESPONSE_SIZE, MONGO_COMMAND_DURATION,
+    EVENT_LOOP_LAG, SCHEDULED_JOB_DURATION, CACHE_REQUESTS,
+]
+
+
+# Per-request Mongo accounting for RequestProfilingMiddleware. Motor runs pymongo on executor threads with a copy of
+# the caller's context, so the listener sees the stats dict of the request that issued the command.
+_request_stats: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("request_stats", default=None)
+
+
+# Slow command sampling: commands slower than MONGO_SLOW_COMMAND_MS are grouped by shape (values replaced by "?")
+# in _slow_commands, and one sample per shape is explained in the background at most every
+# MONGO_EXPLAIN_INTERVAL_SECONDS. Per worker and in memory only; see GET /api/diagnostics/slow-queries.
+MONGO_SLOW_COMMAND_MS = float(os.environ.get("MONGO_SLOW_COMMAND_MS") or 200)
+MONGO_EXPLAIN_INTERVAL_SECONDS = 600
+MONGO_SLOW_SHAPES_MAX = 200
+# Flag plans that examine this many documents per returned document (and at least 1000 in total).
+MONGO_EXAMINED_RATIO_LIMIT = 100
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Session and transaction fields are dropped too: the background explain runs outside the sampled transaction.
+COMMAND_META_FIELDS = {
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "startTransaction", "autocommit", "readConcern",
+    "writeConcern", "$query",
+}
+_slow_commands: Dict[tuple, Dict[str, Any]] = {}
+_slow_commands_lock = threading.Lock()
+_explain_queue: Optional["asyncio.Queue"] = None
+_explain_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def command_shape(value: Any) -> Any:
+    """Query shape: keys and operators kept, values replaced by "?" and arrays collapsed to one element."""
+    if isinstance(value, dict):
+        return {k: command_shape(v) for k, v in value.items() if k not in COMMAND_META_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [command_shape(value[0])] if value else []
+    return "?"
+
+
+def _record_slow_command(database: str, collection: str, command_name: str, command: Dict[str, Any], duration_ms: float):
+    shape = command_shape(command)
+    key = (database, collection, command_name, json.dumps(shape, sort_keys=True, default=str))
+    now = time.monotonic()
+    with _slow_commands_lock:
+        entry = _slow_commands.get(key)
+        if entry is None:
+            if len(_slow_commands) >= MONGO_SLOW_SHAPES_MAX:
+                cheapest = min(_slow_commands, key=lambda k: _slow_commands[k]["total_ms"])
+                del _slow_commands[cheapest]
+            entry = _slow_commands[key] = {
+                "database": database,
+                "collection": collection,
+                "command": command_name,
+                "shape": shape,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "explain": None,
+                "explained_at": None,
+            }
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        entry["last_seen"] = iso_now()
+        due = entry["explained_at"] is None or now - entry["explained_at"] >= MONGO_EXPLAIN_INTERVAL_SECONDS
+        if due:
+            entry["explained_at"] = now
+    if due and command_name in EXPLAINABLE_COMMANDS and _explain_loop is not None and _explain_queue is not None:
+        sample = {k: v for k, v in command.items() if k not in COMMAND_META_FIELDS}
+        # explain accepts a single write statement; bulk updates/deletes are explained by their first one.
+        for statements in ("updates", "deletes"):
+            if statements in sample:
+                sample[statements] = sample[statements][:1]
+        _explain_loop.call_soon_threadsafe(_enqueue_explain, key, database, sample)
+
+
+def _enqueue_explain(key: tuple, database: str, command: Dict[str, Any]) -> None:
+    try:
+        _explain_queue.put_nowait((key, database, command))
+    except asyncio.QueueFull:
+        pass
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    def __init__(self):
+        # (connection_id, request_id) -> (database, collection, command), filled on started and popped on completion.
+        self._pending: Dict[tuple, tuple] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else ""
+        self._pending[(event.connection_id, event.request_id)] = (event.database_name, collection, event.command)
+
+    def _record(self, event, outcome: str):
+        database, collection, command = self._pending.pop((event.connection_id, event.request_id), ("", "", None))
+        MONGO_COMMAND_DURATION.observe((collection, event.command_name, outcome), event.duration_micros / 1_000_000)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats["mongo_ms"] += event.duration_micros / 1000
+            stats["mongo_commands"] += 1
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= MONGO_SLOW_COMMAND_MS and command is not None and event.command_name != "explain":
+            _record_slow_command(database, collection, event.command_name, command, duration_ms)
+
+    def succeeded(self, event):
+        self._record(event, "success")
+
+    def failed(self, event):
+        self._record(event, "failure")
+
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """Counters for GET /api/diagnostics/mongo-pool (pymongo has no public pool statistics API)."""
+
+    def __init__(self):
+        self.stats = {
+            "created": 0, "closed": 0, "checked_out": 0, "in_use": 0,
+            "checkout_failed": 0, "pool_cleared": 0, "checkout_wait_ms_total": 0.0,
+        }
+        self._checkout_started: Dict[int, float] = {}
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.stats["pool_cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.stats["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.stats["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        self._checkout_started[threading.get_ident()] = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._checkout_started.pop(threading.get_ident(), None)
+        self.stats["checkout_failed"] += 1
+
+    def connection_checked_out(self, event):
+        started = self._checkout_started.pop(threading.get_ident(), None)
+        if started is not None:
+            self.stats["checkout_wait_ms_total"] += (time.perf_counter() - started) * 1000
+        self.stats["checked_out"] += 1
+        self.stats["in_use"] += 1
+
+    def connection_checked_in(self, event):
+        self.stats["in_use"] -= 1
+
+
+def _available_compressors(requested: str) -> List[str]:
+    """Keep only compressors whose Python package is installed (zlib is always available)."""
+    available = []
+    for name in [c.strip().lower() for c in requested.split(",") if c.strip()]:
+        module = {"zstd": "zstandard", "snappy": "snappy"}.get(name)
+        if module:
+            try:
+                __import__(module)
+            except ImportError:
+                continue
+        available.append(name)
+    return available
+
+
+# Connection pool and wire compression (see env.example). Values in the MONGO_URL query string take precedence:
+# pymongo lets keyword options override the URI, so options the URI sets are left out here.
+MONGO_URL_OPTIONS = {key.lower(): values[-1] for key, values in parse_qs(mongo_url.partition("?")[2]).items()}
+MONGO_CLIENT_OPTIONS: Dict[str, Any] = {
+    key: value
+    for key, value in {
+        "serverSelectionTimeoutMS": 5000,
+        "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE") or 100),
+        "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE") or 0),
+        "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS") or 0) or None,
+        "compressors": _available_compressors(os.environ.get("MONGO_COMPRESSORS") or "zstd,snappy,zlib") or None,
+    }.items()
+    if value is not None and key.lower() not in MONGO_URL_OPTIONS
+}
+mongo_pool_monitor = MongoPoolMonitor()
+
 try:
-    client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
+    client = AsyncIOMotorClient(
+        mongo_url,
+        event_listeners=[MongoCommandTimer(), mongo_pool_monitor],
+        **MONGO_CLIENT_OPTIONS,
+    )
 except Exception as e:
     logger.error(f"Failed to create MongoDB client: {e}")
     raise
 
-db = client[os.environ.get('DB_NAME', 'school_db')]
+DB_NAME = os.environ.get('DB_NAME', 'school_db')
+
+# Multi-school tenancy: every school gets its own database, so collections, indexes and migrations are scoped per
+# school and one school's data size never affects another's queries. The default school keeps DB_NAME (existing
+# single-school deployments are unchanged); other schools live in "<DB_NAME>__<school_id>" and are registered in
+# root_db.schools. The school is taken from the JWT in get_current_user and held in a context variable for the
+# rest of the request; `db` resolves to that school's database on every access.
+DEFAULT_SCHOOL_ID = (os.environ.get("DEFAULT_SCHOOL_ID") or "default").strip()
+SCHOOL_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,19}$")
+_current_school: contextvars.ContextVar[str] = contextvars.ContextVar("current_school", default=DEFAULT_SCHOOL_ID)
+_tenant_databases: Dict[tuple, Any] = {}
+
+# Cluster-wide collections (schools registry, scheduler lease, job runs, cache bus) always live here.
+root_db = client[DB_NAME]
+
+
+def tenant_db_name(school_id: str) -> str:
+    return DB_NAME if school_id == DEFAULT_SCHOOL_ID else f"{DB_NAME}__{school_id}"
+
+
+def current_school_id() -> str:
+    return _current_school.get()
+
+
+@contextmanager
+def school_context(school_id: str):
+    """Run a block (scheduled job, migration) against one school's database."""
+    token = _current_school.set(school_id)
+    try:
+        yield
+    finally:
+        _current_school.reset(token)
+
+
+class TenantDatabase:
+    """Stand-in for AsyncIOMotorDatabase that forwards to the current school's database."""
+
+    def __init__(self, read_preference=None):
+        self._read_preference = read_preference
+
+    def _database(self):
+        school_id = _current_school.get()
+        cache_key = (school_id, self._read_preference is not None)
+        database = _tenant_databases.get(cache_key)
+        if database is None:
+            database = _tenant_databases[cache_key] = client.get_database(
+                tenant_db_name(school_id), read_preference=self._read_preference
+            )
+        return database
+
+    def __getattr__(self, name: str):
+        return getattr(self._database(), name)
+
+    def __getitem__(self, name: str):
+        return self._database()[name]
+
+
+db = TenantDatabase()
+
+
+def _analytics_read_preference():
+    """Optional secondary reads for analytics and reports, e.g. MONGO_ANALYTICS_READ_PREFERENCE=secondaryPreferred."""
+    mode = (os.environ.get("MONGO_ANALYTICS_READ_PREFERENCE") or "").strip()
+    if not mode or mode == "primary":
+        return None
+    staleness = int(os.environ.get("MONGO_MAX_STALENESS_SECONDS") or -1)
+    modes = {
+        "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+        "secondary": ReadPreference.SECONDARY,
+        "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+        "nearest": ReadPreference.NEAREST,
+    }
+    if mode not in modes:
+        raise ValueError(f"Unsupported MONGO_ANALYTICS_READ_PREFERENCE: {mode}")
+    # maxStalenessSeconds must be at least 90 (server requirement); -1 means no limit.
+    return type(modes[mode])(max_staleness=staleness if staleness < 0 else max(90, staleness))
+
+
+ANALYTICS_READ_PREFERENCE = _analytics_read_preference()
+# Analytics/report reads tolerate replication lag; everything else keeps read-your-writes on the primary.
+analytics_db = TenantDatabase(ANALYTICS_READ_PREFERENCE) if ANALYTICS_READ_PREFERENCE else db
+
+
+async def list_school_ids() -> List[str]:
+    registered = await root_db.schools.distinct("_id")
+    return [DEFAULT_SCHOOL_ID] + sorted(s for s in registered if s != DEFAULT_SCHOOL_ID)
+
+# Identifies this process among uvicorn workers / instances (scheduler lease owner, cache bus origin).
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# In-process caches: namespace -> key -> (expires_at monotonic, value). Every worker keeps its own copy, so
+# writes must go through publish_cache_invalidation() which clears locally and broadcasts on the
+# cache_invalidations capped collection; each worker tails it (change stream on replica sets) and clears too.
+# The TTL is only a safety net for writes made outside the API (scripts, Atlas UI). Namespaces are kept per school.
+CACHE_DEFAULT_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS") or 300)
+CACHE_BUS_COLLECTION = "cache_invalidations"
+CACHE_BUS_SIZE_BYTES = 1024 * 1024
+_local_caches: Dict[tuple, Dict[str, tuple]] = {}
+_cache_bus_task: Optional["asyncio.Task"] = None
+
+
+def cache_get(namespace: str, key: str) -> Any:
+    """Return the cached value or None on miss/expiry."""
+    bucket = (current_school_id(), namespace)
+    entry = _local_caches.get(bucket, {}).get(key)
+    if entry is None:
+        CACHE_REQUESTS.inc((namespace, "miss"))
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        _local_caches[bucket].pop(key, None)
+        CACHE_REQUESTS.inc((namespace, "miss"))
+        return None
+    CACHE_REQUESTS.inc((namespace, "hit"))
+    return value
+
+
+def cache_set(namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+    ttl = CACHE_DEFAULT_TTL_SECONDS if ttl is None else ttl
+    _local_caches.setdefault((current_school_id(), namespace), {})[key] = (time.monotonic() + ttl, value)
+
+
+def cache_invalidate_local(namespace: str, key: Optional[str] = None, school_id: Optional[str] = None) -> None:
+    """Drop one key, or the whole namespace when key is None."""
+    bucket = (school_id or current_school_id(), namespace)
+    if key is None:
+        _local_caches.pop(bucket, None)
+    else:
+        _local_caches.get(bucket, {}).pop(key, None)
+
+
+async def publish_cache_invalidation(namespace: str, key: Optional[str] = None) -> None:
+    """Invalidate locally and tell every other worker to do the same."""
+    cache_invalidate_local(namespace, key)
+    try:
+        await root_db[CACHE_BUS_COLLECTION].insert_one({
+            "school_id": current_school_id(),
+            "namespace": namespace,
+            "key": key,
+            "origin": WORKER_ID,
+            "created_at": datetime.now(timezone.utc),
+        })
+    except Exception as exc:
+        logger.warning("Cache invalidation publish failed (%s/%s): %s", namespace, key, exc)
+
+
+def _apply_cache_invalidation(message: Dict[str, Any]) -> None:
+    if not message or message.get("origin") == WORKER_ID or not message.get("namespace"):
+        return
+    cache_invalidate_local(message["namespace"], message.get("key"), message.get("school_id") or DEFAULT_SCHOOL_ID)
+
+
+async def _ensure_cache_bus_collection() -> None:
+    try:
+        await root_db.create_collection(CACHE_BUS_COLLECTION, capped=True, size=CACHE_BUS_SIZE_BYTES, max=10000)
+    except CollectionInvalid:
+        pass  # already exists
+    # A tailable cursor on an empty capped collection dies immediately; keep one marker document.
+    if await root_db[CACHE_BUS_COLLECTION].estimated_document_count() == 0:
+        await root_db[CACHE_BUS_COLLECTION].insert_one({"namespace": None, "origin": WORKER_ID, "created_at": datetime.now(timezone.utc)})
+
+
+async def _cache_bus_listener() -> None:
+    """Subscribe to invalidations from other workers until cancelled."""
+    collection = root_db[CACHE_BUS_COLLECTION]
+    use_change_stream = False
+    try:
+        hello = await client.admin.command("hello")
+        use_change_stream = bool(hello.get("setName"))
+    except Exception:
+        pass
+    last = await collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+    last_id = last["_id"] if last else None
+    while True:
+        try:
+            if use_change_stream:
+                async with collection.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                    async for change in stream:
+                        _apply_cache_invalidation(change.get("fullDocument") or {})
+            else:
+                query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+                cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for message in cursor:
+                        last_id = message["_id"]
+                        _apply_cache_invalidation(message)
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Cache invalidation listener error, retrying: %s", exc)
+            # Anything may have changed while we were disconnected.
+            _local_caches.clear()
+            await asyncio.sleep(2)
+
+
+async def start_cache_bus() -> None:
+    global _cache_bus_task
+    try:
+        await _ensure_cache_bus_collection()
+    except Exception as exc:
+        logger.warning("Cache invalidation bus setup failed: %s", exc)
+        return
+    if _cache_bus_task is None:
+        _cache_bus_task = asyncio.create_task(_cache_bus_listener())
+
+
+async def stop_cache_bus() -> None:
+    global _cache_bus_task
+    if _cache_bus_task is not None:
+        _cache_bus_task.cancel()
+        try:
+            await _cache_bus_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _cache_bus_task = None
+
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer(auto_error=False)
@@ -132,10 +652,16 @@ async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] =
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    # Tokens issued before tenancy carry no school_id and belong to the default school.
+    _current_school.set(payload.get("school_id") or DEFAULT_SCHOOL_ID)
+    user = cache_get("users", user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        if user:
+            cache_set("users", user_id, user)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+    return dict(user)
 
 
 async def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)):
@@ -145,7 +671,42 @@ async def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)
     return current_user
 
 
-app = FastAPI()
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson when installed (several times faster on large lists), stdlib json otherwise."""
+
+    def render(self, content: Any) -> bytes:
+        if _ORJSON_AVAILABLE:
+            return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def model_projection(model: Any) -> Dict[str, int]:
+    """Mongo projection of the fields `model` serializes; excluded fields such as password_hash are never read."""
+    projection = {"_id": 0}
+    projection.update({name: 1 for name, field in model.model_fields.items() if not field.exclude})
+    return projection
+
+
+def trusted_list(documents: List[Dict[str, Any]], model: Any) -> FastJSONResponse:
+    """Return documents we wrote ourselves without re-validating them against the route's response_model.
+
+    Keeps the model's fields only and fills missing ones with their defaults (older documents), which is what
+    validation would do for well-formed data, then serializes once. The route keeps response_model for the docs.
+    """
+    fields = [(name, field) for name, field in model.model_fields.items() if not field.exclude]
+    shaped = []
+    for document in documents:
+        item = {}
+        for name, field in fields:
+            if name in document:
+                item[name] = document[name]
+            elif not field.is_required():
+                item[name] = field.get_default(call_default_factory=True)
+        shaped.append(item)
+    return FastJSONResponse(shaped)
+
+
+app = FastAPI(default_response_class=FastJSONResponse)
 auth_router = APIRouter(prefix="/api/auth")
 api_router = APIRouter(prefix="/api", dependencies=[Depends(get_current_user)])
 
@@ -154,6 +715,37 @@ api_router = APIRouter(prefix="/api", dependencies=[Depends(get_current_user)])
 async def health_check():
     return {"status": "ok"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text format. Set METRICS_TOKEN to require "Authorization: Bearer <token>" from the scraper."""
+    expected = os.environ.get("METRICS_TOKEN")
+    if expected and request.headers.get("authorization") != f"Bearer {expected}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    lines: List[str] = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
+EVENT_LOOP_LAG_INTERVAL = 0.5
+_event_loop_lag_task: Optional["asyncio.Task"] = None
+
+
+async def _monitor_event_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG.observe((), max(0.0, loop.time() - started - EVENT_LOOP_LAG_INTERVAL))
+
+
+@app.on_event("startup")
+async def start_event_loop_lag_monitor():
+    global _event_loop_lag_task
+    if _event_loop_lag_task is None:
+        _event_loop_lag_task = asyncio.create_task(_monitor_event_loop_lag())
+
 PERFORMANCE_THRESHOLDS = {
     "exceeding": 47,
     "meeting": 45,
@@ -515,6 +1107,271 @@ def compute_student_insights(scores_by_week: Dict[int, Dict[str, Optional[float]
     return {"weak_areas": weak_areas, "strengths": strengths}
 
 
+async def get_all_weeks() -> List[Dict[str, Any]]:
+    """All week documents (a few dozen), cached per worker. Returns copies so callers may mutate them."""
+    weeks = cache_get("weeks", "all")
+    if weeks is None:
+        weeks = await db.weeks.find({}, {"_id": 0}).to_list(500)
+        cache_set("weeks", "all", weeks)
+    return [dict(w) for w in weeks]
+
+
+# weeks and student_scores hold the active academic year only. POST /academic-years/rollover moves the closing
+# year into weeks_archive / student_scores_archive and snapshots its roster into classes_archive / students_archive
+# (zstd-compressed, tagged with academic_year).
+ACADEMIC_YEAR_START_MONTH = 8
+ACADEMIC_YEAR_PATTERN = re.compile(r"^(\d{4})-(\d{4})$")
+
+
+def default_academic_year(today: Optional[datetime] = None) -> str:
+    """"2025-2026" from August 2025 to July 2026."""
+    today = today or datetime.now(timezone.utc)
+    start = today.year if today.month >= ACADEMIC_YEAR_START_MONTH else today.year - 1
+    return f"{start}-{start + 1}"
+
+
+async def get_academic_year_settings(cached: bool = True) -> Dict[str, Any]:
+    """{"active": year, "rolling_over": new year while a rollover runs}. cached=False reads the stored document, for
+    writes that must not trust a cache another worker may not have invalidated yet."""
+    if cached:
+        settings = cache_get("settings", "academic_year")
+        if settings is not None:
+            return settings
+    settings = await db.app_settings.find_one({"id": "academic_year"}, {"_id": 0, "active": 1, "rolling_over": 1})
+    if not settings:
+        defaults = {"id": "academic_year", "active": os.environ.get("ACADEMIC_YEAR") or default_academic_year(), "updated_at": iso_now()}
+        await db.app_settings.update_one({"id": "academic_year"}, {"$setOnInsert": defaults}, upsert=True)
+        settings = await db.app_settings.find_one({"id": "academic_year"}, {"_id": 0, "active": 1, "rolling_over": 1})
+    cache_set("settings", "academic_year", settings)
+    return settings
+
+
+async def get_active_academic_year() -> str:
+    return (await get_academic_year_settings())["active"]
+
+
+async def get_archived_weeks(academic_year: str) -> List[Dict[str, Any]]:
+    """Weeks of an archived year; the archive never changes, so they are cached like the live weeks."""
+    weeks = cache_get("weeks", f"archive:{academic_year}")
+    if weeks is None:
+        weeks = await db.weeks_archive.find({"academic_year": academic_year}, {"_id": 0}).to_list(500)
+        cache_set("weeks", f"archive:{academic_year}", weeks)
+    return [dict(w) for w in weeks]
+
+
+async def _year_score_source(academic_year: Optional[str]) -> tuple:
+    """(weeks, archived year) for the active year (archived year None, the default) or an archived one."""
+    if not academic_year or academic_year == await get_active_academic_year():
+        return await get_all_weeks(), None
+    return await get_archived_weeks(academic_year), academic_year
+
+
+async def year_roster(academic_year: Optional[str], read_db: Any = None) -> tuple:
+    """(classes, students, filter) for the roster of a year: the live collections for the active year, the snapshot
+    taken at rollover for an archived one, so archived reports keep each student in the class they had that year."""
+    database = read_db or db
+    if not academic_year or academic_year == await get_active_academic_year():
+        return database.classes, database.students, {}
+    return database.classes_archive, database.students_archive, {"academic_year": academic_year}
+
+
+# Live score layout, chosen by SCORE_STORAGE:
+#   "documents" (default): student_scores, one document per (student, week) with every score field.
+#   "buckets": student_score_buckets, one document per (student, semester, quarter) whose `weeks` array holds each
+#              week's non-null fields, e.g. {"week_id": ..., "attendance": 2.5, "homework": 4}.
+# Every live score read and write goes through find_scores / write_scores / delete_scores (and the stage helpers
+# below), so the rest of the code never sees the layout. migrate_score_layout.py converts existing data; the archive
+# always uses one document per (student, week).
+SCORE_STORAGE = (os.environ.get("SCORE_STORAGE") or "documents").strip().lower()
+SCORE_BUCKET_COLLECTION = "student_score_buckets"
+if SCORE_STORAGE not in ("documents", "buckets"):
+    raise RuntimeError(f"SCORE_STORAGE must be documents or buckets, not {SCORE_STORAGE!r}")
+
+
+def score_buckets_enabled() -> bool:
+    return SCORE_STORAGE == "buckets"
+
+
+def live_scores_collection(database: Any = None):
+    return (database or db)[SCORE_BUCKET_COLLECTION if score_buckets_enabled() else "student_scores"]
+
+
+async def find_scores(
+    week_ids: Optional[List[str]], student_ids: List[str], read_db: Any = None, archived_year: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Score documents ({student_id, week_id, <fields>}) of these students, for the given weeks or all weeks (None)."""
+    database = read_db or db
+    query: Dict[str, Any] = {"student_id": {"$in": student_ids}}
+    if archived_year or not score_buckets_enabled():
+        if week_ids is not None:
+            query["week_id"] = {"$in": week_ids}
+        if archived_year:
+            return await database.student_scores_archive.find({"academic_year": archived_year, **query}, {"_id": 0}).to_list(None)
+        return await database.student_scores.find(query, {"_id": 0}).to_list(None)
+    wanted = None
+    if week_ids is not None:
+        wanted = set(week_ids)
+        query["weeks.week_id"] = {"$in": week_ids}
+    scores = []
+    async for bucket in database[SCORE_BUCKET_COLLECTION].find(query, {"_id": 0, "student_id": 1, "weeks": 1}):
+        for entry in bucket.get("weeks") or []:
+            if wanted is None or entry.get("week_id") in wanted:
+                scores.append({**entry, "student_id": bucket["student_id"]})
+    return scores
+
+
+def _bucket_week_update(week_id: str, fields: Dict[str, Any], now: str) -> List[Dict[str, Any]]:
+    """Update pipeline that merges `fields` into the bucket's entry for week_id (creating it) and drops null fields."""
+    entries = {"$ifNull": ["$weeks", []]}
+    current = {"$ifNull": [
+        {"$arrayElemAt": [{"$filter": {"input": entries, "cond": {"$eq": ["$$this.week_id", week_id]}}}, 0]}, {}
+    ]}
+    merged = {"$mergeObjects": [
+        current,
+        {key: {"$literal": value} for key, value in fields.items() if key != "updated_at"},
+        {"week_id": week_id},
+    ]}
+    compact = {"$arrayToObject": {"$filter": {"input": {"$objectToArray": merged}, "cond": {"$ne": ["$$this.v", None]}}}}
+    return [{"$set": {
+        "weeks": {"$concatArrays": [{"$filter": {"input": entries, "cond": {"$ne": ["$$this.week_id", week_id]}}}, [compact]]},
+        "updated_at": now,
+    }}]
+
+
+async def write_scores(entries: List[tuple]) -> int:
+    """Upsert (student_id, week_id, fields) entries in one bulk write; fields are set on that week's scores and
+    fields not given are kept (a score model's own `id` is dropped). Returns how many score records were created or changed. Refused while the academic
+    year is being rolled over, so no score lands in the live collection after it was copied into the archive."""
+    if not entries:
+        return 0
+    if (await get_academic_year_settings()).get("rolling_over"):
+        raise HTTPException(status_code=409, detail="The academic year is being rolled over; try again in a minute")
+    entries = [(student_id, week_id, {k: v for k, v in fields.items() if k != "id"}) for student_id, week_id, fields in entries]
+    if not score_buckets_enabled():
+        result = await db.student_scores.bulk_write([
+            UpdateOne({"student_id": student_id, "week_id": week_id}, {"$set": fields}, upsert=True)
+            for student_id, week_id, fields in entries
+        ])
+        return (result.upserted_count or 0) + (result.modified_count or 0)
+    week_quarters = {w["id"]: (w.get("semester", 1), _week_quarter(w)) for w in await get_all_weeks()}
+    unknown = {week_id for _, week_id, _ in entries} - week_quarters.keys()
+    if unknown:
+        # Weeks created on another worker since this one cached them.
+        async for week in db.weeks.find({"id": {"$in": list(unknown)}}, {"_id": 0, "id": 1, "semester": 1, "quarter": 1, "number": 1}):
+            week_quarters[week["id"]] = (week.get("semester", 1), _week_quarter(week))
+        missing = sorted(unknown - week_quarters.keys())
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Weeks not found: {', '.join(missing)}")
+    now = iso_now()
+    operations = []
+    for student_id, week_id, fields in entries:
+        semester, quarter = week_quarters[week_id]
+        operations.append(UpdateOne(
+            {"student_id": student_id, "semester": semester, "quarter": quarter},
+            _bucket_week_update(week_id, fields, now),
+            upsert=True,
+        ))
+    if not operations:
+        return 0
+    result = await db[SCORE_BUCKET_COLLECTION].bulk_write(operations)
+    return (result.upserted_count or 0) + (result.modified_count or 0)
+
+
+async def delete_scores(student_ids: List[str], week_ids: Optional[List[str]] = None) -> int:
+    """Delete the scores of these students, only for week_ids when given. Returns how many week scores were removed."""
+    query: Dict[str, Any] = {"student_id": {"$in": student_ids}}
+    if not score_buckets_enabled():
+        if week_ids is not None:
+            query["week_id"] = {"$in": week_ids}
+        return (await db.student_scores.delete_many(query)).deleted_count
+    buckets = db[SCORE_BUCKET_COLLECTION]
+    if week_ids is None:
+        removed = sum([len(b.get("weeks") or []) async for b in buckets.find(query, {"_id": 0, "weeks.week_id": 1})])
+        await buckets.delete_many(query)
+        return removed
+    wanted = set(week_ids)
+    query["weeks.week_id"] = {"$in": week_ids}
+    removed = sum([
+        sum(1 for entry in b.get("weeks") or [] if entry.get("week_id") in wanted)
+        async for b in buckets.find(query, {"_id": 0, "weeks.week_id": 1})
+    ])
+    await buckets.update_many(query, {"$pull": {"weeks": {"week_id": {"$in": week_ids}}}})
+    await buckets.delete_many({"student_id": {"$in": student_ids}, "weeks": {"$size": 0}})
+    return removed
+
+
+def score_documents_stages(week_ids: List[str]) -> List[Dict[str, Any]]:
+    """Aggregation stages, run on live_scores_collection(), that yield one {student_id, week_id, ...} per week score."""
+    if not score_buckets_enabled():
+        return [{"$match": {"week_id": {"$in": week_ids}}}, {"$project": {"_id": 0}}]
+    return [
+        {"$match": {"weeks.week_id": {"$in": week_ids}}},
+        {"$unwind": "$weeks"},
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$weeks", {"student_id": "$student_id"}]}}},
+        {"$match": {"week_id": {"$in": week_ids}}},
+    ]
+
+
+def score_lookup_stage(week_ids: List[str], fields: List[str], as_field: str = "scores") -> Dict[str, Any]:
+    """$lookup that attaches each student's scores for week_ids as [{week_id, <fields>}]."""
+    return {"$lookup": {
+        "from": live_scores_collection().name,
+        "localField": "id",
+        "foreignField": "student_id",
+        "pipeline": [
+            *score_documents_stages(week_ids),
+            {"$project": {"_id": 0, "week_id": 1, **{field: 1 for field in fields}}},
+        ],
+        "as": as_field,
+    }}
+
+
+async def convert_scores_to_buckets() -> int:
+    """Copy student_scores into student_score_buckets (server-side, re-runnable). Scores of deleted weeks are
+    skipped. Returns the number of buckets."""
+    await ensure_indexes([SCORE_BUCKET_COLLECTION])
+    keep = ["week_id", *_SCORE_VALUE_KEYS]
+    await db.student_scores.aggregate([
+        {"$lookup": {
+            "from": "weeks", "localField": "week_id", "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "semester": 1, "quarter": 1}}], "as": "week",
+        }},
+        {"$unwind": "$week"},
+        {"$project": {
+            "student_id": 1,
+            "semester": "$week.semester",
+            "quarter": "$week.quarter",
+            "updated_at": 1,
+            "entry": {"$arrayToObject": {"$filter": {
+                "input": {"$objectToArray": "$$ROOT"},
+                "cond": {"$and": [{"$in": ["$$this.k", keep]}, {"$ne": ["$$this.v", None]}]},
+            }}},
+        }},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "semester": "$semester", "quarter": "$quarter"},
+            "weeks": {"$push": "$entry"},
+            "updated_at": {"$max": "$updated_at"},
+        }},
+        {"$project": {
+            "_id": 0, "student_id": "$_id.student_id", "semester": "$_id.semester", "quarter": "$_id.quarter",
+            "weeks": 1, "updated_at": 1,
+        }},
+        {"$merge": {"into": SCORE_BUCKET_COLLECTION, "on": ["student_id", "semester", "quarter"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True).to_list(None)
+    return await db[SCORE_BUCKET_COLLECTION].count_documents({})
+
+
+async def convert_buckets_to_scores() -> int:
+    """Copy student_score_buckets back into student_scores (one document per week). Returns the number of documents."""
+    await ensure_indexes(["student_scores"])
+    await db[SCORE_BUCKET_COLLECTION].aggregate([
+        {"$unwind": "$weeks"},
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$weeks", {"student_id": "$student_id", "updated_at": "$updated_at"}]}}},
+        {"$merge": {"into": "student_scores", "on": ["student_id", "week_id"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True).to_list(None)
+    return await db.student_scores.estimated_document_count()
+
+
 def _week_quarter(week: Dict[str, Any]) -> int:
     """Infer quarter from week doc (for backward compat when quarter is missing)."""
     if "quarter" in week and week["quarter"] in (1, 2):
@@ -523,17 +1380,18 @@ def _week_quarter(week: Dict[str, Any]) -> int:
     return 1 if num <= 9 else 2
 
 
-async def build_semester_score_map(student_ids: List[str], semester: int) -> Dict[str, Dict[int, Dict[str, Optional[float]]]]:
+async def build_semester_score_map(
+    student_ids: List[str], semester: int, read_db: Any = None, academic_year: Optional[str] = None
+) -> Dict[str, Dict[int, Dict[str, Optional[float]]]]:
     if not student_ids:
         return {}
-    semester_weeks = await db.weeks.find({"semester": semester}, {"_id": 0}).to_list(200)
+    weeks, archived_year = await _year_score_source(academic_year)
+    semester_weeks = [w for w in weeks if w.get("semester") == semester]
     week_number_map = {week["id"]: week["number"] for week in semester_weeks}
     semester_week_ids = list(week_number_map.keys())
     if not semester_week_ids:
         return {}
-    all_scores = await db.student_scores.find(
-        {"week_id": {"$in": semester_week_ids}, "student_id": {"$in": student_ids}}, {"_id": 0}
-    ).to_list(5000)
+    all_scores = await find_scores(semester_week_ids, student_ids, read_db=read_db, archived_year=archived_year)
     scores_by_student: Dict[str, Dict[int, Dict[str, Optional[float]]]] = {}
     for score in all_scores:
         week_number = week_number_map.get(score.get("week_id"))
@@ -544,24 +1402,22 @@ async def build_semester_score_map(student_ids: List[str], semester: int) -> Dic
 
 
 async def build_quarter_score_map(
-    student_ids: List[str], semester: int, quarter: int
+    student_ids: List[str], semester: int, quarter: int, read_db: Any = None, academic_year: Optional[str] = None
 ) -> Dict[str, Dict[int, Dict[str, Optional[float]]]]:
     """Load scores only for weeks in (semester, quarter). Full separation: S1Q1, S1Q2, S2Q1, S2Q2."""
     if not student_ids:
         return {}
-    query = {"semester": semester, "quarter": quarter}
-    quarter_weeks = await db.weeks.find(query, {"_id": 0}).to_list(200)
+    weeks, archived_year = await _year_score_source(academic_year)
+    all_sem = [w for w in weeks if w.get("semester") == semester]
+    quarter_weeks = [w for w in all_sem if w.get("quarter") == quarter]
     if not quarter_weeks:
         # Backward compat: weeks may lack quarter field
-        all_sem = await db.weeks.find({"semester": semester}, {"_id": 0}).to_list(200)
         quarter_weeks = [w for w in all_sem if _week_quarter(w) == quarter]
     week_number_map = {w["id"]: w["number"] for w in quarter_weeks}
     week_ids = list(week_number_map.keys())
     if not week_ids:
         return {}
-    all_scores = await db.student_scores.find(
-        {"week_id": {"$in": week_ids}, "student_id": {"$in": student_ids}}, {"_id": 0}
-    ).to_list(5000)
+    all_scores = await find_scores(week_ids, student_ids, read_db=read_db, archived_year=archived_year)
     scores_by_student: Dict[str, Dict[int, Dict[str, Optional[float]]]] = {}
     for score in all_scores:
         wn = week_number_map.get(score.get("week_id"))
@@ -579,18 +1435,19 @@ def _normalized_week_number(week: Dict[str, Any]) -> int:
     return num
 
 
-async def build_full_year_score_map(student_ids: List[str]) -> Dict[str, Dict[int, Dict[str, Optional[float]]]]:
+async def build_full_year_score_map(
+    student_ids: List[str], read_db: Any = None, academic_year: Optional[str] = None
+) -> Dict[str, Dict[int, Dict[str, Optional[float]]]]:
     """Load scores for weeks from BOTH semesters so Q1 (weeks 1-9) and Q2 (weeks 10-18) both have data for Dashboard, Analytics, Classes, Reports."""
     if not student_ids:
         return {}
-    all_weeks = await db.weeks.find({"semester": {"$in": [1, 2]}}, {"_id": 0}).to_list(200)
+    weeks, archived_year = await _year_score_source(academic_year)
+    all_weeks = [w for w in weeks if w.get("semester") in (1, 2)]
     week_number_map = {week["id"]: _normalized_week_number(week) for week in all_weeks}
     week_ids = list(week_number_map.keys())
     if not week_ids:
         return {}
-    all_scores = await db.student_scores.find(
-        {"week_id": {"$in": week_ids}, "student_id": {"$in": student_ids}}, {"_id": 0}
-    ).to_list(10000)
+    all_scores = await find_scores(week_ids, student_ids, read_db=read_db, archived_year=archived_year)
     scores_by_student: Dict[str, Dict[int, Dict[str, Optional[float]]]] = {}
     for score in all_scores:
         week_number = week_number_map.get(score.get("week_id"))
@@ -1134,11 +1991,11 @@ def parse_class_name(name: str) -> Dict[str, Optional[Any]]:
     return {"grade": grade, "section": section}
 
 
-def _normalize_class_name_for_uniqueness(name: str) -> str:
-    """Normalize class name for duplicate check: '5A', '5 A', '5a' -> same key."""
+def class_name_key(name: str) -> str:
+    """Key stored as classes.name_key (unique index): '5A', '5 a', '5-A', 'G5A' -> '5A'."""
     if not name or not isinstance(name, str):
         return ""
-    s = re.sub(r"\s+", "", str(name).strip().upper())
+    s = re.sub(r"[\s\-_./]+", "", name.strip().upper())
     if s.startswith("G"):
         s = s[1:]
     return s or name.strip()
@@ -1580,48 +2437,59 @@ def generate_class_summary_excel(class_summary: List[Dict[str, Any]]) -> bytes:
     return buffer.getvalue()
 
 
-def generate_notifications_pdf(logs: List[Dict[str, Any]]) -> bytes:
-    buffer = io.BytesIO()
+NOTIFICATION_EXPORT_HEADERS = ["Type", "Message", "Recipient", "Status", "Time"]
+# Rows per LongTable in the notifications PDF; smaller tables keep ReportLab's layout pass bounded.
+NOTIFICATION_PDF_CHUNK_ROWS = 500
+# ReportLab lays out and keeps the whole document until it is saved, so the PDF is capped; CSV and Excel stream.
+NOTIFICATION_PDF_MAX_ROWS = int(os.environ.get("NOTIFICATION_PDF_MAX_ROWS") or 5000)
+
+
+def notification_export_row(log: Dict[str, Any]) -> List[Any]:
+    return [
+        log.get("event_type"),
+        log.get("message"),
+        log.get("recipient"),
+        log.get("status"),
+        log.get("created_at"),
+    ]
+
+
+def generate_notifications_pdf(rows: List[List[Any]], output) -> None:
     styles = getSampleStyleSheet()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc = SimpleDocTemplate(output, pagesize=A4)
     elements = [Paragraph("Notification Log", styles["Title"]), Spacer(1, 12)]
-    table_data = [["Type", "Message", "Recipient", "Status", "Time"]]
-    for log in logs:
-        table_data.append([
-            log.get("event_type"),
-            log.get("message"),
-            log.get("recipient"),
-            log.get("status"),
-            log.get("created_at"),
-        ])
-    table = Table(table_data, hAlign="LEFT", colWidths=[70, 200, 90, 60, 80])
-    table.setStyle(TableStyle([
+    table_style = TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
         ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(table)
+    ])
+    for start in range(0, max(len(rows), 1), NOTIFICATION_PDF_CHUNK_ROWS):
+        chunk = rows[start:start + NOTIFICATION_PDF_CHUNK_ROWS]
+        table = LongTable(
+            [NOTIFICATION_EXPORT_HEADERS] + chunk, hAlign="LEFT", colWidths=[70, 200, 90, 60, 80], repeatRows=1
+        )
+        table.setStyle(table_style)
+        elements.append(table)
     doc.build(elements)
-    pdf_value = buffer.getvalue()
-    buffer.close()
-    return pdf_value
 
 
-def generate_notifications_excel(logs: List[Dict[str, Any]]) -> bytes:
-    buffer = io.BytesIO()
-    df = pd.DataFrame([
-        {
-            "Type": log.get("event_type"),
-            "Message": log.get("message"),
-            "Recipient": log.get("recipient"),
-            "Status": log.get("status"),
-            "Time": log.get("created_at"),
-        }
-        for log in logs
-    ])
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="Notifications", index=False)
-    buffer.seek(0)
-    return buffer.getvalue()
+def new_notifications_workbook():
+    """Write-only workbook: rows are flushed to the worksheet XML as they are appended instead of held as cells."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Notifications")
+    sheet.append(NOTIFICATION_EXPORT_HEADERS)
+    return workbook, sheet
+
+
+def iter_file_chunks(handle, chunk_size: int = 64 * 1024):
+    handle.seek(0)
+    try:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
 
 
 def get_sender_identity() -> SGEmail:
@@ -1632,18 +2500,42 @@ def get_sender_identity() -> SGEmail:
     return SGEmail(sender_email)
 
 
-def send_report_email(recipients: List[str], report_pdf: bytes, report_excel: bytes, grade: int):
+REPORT_EMAIL_TRANSPORT = (os.environ.get("REPORT_EMAIL_TRANSPORT") or "sendgrid").strip().lower()
+REPORT_RENDER_WORKERS = max(1, int(os.environ.get("REPORT_RENDER_WORKERS") or 2))
+_report_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_report_render_pool() -> ProcessPoolExecutor:
+    """Process pool for CPU-heavy report rendering (matplotlib + ReportLab + openpyxl), created lazily."""
+    global _report_render_pool
+    if _report_render_pool is None:
+        _report_render_pool = ProcessPoolExecutor(max_workers=REPORT_RENDER_WORKERS)
+    return _report_render_pool
+
+
+def render_grade_report_files(report: Dict[str, Any], grade: int) -> tuple:
+    """Render PDF and Excel from one grade snapshot. Runs in a worker process. Returns (pdf_bytes, excel_bytes)."""
+    return generate_report_pdf(report, grade), generate_report_excel(report, grade)
+
+
+def _report_email_subject(grade: int) -> str:
+    return f"Weekly Grade {grade} Performance Report"
+
+
+REPORT_EMAIL_HTML = "<p>Your weekly grade report is attached (PDF and Excel).</p>"
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def send_report_email_sendgrid(recipients: List[str], report_pdf: bytes, report_excel: bytes, grade: int):
     api_key = os.environ.get("SENDGRID_API_KEY")
     if not api_key:
         raise RuntimeError("SENDGRID_API_KEY not configured")
     sender = get_sender_identity()
-    subject = f"Weekly Grade {grade} Performance Report"
-    html_content = "<p>Your weekly grade report is attached (PDF and Excel).</p>"
     message = Mail(
         from_email=sender,
         to_emails=recipients,
-        subject=subject,
-        html_content=html_content,
+        subject=_report_email_subject(grade),
+        html_content=REPORT_EMAIL_HTML,
     )
     attachments = [
         Attachment(
@@ -1655,7 +2547,7 @@ def send_report_email(recipients: List[str], report_pdf: bytes, report_excel: by
         Attachment(
             FileContent(base64.b64encode(report_excel).decode()),
             FileName(f"grade_{grade}_report.xlsx"),
-            FileType("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+            FileType(EXCEL_MEDIA_TYPE),
             Disposition("attachment"),
         ),
     ]
@@ -1664,6 +2556,46 @@ def send_report_email(recipients: List[str], report_pdf: bytes, report_excel: by
     sg.send(message)
 
 
+def send_report_email_smtp(recipients: List[str], report_pdf: bytes, report_excel: bytes, grade: int):
+    """Plain SMTP transport (e.g. a school relay, or a local aiosmtpd stand-in for development)."""
+    host = os.environ.get("SMTP_HOST", "localhost")
+    port = int(os.environ.get("SMTP_PORT") or 25)
+    username = os.environ.get("SMTP_USERNAME")
+    password = os.environ.get("SMTP_PASSWORD")
+    use_tls = (os.environ.get("SMTP_USE_TLS") or "").strip().lower() in ("1", "true", "yes")
+    sender_email = os.environ.get("SENDER_EMAIL", "") or "reports@school.local"
+    sender_name = os.environ.get("SENDER_NAME")
+    message = EmailMessage()
+    message["Subject"] = _report_email_subject(grade)
+    message["From"] = f"{sender_name} <{sender_email}>" if sender_name else sender_email
+    message["To"] = ", ".join(recipients)
+    message.set_content("Your weekly grade report is attached (PDF and Excel).")
+    message.add_alternative(REPORT_EMAIL_HTML, subtype="html")
+    message.add_attachment(report_pdf, maintype="application", subtype="pdf", filename=f"grade_{grade}_report.pdf")
+    maintype, subtype = EXCEL_MEDIA_TYPE.split("/", 1)
+    message.add_attachment(report_excel, maintype=maintype, subtype=subtype, filename=f"grade_{grade}_report.xlsx")
+    with smtplib.SMTP(host, port, timeout=30) as smtp:
+        if use_tls:
+            smtp.starttls()
+        if username and password:
+            smtp.login(username, password)
+        smtp.send_message(message)
+
+
+REPORT_EMAIL_TRANSPORTS = {
+    "sendgrid": send_report_email_sendgrid,
+    "smtp": send_report_email_smtp,
+}
+
+
+def send_report_email(recipients: List[str], report_pdf: bytes, report_excel: bytes, grade: int):
+    """Send the grade report through the configured transport (REPORT_EMAIL_TRANSPORT). Blocking; call from a thread."""
+    transport = REPORT_EMAIL_TRANSPORTS.get(REPORT_EMAIL_TRANSPORT)
+    if transport is None:
+        raise RuntimeError(f"Unknown REPORT_EMAIL_TRANSPORT: {REPORT_EMAIL_TRANSPORT}")
+    transport(recipients, report_pdf, report_excel, grade)
+
+
 async def get_admin_name() -> str:
     admin = await db.users.find_one({"role_name": "Admin"}, {"_id": 0})
     return admin.get("name", "Administrator") if admin else "Administrator"
@@ -1721,11 +2653,16 @@ def render_sms_template(template: str, variables: Dict[str, Any]) -> str:
 
 
 async def get_sms_templates() -> Dict[str, Dict[str, str]]:
+    cached = cache_get("settings", "sms_templates")
+    if cached is not None:
+        return cached
     settings = await db.app_settings.find_one({"id": "sms_templates"}, {"_id": 0})
     if not settings:
         settings = {"id": "sms_templates", "templates": DEFAULT_SMS_TEMPLATES, "updated_at": iso_now()}
         await db.app_settings.insert_one(settings)
-    return settings.get("templates", DEFAULT_SMS_TEMPLATES)
+    templates = settings.get("templates", DEFAULT_SMS_TEMPLATES)
+    cache_set("settings", "sms_templates", templates)
+    return templates
 
 
 async def log_notification(event_type: str, message: str, recipient: str, status: str):
@@ -1734,8 +2671,11 @@ async def log_notification(event_type: str, message: str, recipient: str, status
         message=message,
         recipient=recipient or "",
         status=status,
-    )
-    await db.notification_logs.insert_one(log.model_dump())
+    ).model_dump()
+    if event_type.startswith("action_") and ACTION_LOG_RETENTION_DAYS > 0:
+        # TTL index on expires_at removes old action logs; SMS/email delivery logs are kept.
+        log["expires_at"] = datetime.now(timezone.utc) + timedelta(days=ACTION_LOG_RETENTION_DAYS)
+    await db.notification_logs.insert_one(log)
 
 
 async def log_user_action(current_user: Dict[str, Any], action_type: str, message: str):
@@ -1833,6 +2773,7 @@ class ClassBase(BaseModel):
 class ClassRecord(ClassBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name_key: Optional[str] = None
     created_at: str = Field(default_factory=iso_now)
     updated_at: str = Field(default_factory=iso_now)
 
@@ -1926,6 +2867,18 @@ class PromotionRequest(BaseModel):
     to_class_id: str
 
 
+class RosterTransfer(BaseModel):
+    student_id: str
+    class_id: str
+
+
+class RosterBatchRequest(BaseModel):
+    promotions: List[PromotionRequest] = []  # whole classes, e.g. every 4A student to 5A
+    transfers: List[RosterTransfer] = []  # single students; applied after the promotions
+    notify: bool = True  # one summarized "promotion" SMS for the whole batch
+    include_class_counts: bool = False  # return the resulting student count of every class involved
+
+
 class WeekRecord(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -1933,6 +2886,7 @@ class WeekRecord(BaseModel):
     quarter: int = 1  # 1 or 2 — full separation: S1Q1, S1Q2, S2Q1, S2Q2
     number: int
     label: str
+    academic_year: Optional[str] = None
     created_at: str = Field(default_factory=iso_now)
 
 
@@ -1943,6 +2897,24 @@ class WeekCreate(BaseModel):
     quarter: int = 1  # 1 or 2
 
 
+class WeekReorder(BaseModel):
+    semester: int = 1
+    quarter: int = 1
+    week_ids: List[str]  # every week of the (semester, quarter), in the new order
+
+
+class WeekRelabel(BaseModel):
+    semester: int = 1
+    quarter: int = 1
+    labels: Dict[str, str] = {}  # week id -> label
+    reset_to_numbers: bool = False  # label every week of the set "Week <number>"
+
+
+class AcademicYearRollover(BaseModel):
+    new_year: str  # e.g. "2026-2027"
+    seed_weeks: bool = True  # create the default 36 weeks for the new year
+
+
 class StudentScoreRecord(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -2083,11 +3055,18 @@ class TeacherProfileUpdate(BaseModel):
 class AuthLogin(BaseModel):
     username: str
     password: str
+    school_id: Optional[str] = None
 
 
 class AuthGooglePayload(BaseModel):
     """Google ID token from frontend (e.g. Sign in with Google)."""
     id_token: str
+    school_id: Optional[str] = None
+
+
+class SchoolCreate(BaseModel):
+    id: str
+    name: str
 
 
 class AuthToken(BaseModel):
@@ -2180,7 +3159,14 @@ class RewardBadgeResponse(BaseModel):
 
 class ReportSettings(BaseModel):
     grade: int = 4
+    grades: List[int] = []  # weekly email grades; empty = every grade that has classes
     report_type: str = "full"
+    semester: int = Field(default=1, ge=1, le=2)  # (semester, quarter) the weekly email reports on
+    quarter: int = Field(default=1, ge=1, le=2)
+
+
+AUDIT_LOG_PAGE_SIZE = 20
+AUDIT_LOG_SORT = [("timestamp", -1), ("id", -1)]
 
 
 class AuditLogRecord(BaseModel):
@@ -2201,6 +3187,12 @@ class CalendarEventRecord(BaseModel):
     details: Dict[str, Any] = {}
 
 
+NOTIFICATION_PAGE_SIZE = 500
+NOTIFICATION_SORT = [("created_at", -1), ("id", -1)]
+# Days to keep action_* logs written by log_user_action; 0 keeps them forever.
+ACTION_LOG_RETENTION_DAYS = max(0, int(os.environ.get("ACTION_LOG_RETENTION_DAYS") or 180))
+
+
 class NotificationLogRecord(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -2230,8 +3222,36 @@ def _teacher_class_filter(current_user: Dict[str, Any]) -> Dict[str, Any]:
 @api_router.get("/classes", response_model=List[ClassRecord])
 async def get_classes(current_user: Dict[str, Any] = Depends(get_current_user)):
     query = _teacher_class_filter(current_user)
-    classes = await db.classes.find(query, {"_id": 0}).sort("grade", 1).to_list(200)
-    return classes
+    classes = await db.classes.find(query, model_projection(ClassRecord)).sort("grade", 1).to_list(200)
+    return trusted_list(classes, ClassRecord)
+
+
+async def _raise_if_class_exists(name_key: str, exclude_id: Optional[str] = None) -> None:
+    query: Dict[str, Any] = {"name_key": name_key}
+    if exclude_id:
+        query["id"] = {"$ne": exclude_id}
+    existing = await db.classes.find_one(query, {"_id": 0, "id": 1, "name": 1})
+    if existing:
+        raise HTTPException(
+            status_code=409,
+            detail="class_already_exists",
+            headers={"X-Existing-Class-Id": existing["id"], "X-Existing-Class-Name": existing.get("name", "")},
+        )
+
+
+async def get_or_create_class(name: str, grade: Optional[int], section: Optional[str]) -> tuple:
+    """Return (class document, created) for the class whose name_key matches `name`, creating it if missing.
+    When another request creates the same class first, its document is returned."""
+    name_key = class_name_key(name)
+    existing = await db.classes.find_one({"name_key": name_key}, {"_id": 0})
+    if existing:
+        return existing, False
+    class_record = ClassRecord(name=name, grade=grade, section=section, name_key=name_key)
+    try:
+        await db.classes.insert_one(class_record.model_dump())
+    except DuplicateKeyError:
+        return await db.classes.find_one({"name_key": name_key}, {"_id": 0}), False
+    return class_record.model_dump(), True
 
 
 @api_router.post("/classes", response_model=ClassRecord)
@@ -2242,19 +3262,16 @@ async def create_class(payload: ClassBase, current_user: Dict[str, Any] = Depend
         parsed = parse_class_name(payload.name)
         data["grade"] = data.get("grade") or parsed.get("grade")
         data["section"] = data.get("section") or parsed.get("section")
-    # Prevent duplicate: class with same normalized name (e.g. 5A, 5 A, 5a) already exists
-    norm_name = _normalize_class_name_for_uniqueness(payload.name)
-    if norm_name:
-        all_classes = await db.classes.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(500)
-        for c in all_classes:
-            if _normalize_class_name_for_uniqueness(c.get("name", "")) == norm_name:
-                raise HTTPException(
-                    status_code=409,
-                    detail="class_already_exists",
-                    headers={"X-Existing-Class-Id": c["id"], "X-Existing-Class-Name": c.get("name", "")},
-                )
-    class_record = ClassRecord(**data)
-    await db.classes.insert_one(class_record.model_dump())
+    # Prevent duplicate: class with same normalized name (e.g. 5A, 5 A, 5a) already exists. The unique index on
+    # name_key also catches two admins creating the same class at once.
+    name_key = class_name_key(payload.name)
+    await _raise_if_class_exists(name_key)
+    class_record = ClassRecord(**data, name_key=name_key)
+    try:
+        await db.classes.insert_one(class_record.model_dump())
+    except DuplicateKeyError:
+        await _raise_if_class_exists(name_key)
+        raise
     await log_user_action(current_user, "class_add", f"Added class {class_record.name}")
     return class_record
 
@@ -2266,53 +3283,440 @@ async def update_class(class_id: str, payload: ClassUpdate):
         parsed = parse_class_name(update_data["name"])
         update_data.setdefault("grade", parsed.get("grade"))
         update_data.setdefault("section", parsed.get("section"))
+    update: Dict[str, Any] = {"$set": update_data}
+    if "name" in update_data:
+        update_data["name_key"] = class_name_key(update_data["name"])
+        await _raise_if_class_exists(update_data["name_key"], exclude_id=class_id)
+        # students.class_name is rewritten by the maintenance worker (sync_class_names)
+        update["$inc"] = {"name_version": 1}
     update_data["updated_at"] = iso_now()
-    result = await db.classes.find_one_and_update({"id": class_id}, {"$set": update_data}, return_document=True)
+    try:
+        result = await db.classes.find_one_and_update({"id": class_id}, update, return_document=True)
+    except DuplicateKeyError:
+        await _raise_if_class_exists(update_data["name_key"], exclude_id=class_id)
+        raise
     if not result:
         raise HTTPException(status_code=404, detail="Class not found")
     result.pop("_id", None)
+    if "name" in update_data or "grade" in update_data:
+        await db.student_insights.update_many({"class_id": class_id}, {"$set": {"class_name": result["name"], "grade": result.get("grade")}})
+    if "name" in update_data:
+        wake_maintenance_worker()
     return result
 
 
-@api_router.delete("/classes/{class_id}")
-async def delete_class(class_id: str, current_user: Dict[str, Any] = Depends(get_current_user)):
-    class_doc = await db.classes.find_one({"id": class_id}, {"_id": 0})
-    if not class_doc:
-        raise HTTPException(status_code=404, detail="Class not found")
-    students = await db.students.find({"class_id": class_id}, {"_id": 0, "id": 1}).to_list(5000)
-    student_ids = [student["id"] for student in students]
-    if student_ids:
-        await db.student_scores.delete_many({"student_id": {"$in": student_ids}})
-    await db.students.delete_many({"class_id": class_id})
-    await db.users.update_many({}, {"$pull": {"assigned_class_ids": class_id}})
-    await db.classes.delete_one({"id": class_id})
-    class_name = class_doc.get("name", class_id)
-    await log_user_action(current_user, "class_delete", f"Deleted class {class_name}")
-    return {"status": "deleted"}
+# Cascading deletes: the request removes the parents (weeks, classes, students) at once, so no read can reach their
+# scores any more, and records a job in purge_jobs that deletes the orphaned student_scores in the background. Week
+# jobs carry the (few) week ids and delete in _id-range batches. Student jobs leave one tombstone per deleted student
+# in purge_tombstones (written server-side, never loaded into the request) and delete the scores of the next
+# PURGE_STUDENT_BATCH tombstones in student_id order. Jobs survive restarts; a running job whose heartbeat is stale
+# is taken over by any worker.
+PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE") or 2000)
+PURGE_STUDENT_BATCH = 100
+PURGE_POLL_SECONDS = 30
+PURGE_STALE_SECONDS = 120
+PURGE_JOB_FIELDS = {"_id": 0, "values": 0, "max_id": 0}
+_maintenance_task: Optional["asyncio.Task"] = None
+_maintenance_wakeup: Optional[asyncio.Event] = None
+
+
+async def create_purge_job(description: str, field: str, values: List[str]) -> Optional[str]:
+    """Queue deletion of live scores whose `field` is in `values` (the ids of the weeks the request deleted). With
+    score buckets, week_id jobs pull the weeks out of the buckets instead of deleting documents."""
+    now = iso_now()
+    collection = live_scores_collection()
+    pull = score_buckets_enabled() and field == "week_id"
+    job = {
+        "id": str(uuid.uuid4()),
+        "collection": collection.name,
+        "description": description,
+        "field": "weeks.week_id" if pull else field,
+        "values": values,
+        "pull": pull,
+        "status": "pending",
+        "deleted": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if not values:
+        return None
+    await db.purge_jobs.insert_one(job)
+    wake_maintenance_worker()
+    return job["id"]
 
 
-@api_router.delete("/classes")
-async def delete_all_classes(current_user: Dict[str, Any] = Depends(require_admin)):
-    """Delete all classes and their students/score records. Clears assigned_class_ids from users."""
-    students = await db.students.find({}, {"_id": 0, "id": 1}).to_list(50000)
-    student_ids = [s["id"] for s in students]
-    scores_deleted = 0
-    if student_ids:
-        scores_result = await db.student_scores.delete_many({"student_id": {"$in": student_ids}})
-        scores_deleted = scores_result.deleted_count
-    students_result = await db.students.delete_many({})
-    await db.users.update_many({}, {"$set": {"assigned_class_ids": []}})
+def _purge_filter(job: Dict[str, Any]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if job.get("field"):
+        query[job["field"]] = {"$in": job["values"]}
+    if job.get("max_id") is not None:
+        # Jobs queued before purges were keyed by the deleted ids.
+        query["_id"] = {"$lte": job["max_id"]}
+    return query
+
+
+async def delete_students_matching(query: Dict[str, Any], description: str) -> tuple:
+    """Delete the students matching `query` and queue the purge of their scores; returns (students deleted, purge job
+    id). Students are stamped with the job id, tombstoned and deleted by that stamp, repeated until nothing matches so
+    students inserted meanwhile are caught too. A job left "preparing" by a crash is picked up once it is stale."""
+    now = iso_now()
+    job = {
+        "id": str(uuid.uuid4()),
+        "collection": live_scores_collection().name,
+        "description": description,
+        "field": "student_id",
+        "tombstones": True,
+        "status": "preparing",
+        "deleted": 0,
+        "heartbeat_at": datetime.now(timezone.utc),
+        "created_at": now,
+        "updated_at": now,
+    }
+    await db.purge_jobs.insert_one(job)
+    deleted = 0
+    while (await db.students.update_many(query, {"$set": {"deletion_id": job["id"]}})).matched_count:
+        await db.students.aggregate([
+            {"$match": {"deletion_id": job["id"]}},
+            {"$project": {"_id": 0, "job_id": "$deletion_id", "student_id": "$id"}},
+            {"$merge": {"into": "purge_tombstones", "on": ["job_id", "student_id"], "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+        ]).to_list(None)
+        deleted += (await db.students.delete_many({"deletion_id": job["id"]})).deleted_count
+    if not deleted:
+        await db.purge_jobs.delete_one({"id": job["id"]})
+        return 0, None
+    await db.purge_jobs.update_one({"id": job["id"]}, {"$set": {"status": "pending", "students": deleted, "updated_at": iso_now()}})
+    wake_maintenance_worker()
+    return deleted, job["id"]
+
+
+async def _run_tombstone_purge(job: Dict[str, Any]) -> None:
+    while True:
+        batch = await db.purge_tombstones.find(
+            {"job_id": job["id"]}, {"_id": 0, "student_id": 1}
+        ).sort("student_id", 1).limit(PURGE_STUDENT_BATCH).to_list(None)
+        if not batch:
+            return
+        student_ids = [t["student_id"] for t in batch]
+        # A crash between tombstoning and deleting leaves the student in place; keep its scores.
+        alive = set(await db.students.distinct("id", {"id": {"$in": student_ids}}))
+        gone = [student_id for student_id in student_ids if student_id not in alive]
+        removed = await delete_scores(gone) if gone else 0
+        await db.purge_tombstones.delete_many({"job_id": job["id"], "student_id": {"$in": student_ids}})
+        await db.purge_jobs.update_one(
+            {"id": job["id"]},
+            {"$inc": {"deleted": removed}, "$set": {"heartbeat_at": datetime.now(timezone.utc), "updated_at": iso_now()}},
+        )
+        await asyncio.sleep(0.05)  # leave room for request traffic between batches
+
+
+async def _run_purge_job(job: Dict[str, Any]) -> None:
+    if job.get("tombstones"):
+        await _run_tombstone_purge(job)
+        await db.purge_jobs.update_one({"id": job["id"]}, {"$set": {"status": "done", "finished_at": iso_now(), "updated_at": iso_now()}})
+        return
+    collection = db[job["collection"]]
+    query = _purge_filter(job)
+    while True:
+        # Delete up to the _id of the batch's last document instead of sending a list of ids.
+        boundary = await collection.find(query, {"_id": 1}).sort("_id", 1).skip(PURGE_BATCH_SIZE - 1).limit(1).to_list(1)
+        batch_query = {**query, "_id": {"$lte": boundary[0]["_id"]}} if boundary else query
+        if job.get("pull"):
+            result = await collection.update_many(batch_query, {"$pull": {"weeks": {"week_id": {"$in": job["values"]}}}})
+            removed = result.modified_count
+        else:
+            removed = (await collection.delete_many(batch_query)).deleted_count
+        await db.purge_jobs.update_one(
+            {"id": job["id"]},
+            {"$inc": {"deleted": removed}, "$set": {"heartbeat_at": datetime.now(timezone.utc), "updated_at": iso_now()}},
+        )
+        if not boundary:
+            break
+        await asyncio.sleep(0.05)  # leave room for request traffic between batches
+    if job.get("pull"):
+        await collection.delete_many({"weeks": {"$size": 0}})
+    await db.purge_jobs.update_one({"id": job["id"]}, {"$set": {"status": "done", "finished_at": iso_now(), "updated_at": iso_now()}})
+
+
+async def run_purge_jobs() -> None:
+    """Run the current school's pending purge jobs (and stale running ones) until none is left."""
+    while True:
+        now = datetime.now(timezone.utc)
+        job = await db.purge_jobs.find_one_and_update(
+            {"$or": [
+                {"status": "pending"},
+                {"status": {"$in": ["running", "preparing"]}, "heartbeat_at": {"$lt": now - timedelta(seconds=PURGE_STALE_SECONDS)}},
+            ]},
+            {"$set": {"status": "running", "owner": WORKER_ID, "heartbeat_at": now, "updated_at": iso_now()}},
+            sort=[("created_at", 1)],
+            return_document=True,
+        )
+        if job is None:
+            return
+        started = time.perf_counter()
+        try:
+            await _run_purge_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error("Purge job %s (%s) failed: %s", job["id"], job.get("description"), exc)
+            await db.purge_jobs.update_one({"id": job["id"]}, {"$set": {"status": "failed", "error": str(exc), "updated_at": iso_now()}})
+            continue
+        logger.info("Purge job %s (%s) finished in %.1fs", job["id"], job.get("description"), time.perf_counter() - started)
+
+
+CLASS_NAME_SYNC_BATCH_SIZE = 500
+
+
+async def sync_class_names() -> int:
+    """Copy renamed classes' names onto students.class_name in batches and return how many students changed.
+    update_class bumps classes.name_version on rename; a class is in sync once students_name_version matches it,
+    after which reads can use students.class_name as is."""
+    stale = await db.classes.find(
+        {"$expr": {"$ne": [{"$ifNull": ["$students_name_version", 0]}, {"$ifNull": ["$name_version", 0]}]}},
+        {"_id": 0, "id": 1, "name": 1, "name_version": 1},
+    ).to_list(None)
+    updated = 0
+    for class_doc in stale:
+        query = {"class_id": class_doc["id"], "class_name": {"$ne": class_doc["name"]}}
+        while True:
+            boundary = await db.students.find(query, {"_id": 1}).sort("_id", 1).skip(CLASS_NAME_SYNC_BATCH_SIZE - 1).limit(1).to_list(1)
+            batch_query = {**query, "_id": {"$lte": boundary[0]["_id"]}} if boundary else query
+            result = await db.students.update_many(batch_query, {"$set": {"class_name": class_doc["name"]}})
+            updated += result.modified_count
+            if not boundary:
+                break
+        # Renamed again meanwhile: leave it stale so the next pass copies the newer name.
+        await db.classes.update_one(
+            {"id": class_doc["id"], "name_version": class_doc.get("name_version")},
+            {"$set": {"students_name_version": class_doc.get("name_version")}},
+        )
+    if updated:
+        await publish_cache_invalidation("class_performance")
+        await publish_cache_invalidation("transcripts")
+    return updated
+
+
+# student_insights: one document per student x (semester, quarter) with the weak areas / strengths of
+# compute_student_insights as tags ("weak:Homework", "strength:Quizzes"), the quarter level and total, and the
+# student's class and grade, so "weak in Quarter exams across grade 6" is one indexed query. Score writes refresh the
+# students they touch; week-set changes and class moves mark documents stale for the maintenance worker. Marking bumps
+# `revision`, and a refresh only writes a document whose revision is still the one it read before loading scores.
+INSIGHT_QUARTERS = [(1, 1), (1, 2), (2, 1), (2, 2)]
+INSIGHT_REFRESH_BATCH_SIZE = 500
+INSIGHT_TAG_KINDS = ("weak", "strength")
+
+
+def insight_tags(insights: Dict[str, List[str]]) -> List[str]:
+    return [f"weak:{area}" for area in insights["weak_areas"]] + [f"strength:{area}" for area in insights["strengths"]]
+
+
+async def refresh_student_insights(student_ids: List[str], quarters: Optional[List[tuple]] = None) -> None:
+    """Recompute the insight documents of these students for the given (semester, quarter) pairs (default all four).
+    A document marked stale again while its scores were loaded is left stale for the maintenance worker."""
+    quarters = quarters or INSIGHT_QUARTERS
+    for start in range(0, len(student_ids), INSIGHT_REFRESH_BATCH_SIZE):
+        batch = list(dict.fromkeys(student_ids[start:start + INSIGHT_REFRESH_BATCH_SIZE]))
+        students = await db.students.find(
+            {"id": {"$in": batch}}, {"_id": 0, "id": 1, "full_name": 1, "class_id": 1, "class_name": 1}
+        ).to_list(None)
+        deleted = set(batch) - {s["id"] for s in students}
+        if deleted:
+            await db.student_insights.delete_many({"student_id": {"$in": list(deleted)}})
+        if not students:
+            continue
+        revisions = {
+            (doc["student_id"], doc["semester"], doc["quarter"]): doc.get("revision", 0)
+            async for doc in db.student_insights.find(
+                {"student_id": {"$in": [s["id"] for s in students]}},
+                {"_id": 0, "student_id": 1, "semester": 1, "quarter": 1, "revision": 1},
+            )
+        }
+        grades = {
+            c["id"]: c.get("grade")
+            for c in await db.classes.find({"id": {"$in": list({s.get("class_id") for s in students})}}, {"_id": 0, "id": 1, "grade": 1}).to_list(None)
+        }
+        now = iso_now()
+        operations = []
+        for semester, quarter in quarters:
+            scores_by_student = await build_quarter_score_map([s["id"] for s in students], semester, quarter)
+            for student in students:
+                sw = scores_by_student.get(student["id"], {})
+                scratch: Dict[str, Any] = {}
+                _enrich_student_single_quarter(scratch, sw, quarter)
+                insights = compute_student_insights(sw)
+                revision = revisions.get((student["id"], semester, quarter), 0)
+                operations.append(UpdateOne(
+                    {
+                        "student_id": student["id"],
+                        "semester": semester,
+                        "quarter": quarter,
+                        "revision": revision if revision else {"$in": [0, None]},
+                    },
+                    {"$set": {
+                        "full_name": student.get("full_name"),
+                        "class_id": student.get("class_id"),
+                        "class_name": student.get("class_name"),
+                        "grade": grades.get(student.get("class_id")),
+                        "weak_areas": insights["weak_areas"],
+                        "strengths": insights["strengths"],
+                        "tags": insight_tags(insights),
+                        "performance_level": scratch["performance_level"],
+                        "quarter_total": scratch["semester_total"],
+                        "stale": False,
+                        "updated_at": now,
+                    }},
+                    upsert=True,
+                ))
+        try:
+            await db.student_insights.bulk_write(operations, ordered=False)
+        except BulkWriteError as exc:
+            # Duplicate keys are documents whose revision moved on (or that a concurrent refresh inserted).
+            if any(error.get("code") != 11000 for error in exc.details.get("writeErrors", [])):
+                raise
+
+
+async def refresh_insights_for_week(student_ids: List[str], week_id: str) -> None:
+    week = next((w for w in await get_all_weeks() if w["id"] == week_id), None)
+    if week and student_ids:
+        await refresh_student_insights(student_ids, [(week.get("semester", 1), _week_quarter(week))])
+
+
+async def mark_insights_stale(query: Dict[str, Any]) -> None:
+    await db.student_insights.update_many(query, {"$set": {"stale": True}, "$inc": {"revision": 1}})
+    wake_maintenance_worker()
+
+
+async def refresh_stale_insights() -> int:
+    """Recompute stale insight documents in batches, walking the partial stale index in student_id order. Students
+    marked again behind the walk (or during their refresh) are left for the next run."""
+    refreshed = 0
+    last_student_id = ""
+    while True:
+        stale = await db.student_insights.find(
+            {"stale": True, "student_id": {"$gt": last_student_id}}, {"_id": 0, "student_id": 1}
+        ).sort("student_id", 1).limit(INSIGHT_REFRESH_BATCH_SIZE).to_list(None)
+        if not stale:
+            return refreshed
+        student_ids = list(dict.fromkeys(doc["student_id"] for doc in stale))
+        await refresh_student_insights(student_ids)
+        refreshed += len(student_ids)
+        last_student_id = student_ids[-1]
+
+
+async def load_student_insights(
+    student_ids: List[str],
+    semester: int,
+    quarter: int,
+    scores_by_student: Dict[str, Dict[int, Dict[str, Optional[float]]]],
+    read_db: Any = None,
+    academic_year: Optional[str] = None,
+) -> Dict[str, Dict[str, List[str]]]:
+    """Stored insights of the active year, computed from scores_by_student for students without a current document."""
+    stored = {}
+    if not academic_year or academic_year == await get_active_academic_year():
+        docs = await (read_db or db).student_insights.find(
+            {"student_id": {"$in": student_ids}, "semester": semester, "quarter": quarter, "stale": False},
+            {"_id": 0, "student_id": 1, "weak_areas": 1, "strengths": 1},
+        ).to_list(None)
+        stored = {doc["student_id"]: doc for doc in docs}
+    return {
+        student_id: stored.get(student_id) or compute_student_insights(scores_by_student.get(student_id, {}))
+        for student_id in student_ids
+    }
+
+
+def wake_maintenance_worker() -> None:
+    if _maintenance_wakeup is not None:
+        _maintenance_wakeup.set()
+
+
+async def _maintenance_worker() -> None:
+    """Per school: purge jobs, class name propagation and stale insights. Woken by wake_maintenance_worker, else
+    every poll interval."""
+    while True:
+        _maintenance_wakeup.clear()
+        try:
+            for school_id in await list_school_ids():
+                with school_context(school_id):
+                    await sync_class_names()
+                    await refresh_stale_insights()
+                    await run_purge_jobs()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Maintenance worker error, retrying: %s", exc)
+        try:
+            await asyncio.wait_for(_maintenance_wakeup.wait(), PURGE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+@app.on_event("startup")
+async def start_maintenance_worker():
+    global _maintenance_task, _maintenance_wakeup
+    if _maintenance_task is None:
+        _maintenance_wakeup = asyncio.Event()
+        _maintenance_task = asyncio.create_task(_maintenance_worker())
+
+
+@api_router.get("/maintenance/purges")
+async def list_purge_jobs(limit: int = Query(50, ge=1, le=200), current_user: Dict[str, Any] = Depends(require_admin)):
+    """Background score deletions queued by the delete endpoints, newest first, with how many documents each removed."""
+    return await db.purge_jobs.find({}, PURGE_JOB_FIELDS).sort("created_at", -1).to_list(limit)
+
+
+@api_router.get("/maintenance/purges/{job_id}")
+async def get_purge_job(job_id: str, current_user: Dict[str, Any] = Depends(require_admin)):
+    job = await db.purge_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    remaining = 0
+    if job.get("tombstones"):
+        remaining = await db.purge_tombstones.count_documents({"job_id": job_id})  # students whose scores are left
+    elif job["status"] in ("pending", "running"):
+        remaining = await db[job["collection"]].count_documents(_purge_filter(job))
+    return {**{k: v for k, v in job.items() if k not in PURGE_JOB_FIELDS}, "remaining": remaining}
+
+
+@api_router.delete("/classes/{class_id}")
+async def delete_class(class_id: str, current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Removes the class and its students now; their scores are purged in the background."""
+    class_doc = await db.classes.find_one({"id": class_id}, {"_id": 0})
+    if not class_doc:
+        raise HTTPException(status_code=404, detail="Class not found")
+    class_name = class_doc.get("name", class_id)
+    await db.classes.delete_one({"id": class_id})
+    _, purge_job = await delete_students_matching({"class_id": class_id}, f"Scores of class {class_name}")
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await db.student_insights.delete_many({"class_id": class_id})
+    await db.users.update_many({}, {"$pull": {"assigned_class_ids": class_id}})
+    await publish_cache_invalidation("users")
+    await log_user_action(current_user, "class_delete", f"Deleted class {class_name}")
+    return {"status": "deleted", "purge_job": purge_job}
+
+
+@api_router.delete("/classes")
+async def delete_all_classes(current_user: Dict[str, Any] = Depends(require_admin)):
+    """Delete all classes and their students now; score records are purged in the background. Clears
+    assigned_class_ids from users."""
     classes_result = await db.classes.delete_many({})
+    students_deleted, purge_job = await delete_students_matching({}, "Scores of all classes")
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await db.student_insights.delete_many({})
+    await db.users.update_many({}, {"$set": {"assigned_class_ids": []}})
+    await publish_cache_invalidation("users")
     await log_user_action(
         current_user,
         "classes_delete_all",
-        f"Deleted all classes: {classes_result.deleted_count} classes, {students_result.deleted_count} students, {scores_deleted} score records",
+        f"Deleted all classes: {classes_result.deleted_count} classes, {students_deleted} students",
     )
     return {
         "status": "deleted",
         "classes_deleted": classes_result.deleted_count,
-        "students_deleted": students_result.deleted_count,
-        "scores_deleted": scores_deleted,
+        "students_deleted": students_deleted,
+        "purge_job": purge_job,
     }
 
 
@@ -2320,24 +3724,70 @@ async def delete_all_classes(current_user: Dict[str, Any] = Depends(require_admi
 async def list_weeks(
     semester: Optional[int] = Query(default=None),
     quarter: Optional[int] = Query(default=None, description="1 = weeks 1-9, 2 = weeks 10-18 (per semester)"),
+    academic_year: Optional[str] = Query(default=None, description="An archived year, e.g. 2024-2025; default the active year"),
 ):
     """Return weeks for the given semester and quarter only. Full separation: S1Q1, S1Q2, S2Q1, S2Q2 each have their own weeks. Never returns weeks from another quarter."""
     # When semester is set, always filter by quarter (default 1). Avoid ever returning "all weeks" for a semester.
     sem = semester if semester is not None else 1
     q = quarter if quarter in (1, 2) else 1
+    weeks, _ = await _year_score_source(academic_year)
     if semester is not None:
-        query = {"semester": sem, "quarter": q}
-        all_weeks = await db.weeks.find(query, {"_id": 0}).sort("number", 1).to_list(200)
+        all_weeks = sorted(
+            [w for w in weeks if w.get("semester") == sem and w.get("quarter") == q],
+            key=lambda w: w.get("number", 0),
+        )
         for w in all_weeks:
             if "quarter" not in w or w["quarter"] not in (1, 2):
                 w["quarter"] = 1 if w.get("number", 1) <= 9 else 2
-        return all_weeks
+        return trusted_list(all_weeks, WeekRecord)
     # No semester: return all weeks (e.g. admin tools) with quarter backfilled
-    all_weeks = await db.weeks.find({"semester": {"$in": [1, 2]}}, {"_id": 0}).sort([("semester", 1), ("number", 1)]).to_list(200)
+    all_weeks = sorted(
+        [w for w in weeks if w.get("semester") in (1, 2)],
+        key=lambda w: (w.get("semester", 0), w.get("number", 0)),
+    )
     for w in all_weeks:
         if "quarter" not in w or w["quarter"] not in (1, 2):
             w["quarter"] = 1 if w.get("number", 1) <= 9 else 2
-    return all_weeks
+    return trusted_list(all_weeks, WeekRecord)
+
+
+_transactions_supported: Optional[bool] = None
+
+
+async def transactions_supported() -> bool:
+    """Replica sets and sharded clusters (Atlas) support transactions; a standalone mongod does not."""
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = await client.admin.command("hello")
+        except Exception:
+            return False
+        _transactions_supported = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+    return _transactions_supported
+
+
+async def run_week_set_update(semester: int, quarter: int, operation):
+    """Run `operation(session)` in one transaction that also bumps the version of the (semester, quarter) week set.
+    Two concurrent inserts/reorders of the same set then write-conflict and one is retried by with_transaction,
+    instead of both shifting numbers and producing duplicates. Without transactions (local standalone mongod) the
+    operation runs with session=None."""
+
+    async def bump_and_run(session):
+        await db.week_sets.update_one(
+            {"_id": f"s{semester}q{quarter}"}, {"$inc": {"version": 1}}, upsert=True, session=session
+        )
+        return await operation(session)
+
+    if not await transactions_supported():
+        return await bump_and_run(None)
+    async with await client.start_session() as session:
+        return await session.with_transaction(bump_and_run)
+
+
+async def _quarter_weeks_sorted(semester: int, quarter: int, session=None) -> List[Dict[str, Any]]:
+    return await db.weeks.find(
+        {"semester": semester, "quarter": quarter}, model_projection(WeekRecord), session=session
+    ).sort("number", 1).to_list(None)
 
 
 @api_router.post("/weeks", response_model=WeekRecord)
@@ -2348,35 +3798,204 @@ async def create_week(payload: WeekCreate, current_user: Dict[str, Any] = Depend
     max_number = 9 if q == 1 else 18
     min_number = 1 if q == 1 else 10
 
-    if payload.number is not None:
-        # Insert at specific position: validate range and shift existing weeks
-        insert_num = min(max(payload.number, min_number), max_number)
-        to_shift = await db.weeks.find({**query, "number": {"$gte": insert_num}}, {"_id": 0, "id": 1, "number": 1}).to_list(50)
-        for w in sorted(to_shift, key=lambda x: x["number"], reverse=True):
-            new_num = w["number"] + 1
-            if new_num > max_number:
+    year_settings = await get_academic_year_settings(cached=False)
+    if year_settings.get("rolling_over"):
+        raise HTTPException(status_code=409, detail="The academic year is being rolled over; try again in a minute")
+    academic_year = year_settings["active"]
+
+    async def insert_week(session):
+        last_week = await db.weeks.find_one(query, {"_id": 0, "number": 1}, sort=[("number", -1)], session=session)
+        if payload.number is not None:
+            # Insert at specific position: shift the later weeks up by one in a single update
+            insert_num = min(max(payload.number, min_number), max_number)
+            if last_week and last_week["number"] >= insert_num and last_week["number"] + 1 > max_number:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Cannot insert at position {insert_num}: would exceed max week number {max_number} for this quarter.",
                 )
-            await db.weeks.update_one({"id": w["id"]}, {"$set": {"number": new_num}})
-        next_number = insert_num
-    else:
-        last_week = await db.weeks.find(query, {"_id": 0}).sort("number", -1).to_list(1)
-        if q == 1:
-            next_number = (last_week[0]["number"] + 1) if last_week else 1
+            await db.weeks.update_many({**query, "number": {"$gte": insert_num}}, {"$inc": {"number": 1}}, session=session)
+            next_number = insert_num
+        elif q == 1:
+            next_number = (last_week["number"] + 1) if last_week else 1
             next_number = min(max(next_number, 1), 9)
         else:
-            next_number = (last_week[0]["number"] + 1) if last_week and last_week[0].get("number", 0) >= 10 else 10
+            next_number = (last_week["number"] + 1) if last_week and last_week.get("number", 0) >= 10 else 10
             next_number = min(max(next_number, 10), 18)
-
-    label = (payload.label or "").strip() or f"Week {next_number}"
-    week = WeekRecord(semester=payload.semester, quarter=q, number=next_number, label=label)
-    await db.weeks.insert_one(week.model_dump())
-    await log_user_action(current_user, "week_add", f"Added {label} (Semester {payload.semester}, Q{q})")
+        label = (payload.label or "").strip() or f"Week {next_number}"
+        week = WeekRecord(semester=payload.semester, quarter=q, number=next_number, label=label, academic_year=academic_year)
+        await db.weeks.insert_one(week.model_dump(), session=session)
+        return week
+
+    week = await run_week_set_update(payload.semester, q, insert_week)
+    await publish_cache_invalidation("weeks")
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await mark_insights_stale({"semester": payload.semester, "quarter": q})
+    await log_user_action(current_user, "week_add", f"Added {week.label} (Semester {payload.semester}, Q{q})")
     return week
 
 
+@api_router.put("/weeks/order", response_model=List[WeekRecord])
+async def reorder_weeks(payload: WeekReorder, current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Renumber the weeks of one (semester, quarter) in the given order (Q1 from 1, Q2 from 10). Scores stay on their
+    week ids, so they move with their week."""
+    q = payload.quarter if payload.quarter in (1, 2) else 1
+    min_number = 1 if q == 1 else 10
+
+    async def reorder(session):
+        weeks = await _quarter_weeks_sorted(payload.semester, q, session)
+        if len(payload.week_ids) != len(set(payload.week_ids)) or set(payload.week_ids) != {w["id"] for w in weeks}:
+            raise HTTPException(status_code=400, detail="week_ids must list every week of this semester/quarter exactly once")
+        operations = [
+            UpdateOne({"id": week_id}, {"$set": {"number": min_number + index}})
+            for index, week_id in enumerate(payload.week_ids)
+        ]
+        if operations:
+            await db.weeks.bulk_write(operations, ordered=False, session=session)
+        return await _quarter_weeks_sorted(payload.semester, q, session)
+
+    weeks = await run_week_set_update(payload.semester, q, reorder)
+    await publish_cache_invalidation("weeks")
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await mark_insights_stale({"semester": payload.semester, "quarter": q})
+    await log_user_action(current_user, "weeks_reorder", f"Reordered weeks (Semester {payload.semester}, Q{q})")
+    return trusted_list(weeks, WeekRecord)
+
+
+@api_router.put("/weeks/labels", response_model=List[WeekRecord])
+async def relabel_weeks(payload: WeekRelabel, current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Set several week labels at once, or reset every label of the (semester, quarter) to "Week <number>"."""
+    q = payload.quarter if payload.quarter in (1, 2) else 1
+
+    async def relabel(session):
+        weeks = await _quarter_weeks_sorted(payload.semester, q, session)
+        known = {w["id"] for w in weeks}
+        unknown = [week_id for week_id in payload.labels if week_id not in known]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Weeks not in this semester/quarter: {', '.join(unknown)}")
+        operations = []
+        for week in weeks:
+            label = (payload.labels.get(week["id"]) or "").strip()
+            if not label and payload.reset_to_numbers:
+                label = f"Week {week['number']}"
+            if label and label != week.get("label"):
+                operations.append(UpdateOne({"id": week["id"]}, {"$set": {"label": label}}))
+        if operations:
+            await db.weeks.bulk_write(operations, ordered=False, session=session)
+        return await _quarter_weeks_sorted(payload.semester, q, session)
+
+    weeks = await run_week_set_update(payload.semester, q, relabel)
+    await publish_cache_invalidation("weeks")
+    await publish_cache_invalidation("transcripts")
+    await log_user_action(current_user, "weeks_relabel", f"Relabeled weeks (Semester {payload.semester}, Q{q})")
+    return trusted_list(weeks, WeekRecord)
+
+
+ROLLOVER_SETTLE_SECONDS = 2
+ARCHIVE_STORAGE_OPTIONS = {"storageEngine": {"wiredTiger": {"configString": "block_compressor=zstd"}}}
+
+
+async def _ensure_archive_collections() -> None:
+    """Create the archive collections with zstd block compression (they are written once and read rarely) and
+    their indexes. Kept out of INDEX_SPECS so ensure_indexes never creates them uncompressed first."""
+    for name in ("weeks_archive", "student_scores_archive", "classes_archive", "students_archive"):
+        try:
+            await db.create_collection(name, **ARCHIVE_STORAGE_OPTIONS)
+        except CollectionInvalid:
+            pass  # already exists
+    await db.weeks_archive.create_indexes([
+        IndexModel([("academic_year", 1), ("id", 1)], unique=True),
+        IndexModel([("academic_year", 1), ("semester", 1), ("quarter", 1), ("number", 1)]),
+    ])
+    await db.student_scores_archive.create_indexes([
+        IndexModel([("academic_year", 1), ("student_id", 1), ("week_id", 1)], unique=True),
+        IndexModel([("academic_year", 1), ("week_id", 1)]),
+    ])
+    await db.classes_archive.create_indexes([
+        IndexModel([("academic_year", 1), ("id", 1)], unique=True),
+        IndexModel([("academic_year", 1), ("grade", 1)]),
+    ])
+    await db.students_archive.create_indexes([
+        IndexModel([("academic_year", 1), ("id", 1)], unique=True),
+        IndexModel([("academic_year", 1), ("class_id", 1)]),
+    ])
+
+
+@api_router.get("/academic-years")
+async def list_academic_years(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """The active year and the archived years whose reports can still be opened (?academic_year=...)."""
+    archived = await db.weeks_archive.distinct("academic_year")
+    return {"active": await get_active_academic_year(), "archived": sorted(archived, reverse=True)}
+
+
+@api_router.post("/academic-years/rollover")
+async def rollover_academic_year(payload: AcademicYearRollover, current_user: Dict[str, Any] = Depends(require_admin)):
+    """Close the active year: copy its weeks and scores into the compressed archive, make new_year active and
+    start it with empty weeks. Score writes are refused while it runs; live scores of the closed year are purged in
+    the background afterwards."""
+    match = ACADEMIC_YEAR_PATTERN.match(payload.new_year.strip())
+    if not match or int(match.group(2)) != int(match.group(1)) + 1:
+        raise HTTPException(status_code=400, detail="new_year must look like 2026-2027")
+    new_year = match.group(0)
+    closing_year = await get_active_academic_year()
+    if new_year == closing_year or new_year in await db.weeks_archive.distinct("academic_year"):
+        raise HTTPException(status_code=400, detail=f"Academic year {new_year} was already used")
+
+    # Scores are refused from here until the switch; a rollover that failed half-way keeps them refused until it is
+    # run again, since a copy it did not finish cannot be trusted.
+    claimed = await db.app_settings.update_one(
+        {"id": "academic_year", "active": closing_year},
+        {"$set": {"rolling_over": new_year, "updated_at": iso_now()}},
+    )
+    if claimed.matched_count == 0:
+        raise HTTPException(status_code=409, detail="The academic year was changed by another request")
+    await publish_cache_invalidation("settings", "academic_year")
+    await asyncio.sleep(ROLLOVER_SETTLE_SECONDS)  # let the other workers drop their cached settings first
+
+    await _ensure_archive_collections()
+    for source in ("classes", "students"):
+        await db[source].aggregate([
+            {"$unset": "_id"},
+            {"$set": {"academic_year": closing_year}},
+            {"$merge": {"into": f"{source}_archive", "on": ["academic_year", "id"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]).to_list(None)
+    weeks = await db.weeks.find({}, {"_id": 0}).to_list(None)
+    week_ids = [week["id"] for week in weeks]
+    if week_ids:
+        # Server-side copy; re-running after a failure overwrites what was archived already.
+        await live_scores_collection().aggregate([
+            *score_documents_stages(week_ids),
+            {"$set": {"academic_year": closing_year}},
+            {"$merge": {
+                "into": "student_scores_archive",
+                "on": ["academic_year", "student_id", "week_id"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]).to_list(None)
+        await db.weeks_archive.bulk_write([
+            UpdateOne({"academic_year": closing_year, "id": week["id"]}, {"$set": {**week, "academic_year": closing_year}}, upsert=True)
+            for week in weeks
+        ], ordered=False)
+
+    switched = await db.app_settings.update_one(
+        {"id": "academic_year", "active": closing_year},
+        {"$set": {"active": new_year, "updated_at": iso_now()}, "$unset": {"rolling_over": ""}},
+    )
+    if switched.matched_count == 0:
+        raise HTTPException(status_code=409, detail="The academic year was changed by another request")
+    await db.weeks.delete_many({"id": {"$in": week_ids}})
+    purge_job = await create_purge_job(f"Live scores of {closing_year} (archived)", "week_id", week_ids) if week_ids else None
+    await db.student_insights.delete_many({})
+    for namespace in ("settings", "weeks", "class_performance", "transcripts"):
+        await publish_cache_invalidation(namespace)
+    if payload.seed_weeks:
+        await migrate_seed_default_weeks()
+    await log_user_action(current_user, "academic_year_rollover", f"Archived {closing_year} and started {new_year}")
+    return {"archived_year": closing_year, "active": new_year, "archived_weeks": len(week_ids), "purge_job": purge_job}
+
+
 @api_router.delete("/weeks/{week_id}")
 async def delete_week(
     week_id: str,
@@ -2398,10 +4017,14 @@ async def delete_week(
                 detail="Week does not belong to the selected semester/quarter. Deletion refused to keep quarters separate.",
             )
     await db.weeks.delete_one({"id": week_id})
-    await db.student_scores.delete_many({"week_id": week_id})
+    await publish_cache_invalidation("weeks")
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await mark_insights_stale({"semester": week_doc.get("semester", 1), "quarter": _week_quarter(week_doc)})
     wk_num = week_doc.get("number", "?")
+    purge_job = await create_purge_job(f"Scores of week {wk_num}", "week_id", [week_id])
     await log_user_action(current_user, "week_delete", f"Deleted week {wk_num}")
-    return {"status": "deleted"}
+    return {"status": "deleted", "purge_job": purge_job}
 
 
 @api_router.delete("/weeks")
@@ -2410,7 +4033,7 @@ async def delete_all_weeks(
     quarter: int = Query(..., ge=1, le=2),
     current_user: Dict[str, Any] = Depends(get_current_user),
 ):
-    """Delete all weeks for the given (semester, quarter) and their scores."""
+    """Delete all weeks for the given (semester, quarter) now; their scores are purged in the background."""
     query = {"semester": semester, "quarter": quarter}
     quarter_weeks = await db.weeks.find(query, {"_id": 0, "id": 1}).to_list(200)
     if not quarter_weeks:
@@ -2418,11 +4041,15 @@ async def delete_all_weeks(
         quarter_weeks = [w for w in all_sem if _week_quarter(w) == quarter]
     week_ids = [w["id"] for w in quarter_weeks]
     if not week_ids:
-        return {"status": "deleted", "weeks_deleted": 0, "scores_deleted": 0, "message": "No weeks for this semester/quarter"}
-    scores_result = await db.student_scores.delete_many({"week_id": {"$in": week_ids}})
+        return {"status": "deleted", "weeks_deleted": 0, "purge_job": None, "message": "No weeks for this semester/quarter"}
     weeks_result = await db.weeks.delete_many({"id": {"$in": week_ids}})
-    await log_user_action(current_user, "weeks_delete_all", f"Deleted all weeks (S{semester} Q{quarter}): {weeks_result.deleted_count} weeks, {scores_result.deleted_count} score records")
-    return {"status": "deleted", "weeks_deleted": weeks_result.deleted_count, "scores_deleted": scores_result.deleted_count}
+    await publish_cache_invalidation("weeks")
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await mark_insights_stale({"semester": semester, "quarter": quarter})
+    purge_job = await create_purge_job(f"Scores of all weeks (S{semester} Q{quarter})", "week_id", week_ids)
+    await log_user_action(current_user, "weeks_delete_all", f"Deleted all weeks (S{semester} Q{quarter}): {weeks_result.deleted_count} weeks")
+    return {"status": "deleted", "weeks_deleted": weeks_result.deleted_count, "purge_job": purge_job}
 
 
 @api_router.delete("/classes/{class_id}/quarter-scores")
@@ -2452,12 +4079,13 @@ async def clear_class_quarter_scores(
         return {"status": "cleared", "deleted": 0, "message": "No students in class"}
     if not week_ids:
         return {"status": "cleared", "deleted": 0, "message": "No weeks for this semester/quarter"}
-    result = await db.student_scores.delete_many(
-        {"student_id": {"$in": student_ids}, "week_id": {"$in": week_ids}}
-    )
+    deleted = await delete_scores(student_ids, week_ids)
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await refresh_student_insights(student_ids, [(semester, quarter)])
     class_name = class_doc.get("name", class_id)
-    await log_user_action(current_user, "class_clear_scores", f"Cleared quarter scores for class {class_name} (S{semester} Q{quarter}): {result.deleted_count} records")
-    return {"status": "cleared", "deleted": result.deleted_count}
+    await log_user_action(current_user, "class_clear_scores", f"Cleared quarter scores for class {class_name} (S{semester} Q{quarter}): {deleted} records")
+    return {"status": "cleared", "deleted": deleted}
 
 
 @api_router.get("/students")
@@ -2466,6 +4094,13 @@ async def get_students(
     week_id: Optional[str] = Query(default=None),
     current_user: Dict[str, Any] = Depends(get_current_user),
 ):
+    # Plain dicts: skip jsonable_encoder and serialize once.
+    return FastJSONResponse(await load_students(class_id, week_id, current_user))
+
+
+async def load_students(class_id: Optional[str], week_id: Optional[str], current_user: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Students visible to current_user (optionally one class), with the week's scores and quarter totals when
+    week_id is given. Shared by GET /students and the Excel exports."""
     query: Dict[str, Any] = {}
     if current_user.get("role_name") == "Teacher":
         assigned = current_user.get("assigned_class_ids", [])
@@ -2477,9 +4112,7 @@ async def get_students(
     students = await db.students.find(query, {"_id": 0}).sort("full_name", 1).to_list(5000)
     if week_id and students:
         student_ids = [student["id"] for student in students]
-        scores = await db.student_scores.find(
-            {"week_id": week_id, "student_id": {"$in": student_ids}}, {"_id": 0}
-        ).to_list(5000)
+        scores = await find_scores([week_id], student_ids)
         score_map = {score["student_id"]: score for score in scores}
         score_fields = [
             "attendance", "participation", "behavior", "homework",
@@ -2648,7 +4281,9 @@ async def create_student(payload: StudentCreate, current_user: Dict[str, Any] =
             quarter2_practical=student_record.quarter2_practical,
             quarter2_theory=student_record.quarter2_theory,
         )
-        await db.student_scores.insert_one(score.model_dump())
+        await write_scores([(student_record.id, week_id, score.model_dump(exclude={"id", "student_id", "week_id"}))])
+    await refresh_student_insights([student_record.id])
+    await publish_cache_invalidation("class_performance")
     await log_user_action(current_user, "student_add", f"Added student {student_record.full_name} to {class_doc.get('name', payload.class_id)}")
     return enrich_student(student_record.model_dump())
 
@@ -2697,30 +4332,24 @@ async def update_student(student_id: str, payload: StudentUpdate, current_user:
         result = await db.students.find_one_and_update({"id": student_id}, {"$set": student_update}, return_document=True)
         if not result:
             raise HTTPException(status_code=404, detail="Student not found")
-        await db.student_scores.update_one(
-            {"student_id": student_id, "week_id": week_id},
-            {
-                "$set": {
-                    "attendance": update_data.get("attendance"),
-                    "participation": update_data.get("participation"),
-                    "behavior": update_data.get("behavior"),
-                    "homework": update_data.get("homework"),
-                    "quiz1": update_data.get("quiz1"),
-                    "quiz2": update_data.get("quiz2"),
-                    "quiz3": update_data.get("quiz3"),
-                    "quiz4": update_data.get("quiz4"),
-                    "chapter_test1_practical": update_data.get("chapter_test1_practical"),
-                    "chapter_test2_practical": update_data.get("chapter_test2_practical"),
-                    "quarter1_practical": update_data.get("quarter1_practical"),
-                    "quarter1_theory": update_data.get("quarter1_theory"),
-                    "quarter2_practical": update_data.get("quarter2_practical"),
-                    "quarter2_theory": update_data.get("quarter2_theory"),
-                    "updated_at": iso_now(),
-                }
-            },
-            upsert=True,
-        )
-        score_doc = await db.student_scores.find_one({"student_id": student_id, "week_id": week_id}, {"_id": 0})
+        await write_scores([(student_id, week_id, {
+            "attendance": update_data.get("attendance"),
+            "participation": update_data.get("participation"),
+            "behavior": update_data.get("behavior"),
+            "homework": update_data.get("homework"),
+            "quiz1": update_data.get("quiz1"),
+            "quiz2": update_data.get("quiz2"),
+            "quiz3": update_data.get("quiz3"),
+            "quiz4": update_data.get("quiz4"),
+            "chapter_test1_practical": update_data.get("chapter_test1_practical"),
+            "chapter_test2_practical": update_data.get("chapter_test2_practical"),
+            "quarter1_practical": update_data.get("quarter1_practical"),
+            "quarter1_theory": update_data.get("quarter1_theory"),
+            "quarter2_practical": update_data.get("quarter2_practical"),
+            "quarter2_theory": update_data.get("quarter2_theory"),
+            "updated_at": iso_now(),
+        })])
+        score_doc = next(iter(await find_scores([week_id], [student_id])), None)
         if score_doc:
             for key in list(score_doc.keys()):
                 if key != "student_id" and key != "week_id":
@@ -2730,6 +4359,9 @@ async def update_student(student_id: str, payload: StudentUpdate, current_user:
         if not result:
             raise HTTPException(status_code=404, detail="Student not found")
     result.pop("_id", None)
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts", student_id)
+    await refresh_student_insights([student_id])
     name = result.get("full_name", student_id)
     await log_user_action(current_user, "student_update", f"Updated student {name}")
     return enrich_student(result)
@@ -2746,6 +4378,7 @@ async def bulk_update_scores(payload: BulkScoresPayload, current_user: Dict[str,
         "updated_at",
     }
     operations = []
+    score_entries = []
     for item in payload.updates:
         update_data = {
             k: normalize_score(v)
@@ -2777,13 +4410,7 @@ async def bulk_update_scores(payload: BulkScoresPayload, current_user: Dict[str,
         update_data["updated_at"] = iso_now()
         set_dict = {k: update_data[k] for k in score_field_names if k in update_data}
         if payload.week_id and set_dict:
-            operations.append(
-                UpdateOne(
-                    {"student_id": item.id, "week_id": payload.week_id},
-                    {"$set": set_dict},
-                    upsert=True,
-                )
-            )
+            score_entries.append((item.id, payload.week_id, set_dict))
         else:
             operations.append(
                 UpdateOne(
@@ -2791,11 +4418,16 @@ async def bulk_update_scores(payload: BulkScoresPayload, current_user: Dict[str,
                     {"$set": update_data},
                 )
             )
-    if not operations:
+    if not operations and not score_entries:
         return {"status": "updated", "updated": 0}
-    collection = db.student_scores if payload.week_id else db.students
-    result = await collection.bulk_write(operations)
-    updated = (result.upserted_count or 0) + (result.modified_count or 0)
+    updated = await write_scores(score_entries)
+    if operations:
+        result = await db.students.bulk_write(operations)
+        updated += result.modified_count or 0
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    if payload.week_id:
+        await refresh_insights_for_week([item.id for item in payload.updates], payload.week_id)
     scope = "week scores" if payload.week_id else "student records"
     await log_user_action(current_user, "scores_bulk_update", f"Bulk updated {updated} {scope}")
     return {"status": "updated", "updated": updated}
@@ -2820,7 +4452,7 @@ async def download_import_template(
     final_exams_view = view_lower == "final_exams"
     final_exams_q2_view = view_lower == "final_exams_q2"
     if class_id:
-        students = await get_students(class_id=class_id, week_id=week_id, current_user=current_user)
+        students = await load_students(class_id, week_id, current_user)
         if students:
             if assessment_view:
                 template_rows = [
@@ -2934,7 +4566,7 @@ async def export_students_marks(
     view: Optional[str] = Query(default=None),
     current_user: Dict[str, Any] = Depends(get_current_user),
 ):
-    students = await get_students(class_id=class_id, week_id=week_id, current_user=current_user)
+    students = await load_students(class_id, week_id, current_user)
     view_lower = (view or "").lower()
     assessment_view = view_lower == "assessment"
     assessment_q2_view = view_lower == "assessment_q2"
@@ -3082,6 +4714,83 @@ async def export_students_marks(
     )
 
 
+def _transcript_quarter(scores_by_week: Dict[int, Dict[str, Optional[float]]], quarter: int) -> Dict[str, Any]:
+    scratch: Dict[str, Any] = {}
+    _enrich_student_single_quarter(scratch, scores_by_week, quarter)
+    effective = _effective_scores_q2(scores_by_week) if quarter == 2 else _effective_scores_q1(scores_by_week)
+    level_key = "performance_level_q2" if quarter == 2 else "performance_level_q1"
+    return {
+        "quarter": quarter,
+        "effective_scores": effective,
+        "combined_total": scratch["quarter2_total"] if quarter == 2 else scratch["quarter1_total"],
+        "performance_level": scratch[level_key],
+        "performance_label": scratch["performance_label"],
+        **compute_student_insights(scores_by_week),
+    }
+
+
+@api_router.get("/students/{student_id}/transcript")
+async def get_student_transcript(
+    student_id: str,
+    academic_year: Optional[str] = Query(default=None),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+):
+    """Whole-year view of one student: each quarter's effective scores, combined total and level, the overall
+    level per semester and the weekly follow-up trend. One student_id query; cached until the student's scores change."""
+    active_year = await get_active_academic_year()
+    cache_key = student_id if not academic_year or academic_year == active_year else f"{student_id}:{academic_year}"
+    cached = cache_get("transcripts", cache_key)
+    if cached is not None:
+        return FastJSONResponse(cached)
+    _, students_collection, year_filter = await year_roster(academic_year)
+    student = await students_collection.find_one(
+        {**year_filter, "id": student_id}, {"_id": 0, "id": 1, "full_name": 1, "class_id": 1, "class_name": 1}
+    )
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    weeks, archived_year = await _year_score_source(academic_year)
+    week_by_id = {week["id"]: week for week in weeks if week.get("semester") in (1, 2)}
+    scores = await find_scores(None, [student_id], archived_year=archived_year)
+
+    # (semester, quarter) -> week number -> score doc; week numbers run 1-18 within a semester.
+    quarter_maps: Dict[tuple, Dict[int, Dict[str, Any]]] = {(s, q): {} for s in (1, 2) for q in (1, 2)}
+    trend = []
+    for score in scores:
+        week = week_by_id.get(score.get("week_id"))
+        if week is None:
+            continue  # a deleted week waiting for its purge job
+        quarter_maps[(week["semester"], _week_quarter(week))][week["number"]] = score
+        performance = compute_performance(score)
+        trend.append({
+            "week_id": week["id"],
+            "semester": week["semester"],
+            "quarter": _week_quarter(week),
+            "number": week["number"],
+            "label": week.get("label"),
+            **{field: score.get(field) for field in ("attendance", "participation", "behavior", "homework")},
+            "follow_up_total": performance["total_score_normalized"],
+            "performance_level": performance["performance_level"],
+        })
+    trend.sort(key=lambda item: (item["semester"], item["number"]))
+
+    semesters = []
+    for semester in (1, 2):
+        quarters = [_transcript_quarter(quarter_maps[(semester, q)], q) for q in (1, 2)]
+        semesters.append({
+            "semester": semester,
+            "quarters": quarters,
+            "overall_performance_level": _overall_performance_level(quarters[0]["performance_level"], quarters[1]["performance_level"]),
+        })
+    transcript = {
+        "student": student,
+        "academic_year": academic_year or active_year,
+        "semesters": semesters,
+        "trend": trend,
+    }
+    cache_set("transcripts", cache_key, transcript)
+    return FastJSONResponse(transcript)
+
+
 @api_router.post("/students/{student_id}/transfer")
 async def transfer_student(student_id: str, payload: StudentTransferRequest, current_user: Dict[str, Any] = Depends(get_current_user)):
     class_doc = await db.classes.find_one({"id": payload.class_id}, {"_id": 0})
@@ -3098,6 +4807,9 @@ async def transfer_student(student_id: str, payload: StudentTransferRequest, cur
     if not result:
         raise HTTPException(status_code=404, detail="Student not found")
     result.pop("_id", None)
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts", student_id)
+    await refresh_student_insights([student_id])
     await send_sms_notification(
         "student_transfer",
         {"student_name": result["full_name"], "class_name": class_doc["name"]},
@@ -3116,6 +4828,9 @@ async def promote_students(payload: PromotionRequest, current_user: Dict[str, An
         {"class_id": payload.from_class_id},
         {"$set": {"class_id": payload.to_class_id, "class_name": target_class["name"], "updated_at": iso_now()}},
     )
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await mark_insights_stale({"class_id": payload.from_class_id})
     await send_sms_notification(
         "promotion",
         {"count": result.modified_count, "class_name": target_class["name"]},
@@ -3124,24 +4839,108 @@ async def promote_students(payload: PromotionRequest, current_user: Dict[str, An
     return {"status": "promoted", "updated": result.modified_count}
 
 
+@api_router.post("/students/roster-batch")
+async def apply_roster_batch(payload: RosterBatchRequest, current_user: Dict[str, Any] = Depends(require_admin)):
+    """Year-end moves in one request: many class promotions and student transfers, written with one bulk_write.
+    Promotions move the students who are in the source class when the batch starts, so chains such as 4A->5A and
+    5A->6A in the same batch move each group exactly one step."""
+    if not payload.promotions and not payload.transfers:
+        raise HTTPException(status_code=400, detail="Nothing to apply")
+    source_ids = [p.from_class_id for p in payload.promotions]
+    if len(source_ids) != len(set(source_ids)):
+        raise HTTPException(status_code=400, detail="Each class can be promoted only once per batch")
+    class_ids = set(source_ids) | {p.to_class_id for p in payload.promotions} | {t.class_id for t in payload.transfers}
+    classes = await db.classes.find({"id": {"$in": list(class_ids)}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    class_map = {c["id"]: c for c in classes}
+    missing = sorted(class_ids - set(class_map))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Classes not found: {', '.join(missing)}")
+    transfer_ids = {t.student_id for t in payload.transfers}
+    if transfer_ids:
+        found = await db.students.distinct("id", {"id": {"$in": list(transfer_ids)}})
+        missing = sorted(transfer_ids - set(found))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Students not found: {', '.join(missing)}")
+
+    students_by_source: Dict[str, List[str]] = {}
+    if source_ids:
+        async for student in db.students.find({"class_id": {"$in": source_ids}}, {"_id": 0, "id": 1, "class_id": 1}):
+            students_by_source.setdefault(student["class_id"], []).append(student["id"])
+    now = iso_now()
+    operations = []
+    for promotion in payload.promotions:
+        student_ids = students_by_source.get(promotion.from_class_id)
+        if student_ids:
+            target = class_map[promotion.to_class_id]
+            operations.append(UpdateMany(
+                {"id": {"$in": student_ids}},
+                {"$set": {"class_id": target["id"], "class_name": target["name"], "updated_at": now}},
+            ))
+    for transfer in payload.transfers:
+        target = class_map[transfer.class_id]
+        operations.append(UpdateOne(
+            {"id": transfer.student_id},
+            {"$set": {"class_id": target["id"], "class_name": target["name"], "updated_at": now}},
+        ))
+    moved = 0
+    if operations:
+        result = await db.students.bulk_write(operations, ordered=True)
+        moved = result.modified_count
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await mark_insights_stale({"$or": [
+        {"class_id": {"$in": source_ids}},
+        {"student_id": {"$in": [transfer.student_id for transfer in payload.transfers]}},
+    ]})
+
+    target_names = sorted({class_map[p.to_class_id]["name"] for p in payload.promotions} | {class_map[t.class_id]["name"] for t in payload.transfers})
+    if payload.notify and moved:
+        await send_sms_notification("promotion", {"count": moved, "class_name": ", ".join(target_names)})
+    await log_user_action(
+        current_user,
+        "promotion",
+        f"Roster batch: {len(payload.promotions)} class promotions, {len(payload.transfers)} transfers, {moved} students moved",
+    )
+    response: Dict[str, Any] = {
+        "status": "applied",
+        "updated": moved,
+        "promoted": sum(len(students_by_source.get(p.from_class_id, [])) for p in payload.promotions),
+        "transfers_requested": len(payload.transfers),
+    }
+    if payload.include_class_counts:
+        counts = await db.students.aggregate([
+            {"$match": {"class_id": {"$in": list(class_ids)}}},
+            {"$group": {"_id": "$class_id", "count": {"$sum": 1}}},
+        ]).to_list(None)
+        per_class = {c["_id"]: c["count"] for c in counts}
+        response["class_counts"] = [
+            {"class_id": class_id, "class_name": class_map[class_id]["name"], "student_count": per_class.get(class_id, 0)}
+            for class_id in sorted(class_ids, key=lambda c: _class_sort_key(class_map[c]["name"]))
+        ]
+    return response
+
+
 @api_router.delete("/students")
 async def delete_all_students(current_user: Dict[str, Any] = Depends(require_admin)):
-    """Delete all students and their score records."""
-    students = await db.students.find({}, {"_id": 0, "id": 1}).to_list(50000)
-    student_ids = [s["id"] for s in students]
-    if not student_ids:
-        return {"status": "deleted", "students_deleted": 0, "scores_deleted": 0, "message": "No students to delete"}
-    scores_result = await db.student_scores.delete_many({"student_id": {"$in": student_ids}})
-    students_result = await db.students.delete_many({})
-    await log_user_action(current_user, "students_delete_all", f"Deleted all students: {students_result.deleted_count} students, {scores_result.deleted_count} score records")
-    return {"status": "deleted", "students_deleted": students_result.deleted_count, "scores_deleted": scores_result.deleted_count}
+    """Delete all students now; their score records are purged in the background."""
+    students_deleted, purge_job = await delete_students_matching({}, "Scores of all students")
+    if not students_deleted:
+        return {"status": "deleted", "students_deleted": 0, "purge_job": None, "message": "No students to delete"}
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    await db.student_insights.delete_many({})
+    await log_user_action(current_user, "students_delete_all", f"Deleted all students: {students_deleted} students")
+    return {"status": "deleted", "students_deleted": students_deleted, "purge_job": purge_job}
 
 
 @api_router.delete("/students/{student_id}")
 async def delete_student(student_id: str, current_user: Dict[str, Any] = Depends(get_current_user)):
     student = await db.students.find_one({"id": student_id}, {"_id": 0})
     await db.students.delete_one({"id": student_id})
-    await db.student_scores.delete_many({"student_id": student_id})
+    await delete_scores([student_id])
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts", student_id)
+    await db.student_insights.delete_many({"student_id": student_id})
     if student:
         await send_sms_notification(
             "student_delete",
@@ -3156,8 +4955,8 @@ async def delete_student(student_id: str, current_user: Dict[str, Any] = Depends
 
 @api_router.get("/roles", response_model=List[RoleRecord])
 async def get_roles(current_user: Dict[str, Any] = Depends(require_admin)):
-    roles = await db.roles.find({}, {"_id": 0}).sort("name", 1).to_list(200)
-    return roles
+    roles = await db.roles.find({}, model_projection(RoleRecord)).sort("name", 1).to_list(200)
+    return trusted_list(roles, RoleRecord)
 
 
 @api_router.post("/roles", response_model=RoleRecord)
@@ -3186,8 +4985,8 @@ async def delete_role(role_id: str, current_user: Dict[str, Any] = Depends(requi
 
 @api_router.get("/users", response_model=List[UserRecord])
 async def get_users(current_user: Dict[str, Any] = Depends(require_admin)):
-    users = await db.users.find({}, {"_id": 0}).sort("name", 1).to_list(500)
-    return users
+    users = await db.users.find({}, model_projection(UserRecord)).sort("name", 1).to_list(500)
+    return trusted_list(users, UserRecord)
 
 
 @api_router.post("/users", response_model=UserRecord)
@@ -3232,6 +5031,7 @@ async def update_user(user_id: str, payload: UserUpdate, current_user: Dict[str,
     result = await db.users.find_one_and_update({"id": user_id}, {"$set": update_data}, return_document=True)
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
+    await publish_cache_invalidation("users", user_id)
     result.pop("_id", None)
     await log_audit("User updated", result)
     return result
@@ -3240,13 +5040,39 @@ async def update_user(user_id: str, payload: UserUpdate, current_user: Dict[str,
 @api_router.delete("/users/{user_id}")
 async def delete_user(user_id: str, current_user: Dict[str, Any] = Depends(require_admin)):
     await db.users.delete_one({"id": user_id})
+    await publish_cache_invalidation("users", user_id)
     return {"status": "deleted"}
 
 
+async def _audit_log_page(user_id: str, limit: int, cursor: Optional[str] = None):
+    """One page of a user's audit logs, newest first, and the cursor ("timestamp|id") of the next page or None."""
+    query: Dict[str, Any] = {"target_user_id": user_id}
+    if cursor:
+        timestamp, _, log_id = cursor.partition("|")
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": log_id}},
+        ]
+    logs = await db.audit_logs.find(query, model_projection(AuditLogRecord)).sort(AUDIT_LOG_SORT).to_list(limit + 1)
+    if len(logs) > limit:
+        logs = logs[:limit]
+        return logs, f"{logs[-1]['timestamp']}|{logs[-1]['id']}"
+    return logs, None
+
+
 @api_router.get("/users/{user_id}/audit", response_model=List[AuditLogRecord])
-async def get_user_audit_logs(user_id: str, current_user: Dict[str, Any] = Depends(require_admin)):
-    logs = await db.audit_logs.find({"target_user_id": user_id}, {"_id": 0}).sort("timestamp", -1).to_list(200)
-    return logs
+async def get_user_audit_logs(
+    user_id: str,
+    limit: int = Query(200, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """Newest first. When more logs remain, X-Next-Cursor holds the value to pass as `cursor` for the next page."""
+    logs, next_cursor = await _audit_log_page(user_id, limit, cursor)
+    result = trusted_list(logs, AuditLogRecord)
+    if next_cursor:
+        result.headers["X-Next-Cursor"] = next_cursor
+    return result
 
 
 @api_router.get("/users/profile", response_model=UserRecord)
@@ -3299,6 +5125,7 @@ async def update_user_profile(
         update_data["schedule"] = normalize_schedule(update_data.get("schedule"))
     update_data["updated_at"] = iso_now()
     await db.users.update_one({"id": user["id"]}, {"$set": update_data})
+    await publish_cache_invalidation("users", user["id"])
     result = await db.users.find_one({"id": user["id"]}, {"_id": 0})
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
@@ -3320,20 +5147,74 @@ async def list_teachers(current_user: Dict[str, Any] = Depends(require_admin)):
     return teachers
 
 
+def _class_fingerprint(classes: List[Dict[str, Any]]) -> tuple:
+    return tuple((c["id"], c.get("name"), c.get("grade"), c.get("section")) for c in classes)
+
+
+async def _cached_class_summaries(key: str, fingerprint: tuple, classes: List[Dict[str, Any]], semester: int, quarter: int):
+    """_build_class_summary_list cached under the "class_performance" namespace, which every student/score/week write
+    invalidates. The fingerprint (assigned classes, names, ...) is stored with the value so reassigning or renaming
+    classes shows up without waiting for the TTL."""
+    cached = cache_get("class_performance", key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    summaries = await _build_class_summary_list(classes, semester, quarter)
+    cache_set("class_performance", key, (fingerprint, summaries))
+    return summaries
+
+
+@api_router.get("/teachers/overview")
+async def get_teachers_overview(
+    semester: int = Query(1, ge=1, le=2),
+    quarter: int = Query(1, ge=1, le=2),
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """Class performance of every teacher, computed in one pass over all assigned classes instead of one profile
+    request per teacher."""
+    teachers = await db.users.find(
+        {"role_name": "Teacher"}, {"_id": 0, "id": 1, "name": 1, "assigned_class_ids": 1}
+    ).sort("name", 1).to_list(200)
+    class_ids = sorted({class_id for t in teachers for class_id in t.get("assigned_class_ids") or []})
+    classes = await db.classes.find({"id": {"$in": class_ids}}, {"_id": 0}).sort("name", 1).to_list(None)
+    fingerprint = (
+        tuple((t["id"], tuple(t.get("assigned_class_ids") or [])) for t in teachers),
+        _class_fingerprint(classes),
+    )
+    summaries = await _cached_class_summaries(f"overview:{semester}:{quarter}", fingerprint, classes, semester, quarter)
+    by_class = {s["class_id"]: s for s in summaries}
+    return [
+        {
+            "teacher_id": teacher["id"],
+            "name": teacher.get("name"),
+            "class_performance": [by_class[c] for c in teacher.get("assigned_class_ids") or [] if c in by_class],
+        }
+        for teacher in teachers
+    ]
+
+
 @api_router.get("/teachers/{teacher_id}")
-async def get_teacher_profile(teacher_id: str, current_user: Dict[str, Any] = Depends(require_admin)):
+async def get_teacher_profile(
+    teacher_id: str,
+    semester: int = Query(1, ge=1, le=2),
+    quarter: int = Query(1, ge=1, le=2),
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """Older audit logs are paged through GET /users/{teacher_id}/audit?cursor=<audit_next_cursor>."""
     teacher = await db.users.find_one({"id": teacher_id}, {"_id": 0})
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     teacher["schedule"] = normalize_schedule(teacher.get("schedule"))
     assigned_classes = await db.classes.find({"id": {"$in": teacher.get("assigned_class_ids", [])}}, {"_id": 0}).to_list(200)
-    class_performance = await _build_class_summary_list(assigned_classes)
-    audit_logs = await db.audit_logs.find({"target_user_id": teacher_id}, {"_id": 0}).sort("timestamp", -1).to_list(100)
+    class_performance = await _cached_class_summaries(
+        f"teacher:{teacher_id}:{semester}:{quarter}", _class_fingerprint(assigned_classes), assigned_classes, semester, quarter
+    )
+    audit_logs, audit_next_cursor = await _audit_log_page(teacher_id, AUDIT_LOG_PAGE_SIZE)
     return {
         "teacher": teacher,
         "assigned_classes": assigned_classes,
         "class_performance": class_performance,
         "audit_logs": audit_logs,
+        "audit_next_cursor": audit_next_cursor,
     }
 
 
@@ -3351,6 +5232,7 @@ async def update_teacher_profile(teacher_id: str, payload: TeacherProfileUpdate,
         update_data["schedule"] = normalize_schedule(update_data.get("schedule"))
     update_data["updated_at"] = iso_now()
     await db.users.update_one({"id": teacher_id}, {"$set": update_data})
+    await publish_cache_invalidation("users", teacher_id)
     updated = await db.users.find_one({"id": teacher_id}, {"_id": 0})
     if updated:
         await log_audit("Teacher profile updated", updated)
@@ -3359,8 +5241,8 @@ async def update_teacher_profile(teacher_id: str, payload: TeacherProfileUpdate,
 
 @api_router.get("/remedial-plans", response_model=List[RemedialPlanRecord])
 async def get_remedial_plans():
-    plans = await db.remedial_plans.find({}, {"_id": 0}).sort("created_at", -1).to_list(500)
-    return plans
+    plans = await db.remedial_plans.find({}, model_projection(RemedialPlanRecord)).sort("created_at", -1).to_list(500)
+    return trusted_list(plans, RemedialPlanRecord)
 
 
 @api_router.post("/remedial-plans", response_model=RemedialPlanRecord)
@@ -3392,6 +5274,7 @@ async def reset_user_password(user_id: str, payload: PasswordUpdate, current_use
     )
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
+    await publish_cache_invalidation("users", user_id)
     result.pop("_id", None)
     return result
 
@@ -3404,8 +5287,8 @@ async def delete_remedial_plan(plan_id: str):
 
 @api_router.get("/rewards", response_model=List[RewardPlanRecord])
 async def get_rewards():
-    rewards = await db.rewards.find({}, {"_id": 0}).sort("created_at", -1).to_list(500)
-    return rewards
+    rewards = await db.rewards.find({}, model_projection(RewardPlanRecord)).sort("created_at", -1).to_list(500)
+    return trusted_list(rewards, RewardPlanRecord)
 
 
 @api_router.post("/rewards", response_model=RewardPlanRecord)
@@ -3493,9 +5376,11 @@ def build_summary(students: List[Dict[str, Any]], classes: List[Dict[str, Any]])
     total_scores = []
     quiz_scores = []
     chapter_scores = []
+    class_counts: Dict[str, int] = {}
     for student in enriched:
         level = student["performance_level"]
         counts[level] = counts.get(level, 0) + 1
+        class_counts[student["class_name"]] = class_counts.get(student["class_name"], 0) + 1
         if student["total_score_normalized"] is not None:
             total_scores.append(student["total_score_normalized"])
         # Use inclusive (cumulative) quiz/chapter when set (Dashboard/Analytics) so empty weeks reduce averages
@@ -3520,9 +5405,6 @@ def build_summary(students: List[Dict[str, Any]], classes: List[Dict[str, Any]])
         key=lambda s: s["total_score_normalized"],
         reverse=True,
     )[:5]
-    class_counts: Dict[str, int] = {}
-    for student in enriched:
-        class_counts[student["class_name"]] = class_counts.get(student["class_name"], 0) + 1
     students_per_class = [
         {"class_name": name, "count": count}
         for name, count in sorted(class_counts.items(), key=lambda x: _class_sort_key(x[0]))
@@ -3561,12 +5443,12 @@ async def get_analytics_summary(
     try:
         student_query = {"class_id": class_id} if class_id else {}
         class_query = {"id": class_id} if class_id else {}
-        students = await db.students.find(student_query, {"_id": 0}).to_list(5000)
-        classes = await db.classes.find(class_query, {"_id": 0}).to_list(200)
+        students = await analytics_db.students.find(student_query, {"_id": 0}).to_list(5000)
+        classes = await analytics_db.classes.find(class_query, {"_id": 0}).to_list(200)
         sem = semester or 1
         q = quarter or 1
         if students:
-            scores_by_student = await build_quarter_score_map([s["id"] for s in students], sem, q)
+            scores_by_student = await build_quarter_score_map([s["id"] for s in students], sem, q, read_db=analytics_db)
             for student in students:
                 sw = scores_by_student.get(student["id"], {})
                 _enrich_student_single_quarter(student, sw, q)
@@ -3583,120 +5465,8 @@ async def get_analytics_summary(
         raise HTTPException(status_code=500, detail=f"Failed to load analytics summary: {str(e)}")
 
 
-@api_router.get("/analytics/missed-quizzes")
-async def get_missed_quiz_students(
-    class_id: Optional[str] = Query(default=None),
-    semester: Optional[int] = Query(default=1),
-    quarter: Optional[int] = Query(default=1),
-):
-    """
-    Returns students who have no quiz attempt recorded for the target quiz week in the selected (semester, quarter).
-    Q1 -> week 4, fields quiz1/quiz2
-    Q2 -> week 16, fields quiz3/quiz4
-    """
-    sem = semester or 1
-    q = quarter or 1
-    student_query = {"class_id": class_id} if class_id else {}
-    class_query = {"id": class_id} if class_id else {}
-    students = await db.students.find(
-        student_query, {"_id": 0, "id": 1, "full_name": 1, "class_id": 1, "class_name": 1}
-    ).to_list(5000)
-    classes = await db.classes.find(class_query, {"_id": 0, "id": 1, "name": 1}).to_list(200)
-    class_id_to_name = {c["id"]: c.get("name", c["id"]) for c in classes}
-    for s in students:
-        s["class_name"] = s.get("class_name") or class_id_to_name.get(s.get("class_id"), "")
-
-    target_week_number = 16 if q == 2 else 4
-    quiz_fields = ("quiz3", "quiz4") if q == 2 else ("quiz1", "quiz2")
-    week_doc = await db.weeks.find_one(
-        {"semester": sem, "quarter": q, "number": target_week_number},
-        {"_id": 0, "id": 1, "number": 1, "label": 1},
-    )
-    if not week_doc:
-        # Fallback for older week data that may miss quarter field.
-        week_doc = await db.weeks.find_one(
-            {"semester": sem, "number": target_week_number},
-            {"_id": 0, "id": 1, "number": 1, "label": 1},
-        )
-    if not week_doc:
-        return {
-            "semester": sem,
-            "quarter": q,
-            "quiz_fields": list(quiz_fields),
-            "week": None,
-            "total_students": len(students),
-            "submitted_count": 0,
-            "missed_count": 0,
-            "students": [],
-        }
-
-    student_ids = [s["id"] for s in students]
-    score_docs = await db.student_scores.find(
-        {"week_id": week_doc["id"], "student_id": {"$in": student_ids}},
-        {"_id": 0, "student_id": 1, quiz_fields[0]: 1, quiz_fields[1]: 1},
-    ).to_list(5000)
-    score_map = {d["student_id"]: d for d in score_docs}
-
-    def _has_quiz_attempt(doc: Optional[Dict[str, Any]]) -> bool:
-        if not doc:
-            return False
-        for key in quiz_fields:
-            if _is_meaningful_score(doc.get(key)):
-                return True
-        return False
-
-    missed_students = []
-    for s in students:
-        score_doc = score_map.get(s["id"])
-        if _has_quiz_attempt(score_doc):
-            continue
-        missed_students.append(
-            {
-                "id": s["id"],
-                "full_name": s.get("full_name", ""),
-                "class_id": s.get("class_id"),
-                "class_name": s.get("class_name", ""),
-            }
-        )
-
-    submitted_count = len(students) - len(missed_students)
+def _missed_work_group_configs(q: int) -> Dict[str, Dict[str, Any]]:
     return {
-        "semester": sem,
-        "quarter": q,
-        "quiz_fields": list(quiz_fields),
-        "week": week_doc,
-        "total_students": len(students),
-        "submitted_count": submitted_count,
-        "missed_count": len(missed_students),
-        "students": missed_students,
-    }
-
-
-@api_router.get("/analytics/missed-assessments")
-async def get_missed_assessment_students(
-    class_id: Optional[str] = Query(default=None),
-    semester: Optional[int] = Query(default=1),
-    quarter: Optional[int] = Query(default=1),
-):
-    """
-    Returns missed-attempt detection for quiz, chapter test, final practical, and final theory
-    in the selected (semester, quarter).
-    """
-    sem = semester or 1
-    q = quarter or 1
-    student_query = {"class_id": class_id} if class_id else {}
-    class_query = {"id": class_id} if class_id else {}
-    students = await db.students.find(
-        student_query, {"_id": 0, "id": 1, "full_name": 1, "class_id": 1, "class_name": 1}
-    ).to_list(5000)
-    classes = await db.classes.find(class_query, {"_id": 0, "id": 1, "name": 1}).to_list(200)
-    class_id_to_name = {c["id"]: c.get("name", c["id"]) for c in classes}
-    for s in students:
-        s["class_name"] = s.get("class_name") or class_id_to_name.get(s.get("class_id"), "")
-
-    student_ids = [s["id"] for s in students]
-
-    group_configs = {
         "quiz": {
             "fields": ["quiz3", "quiz4"] if q == 2 else ["quiz1", "quiz2"],
             "target_numbers": [16] if q == 2 else [4],
@@ -3716,112 +5486,163 @@ async def get_missed_assessment_students(
         },
     }
 
-    target_numbers = sorted({n for config in group_configs.values() for n in config["target_numbers"]})
-    primary_week_docs = await db.weeks.find(
-        {"semester": sem, "quarter": q, "number": {"$in": target_numbers}},
-        {"_id": 0, "id": 1, "number": 1, "label": 1},
-    ).to_list(50)
 
+async def _resolve_target_weeks(sem: int, q: int, target_numbers: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Week docs per target number from the weeks cache; weeks without a matching quarter fall back to semester only."""
+    weeks = await get_all_weeks()
     weeks_by_number: Dict[int, List[Dict[str, Any]]] = {}
-    seen_week_ids = set()
-    for doc in primary_week_docs:
-        if doc["id"] in seen_week_ids:
-            continue
-        seen_week_ids.add(doc["id"])
-        weeks_by_number.setdefault(doc["number"], []).append(doc)
-
+    for week in weeks:
+        if week.get("semester") == sem and week.get("quarter") == q and week.get("number") in target_numbers:
+            weeks_by_number.setdefault(week["number"], []).append(week)
     missing_numbers = [number for number in target_numbers if number not in weeks_by_number]
     if missing_numbers:
         # Backward-compat for older week documents without quarter.
-        fallback_docs = await db.weeks.find(
-            {"semester": sem, "number": {"$in": missing_numbers}},
-            {"_id": 0, "id": 1, "number": 1, "label": 1},
-        ).to_list(50)
-        for doc in fallback_docs:
-            if doc["id"] in seen_week_ids:
-                continue
-            seen_week_ids.add(doc["id"])
-            weeks_by_number.setdefault(doc["number"], []).append(doc)
+        for week in weeks:
+            if week.get("semester") == sem and week.get("number") in missing_numbers:
+                weeks_by_number.setdefault(week["number"], []).append(week)
+    return {
+        number: [{"id": w["id"], "number": w["number"], "label": w.get("label")} for w in docs]
+        for number, docs in weeks_by_number.items()
+    }
+
+
+def _attempt_flag_expr(week_ids: List[str], fields: List[str]) -> Dict[str, Any]:
+    """True when any score doc in the group's weeks has a field > 0 (same rule as _is_meaningful_score)."""
+    return {
+        "$anyElementTrue": [{
+            "$map": {
+                "input": {"$filter": {"input": "$scores", "as": "s", "cond": {"$in": ["$$s.week_id", week_ids]}}},
+                "as": "s",
+                "in": {"$or": [
+                    {"$gt": [{"$convert": {"input": f"$$s.{field}", "to": "double", "onError": 0, "onNull": 0}}, 0]}
+                    for field in fields
+                ]},
+            }
+        }]
+    }
+
 
+async def compute_missed_work(
+    class_id: Optional[str],
+    sem: int,
+    q: int,
+    group_names: List[str],
+    first_week_only: bool = False,
+) -> Dict[str, Any]:
+    """One aggregation over students: $lookup the target-week scores, flag attempts per group, and return only the
+    students missing at least one group plus per-group submitted counts."""
+    configs = {name: config for name, config in _missed_work_group_configs(q).items() if name in group_names}
+    target_numbers = sorted({n for config in configs.values() for n in config["target_numbers"]})
+    weeks_by_number = await _resolve_target_weeks(sem, q, target_numbers)
     group_weeks: Dict[str, List[Dict[str, Any]]] = {}
-    for name, config in group_configs.items():
+    for name, config in configs.items():
         docs: List[Dict[str, Any]] = []
+        seen_ids = set()
         for number in config["target_numbers"]:
-            docs.extend(weeks_by_number.get(number, []))
-        # Preserve order while avoiding duplicates.
-        ordered_unique_docs: List[Dict[str, Any]] = []
-        ordered_seen_ids = set()
-        for doc in docs:
-            if doc["id"] in ordered_seen_ids:
-                continue
-            ordered_seen_ids.add(doc["id"])
-            ordered_unique_docs.append(doc)
-        group_weeks[name] = ordered_unique_docs
+            for doc in weeks_by_number.get(number, []):
+                if doc["id"] not in seen_ids:
+                    seen_ids.add(doc["id"])
+                    docs.append(doc)
+        group_weeks[name] = docs[:1] if first_week_only else docs
 
     all_week_ids = sorted({doc["id"] for docs in group_weeks.values() for doc in docs})
-    all_fields = sorted({field for config in group_configs.values() for field in config["fields"]})
-    projection = {"_id": 0, "student_id": 1, "week_id": 1}
-    for field in all_fields:
-        projection[field] = 1
-
-    docs: List[Dict[str, Any]] = []
-    if all_week_ids and student_ids:
-        docs = await db.student_scores.find(
-            {"week_id": {"$in": all_week_ids}, "student_id": {"$in": student_ids}},
-            projection,
-        ).to_list(5000)
-
-    scores_by_student_week: Dict[str, Dict[str, Dict[str, Any]]] = {}
-    for doc in docs:
-        scores_by_student_week.setdefault(doc["student_id"], {})[doc["week_id"]] = doc
-
-    def _has_attempt(student_id: str, week_ids: List[str], fields: List[str]) -> bool:
-        student_docs = scores_by_student_week.get(student_id, {})
-        for week_id in week_ids:
-            doc = student_docs.get(week_id)
-            if not doc:
-                continue
-            for field in fields:
-                if _is_meaningful_score(doc.get(field)):
-                    return True
-        return False
+    all_fields = sorted({field for config in configs.values() for field in config["fields"]})
+    flags = {
+        name: _attempt_flag_expr([w["id"] for w in group_weeks[name]], config["fields"])
+        for name, config in configs.items()
+    }
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": {"class_id": class_id} if class_id else {}},
+        {"$project": {"_id": 0, "id": 1, "full_name": 1, "class_id": 1, "class_name": 1}},
+        score_lookup_stage(all_week_ids, all_fields),
+        {"$project": {"id": 1, "full_name": 1, "class_id": 1, "class_name": 1, "flags": flags}},
+        {"$facet": {
+            "counts": [{"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                **{name: {"$sum": {"$cond": [f"$flags.{name}", 1, 0]}} for name in configs},
+            }}],
+            "missed": [{"$match": {"$or": [{f"flags.{name}": False} for name in configs]}}],
+        }},
+    ]
+    result = await analytics_db.students.aggregate(pipeline, allowDiskUse=True).to_list(1)
+    facet = result[0] if result else {"counts": [], "missed": []}
+    counts = facet["counts"][0] if facet["counts"] else {"total": 0}
+    total = counts.get("total", 0)
 
+    missed = facet["missed"]
     groups: Dict[str, Dict[str, Any]] = {}
-    for name, config in group_configs.items():
-        week_docs = group_weeks[name]
-        week_ids = [w["id"] for w in week_docs]
-        fields = config["fields"]
-
-        missed_students = []
-        for student in students:
-            if _has_attempt(student["id"], week_ids, fields):
-                continue
-            missed_students.append(
-                {
-                    "id": student["id"],
-                    "full_name": student.get("full_name", ""),
-                    "class_id": student.get("class_id"),
-                    "class_name": student.get("class_name", ""),
-                }
-            )
-
-        submitted_count = len(students) - len(missed_students)
-        groups[name] = {
-            "name": name,
-            "fields": fields,
-            "weeks": week_docs,
-            "submitted_count": submitted_count,
+    for name, config in configs.items():
+        missed_students = [
+            {
+                "id": s["id"],
+                "full_name": s.get("full_name", ""),
+                "class_id": s.get("class_id"),
+                "class_name": s.get("class_name", ""),
+            }
+            for s in missed
+            if not s["flags"].get(name)
+        ]
+        groups[name] = {
+            "name": name,
+            "fields": config["fields"],
+            "weeks": group_weeks[name],
+            "submitted_count": counts.get(name, 0),
             "missed_count": len(missed_students),
             "students": missed_students,
         }
+    return {"total_students": total, "groups": groups}
+
+
+@api_router.get("/analytics/missed-quizzes")
+async def get_missed_quiz_students(
+    class_id: Optional[str] = Query(default=None),
+    semester: Optional[int] = Query(default=1),
+    quarter: Optional[int] = Query(default=1),
+):
+    """
+    Returns students who have no quiz attempt recorded for the target quiz week in the selected (semester, quarter).
+    Q1 -> week 4, fields quiz1/quiz2
+    Q2 -> week 16, fields quiz3/quiz4
+    """
+    sem = semester or 1
+    q = quarter or 1
+    result = await compute_missed_work(class_id, sem, q, ["quiz"], first_week_only=True)
+    quiz_group = result["groups"]["quiz"]
+    week_doc = quiz_group["weeks"][0] if quiz_group["weeks"] else None
+    return {
+        "semester": sem,
+        "quarter": q,
+        "quiz_fields": quiz_group["fields"],
+        "week": week_doc,
+        "total_students": result["total_students"],
+        "submitted_count": quiz_group["submitted_count"],
+        "missed_count": quiz_group["missed_count"] if week_doc else 0,
+        "students": quiz_group["students"] if week_doc else [],
+    }
+
 
+@api_router.get("/analytics/missed-assessments")
+async def get_missed_assessment_students(
+    class_id: Optional[str] = Query(default=None),
+    semester: Optional[int] = Query(default=1),
+    quarter: Optional[int] = Query(default=1),
+):
+    """
+    Returns missed-attempt detection for quiz, chapter test, final practical, and final theory
+    in the selected (semester, quarter).
+    """
+    sem = semester or 1
+    q = quarter or 1
+    result = await compute_missed_work(class_id, sem, q, list(_missed_work_group_configs(q)))
+    groups = result["groups"]
     quiz_group = groups["quiz"]
 
     # Backward-compatible top-level quiz shape for existing consumers.
     return {
         "semester": sem,
         "quarter": q,
-        "total_students": len(students),
+        "total_students": result["total_students"],
         "quiz_fields": quiz_group["fields"],
         "week": (quiz_group["weeks"][0] if quiz_group["weeks"] else None),
         "submitted_count": quiz_group["submitted_count"],
@@ -3831,21 +5652,58 @@ async def get_missed_assessment_students(
     }
 
 
+@api_router.get("/analytics/insights/search")
+async def search_student_insights(
+    tag: Optional[str] = Query(default=None, description='"weak:<area>" or "strength:<area>", e.g. weak:Quarter exams'),
+    semester: int = Query(default=1, ge=1, le=2),
+    quarter: int = Query(default=1, ge=1, le=2),
+    grade: Optional[int] = Query(default=None),
+    class_id: Optional[str] = Query(default=None),
+    level: Optional[str] = Query(default=None, description="on_level, approach, below or no_data"),
+    limit: int = Query(default=500, ge=1, le=5000),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+):
+    """Students of the active year by stored insight tag, class, grade and quarter level (one student_insights query)."""
+    query: Dict[str, Any] = {"semester": semester, "quarter": quarter}
+    if tag:
+        if tag.split(":", 1)[0] not in INSIGHT_TAG_KINDS or ":" not in tag:
+            raise HTTPException(status_code=400, detail='tag must look like "weak:Homework" or "strength:Quizzes"')
+        query["tags"] = tag
+    if grade is not None:
+        query["grade"] = grade
+    if class_id:
+        query["class_id"] = class_id
+    teacher_filter = _teacher_class_filter(current_user)
+    if teacher_filter:
+        assigned = teacher_filter["id"]["$in"]
+        query["class_id"] = {"$in": [c for c in assigned if not class_id or c == class_id]}
+    if level:
+        if level not in ("on_level", "approach", "below", "no_data"):
+            raise HTTPException(status_code=400, detail="Unknown performance level")
+        query["performance_level"] = level
+    docs = await analytics_db.student_insights.find(query, {"_id": 0, "stale": 0, "revision": 0}).sort(
+        [("grade", 1), ("class_name", 1), ("full_name", 1)]
+    ).to_list(limit)
+    return {"semester": semester, "quarter": quarter, "count": len(docs), "students": docs}
+
+
 @api_router.get("/analytics/overview")
 async def get_analytics_overview(
     class_id: Optional[str] = Query(default=None),
     semester: Optional[int] = Query(default=1),
     quarter: Optional[int] = Query(default=1),
+    academic_year: Optional[str] = Query(default=None),
 ):
     """
     Analytics overview for the selected semester. Returns insights for BOTH quarter 1 and quarter 2
     independently so the Analytics page can show each quarter's distribution and compare Q1 vs Q2.
     Struggling/excelling lists use the currently selected quarter (q).
     """
-    student_query = {"class_id": class_id} if class_id else {}
-    class_query = {"id": class_id} if class_id else {}
-    students = await db.students.find(student_query, {"_id": 0}).to_list(5000)
-    classes = await db.classes.find(class_query, {"_id": 0}).to_list(200)
+    classes_collection, students_collection, year_filter = await year_roster(academic_year, read_db=analytics_db)
+    student_query = {**year_filter, "class_id": class_id} if class_id else year_filter
+    class_query = {**year_filter, "id": class_id} if class_id else year_filter
+    students = await students_collection.find(student_query, {"_id": 0, "academic_year": 0}).to_list(5000)
+    classes = await classes_collection.find(class_query, {"_id": 0, "academic_year": 0}).to_list(200)
     sem = semester or 1
     q = quarter or 1
     if not students:
@@ -3860,17 +5718,18 @@ async def get_analytics_overview(
             "excelling_students": [],
             "students_per_class": [],
         }
-    class_id_to_name = {c["id"]: c.get("name", c["id"]) for c in classes}
-    for s in students:
-        s["class_name"] = class_id_to_name.get(s.get("class_id"), s.get("class_name", ""))
     student_ids = [s["id"] for s in students]
     # Build score maps for BOTH quarters so we can show each quarter's insight independently
-    scores_by_student_q1 = await build_quarter_score_map(student_ids, sem, 1)
-    scores_by_student_q2 = await build_quarter_score_map(student_ids, sem, 2)
+    scores_by_student_q1 = await build_quarter_score_map(student_ids, sem, 1, read_db=analytics_db, academic_year=academic_year)
+    scores_by_student_q2 = await build_quarter_score_map(student_ids, sem, 2, read_db=analytics_db, academic_year=academic_year)
+    insights_by_student = await load_student_insights(
+        student_ids, sem, q, scores_by_student_q1 if q == 1 else scores_by_student_q2,
+        read_db=analytics_db, academic_year=academic_year,
+    )
     for student in students:
         sw1 = scores_by_student_q1.get(student["id"], {})
         sw2 = scores_by_student_q2.get(student["id"], {})
-        insights = compute_student_insights(sw1 if q == 1 else sw2)
+        insights = insights_by_student[student["id"]]
         student["weak_areas"] = insights["weak_areas"]
         student["strengths"] = insights["strengths"]
         _enrich_student_single_quarter(student, sw1, 1)
@@ -3881,46 +5740,9 @@ async def get_analytics_overview(
         student["performance_level_q1"] = q1_level
         student["performance_level"] = student.get("performance_level_q2") if q == 2 else q1_level
         student["semester_total"] = student.get("quarter2_total") if q == 2 else q1_total
-    # Quarter 1 distribution (from each student's Q1 level/total)
-    counts_q1 = {"on_level": 0, "approach": 0, "below": 0, "no_data": 0}
-    totals_q1: List[float] = []
-    for s in students:
-        level = s.get("performance_level_q1", "no_data")
-        counts_q1[level] = counts_q1.get(level, 0) + 1
-        if s.get("quarter1_total") is not None:
-            totals_q1.append(float(s["quarter1_total"]))
-    with_data_q1 = len(students) - counts_q1.get("no_data", 0)
-    quarter1 = {
-        "distribution": [
-            {"level": "on_level", "count": counts_q1["on_level"]},
-            {"level": "approach", "count": counts_q1["approach"]},
-            {"level": "below", "count": counts_q1["below"]},
-            {"level": "no_data", "count": counts_q1["no_data"]},
-        ],
-        "avg_total": round(sum(totals_q1) / len(totals_q1), 2) if totals_q1 else None,
-        "on_level_rate": round((counts_q1["on_level"] / with_data_q1) * 100, 1) if with_data_q1 else 0,
-        "total_with_data": with_data_q1,
-    }
-    # Quarter 2 distribution
-    counts_q2 = {"on_level": 0, "approach": 0, "below": 0, "no_data": 0}
-    totals_q2: List[float] = []
-    for s in students:
-        level = s.get("performance_level_q2", "no_data")
-        counts_q2[level] = counts_q2.get(level, 0) + 1
-        if s.get("quarter2_total") is not None:
-            totals_q2.append(float(s["quarter2_total"]))
-    with_data_q2 = len(students) - counts_q2.get("no_data", 0)
-    quarter2 = {
-        "distribution": [
-            {"level": "on_level", "count": counts_q2["on_level"]},
-            {"level": "approach", "count": counts_q2["approach"]},
-            {"level": "below", "count": counts_q2["below"]},
-            {"level": "no_data", "count": counts_q2["no_data"]},
-        ],
-        "avg_total": round(sum(totals_q2) / len(totals_q2), 2) if totals_q2 else None,
-        "on_level_rate": round((counts_q2["on_level"] / with_data_q2) * 100, 1) if with_data_q2 else 0,
-        "total_with_data": with_data_q2,
-    }
+    # Each quarter's distribution from the students' Q1 / Q2 level and total
+    quarter1 = _quarter_summary(summarize_levels(students, "performance_level_q1", "quarter1_total"))
+    quarter2 = _quarter_summary(summarize_levels(students, "performance_level_q2", "quarter2_total"))
     struggling_students = [
         {
             "id": s["id"],
@@ -3972,20 +5794,53 @@ async def get_analytics_overview(
     }
 
 
-def _empty_quarter_summary() -> Dict[str, Any]:
+def summarize_levels(
+    students: List[Dict[str, Any]], level_key: str = "performance_level", total_key: str = "semester_total"
+) -> Dict[str, Any]:
+    """Single pass over enriched students: level counts, average total and on-level rate among students with data."""
+    counts = {"on_level": 0, "approach": 0, "below": 0, "no_data": 0}
+    total_sum = 0.0
+    total_count = 0
+    for s in students:
+        level = s.get(level_key, "no_data")
+        counts[level] = counts.get(level, 0) + 1
+        value = s.get(total_key)
+        if value is not None:
+            total_sum += float(value)
+            total_count += 1
+    with_data = len(students) - counts.get("no_data", 0)
     return {
-        "distribution": [
-            {"level": "on_level", "count": 0},
-            {"level": "approach", "count": 0},
-            {"level": "below", "count": 0},
-            {"level": "no_data", "count": 0},
-        ],
-        "avg_total": None,
-        "on_level_rate": 0,
-        "total_with_data": 0,
+        "counts": counts,
+        "avg_total": round(total_sum / total_count, 2) if total_count else None,
+        "on_level_rate": round((counts["on_level"] / with_data) * 100, 1) if with_data else 0,
+        "total_with_data": with_data,
     }
 
 
+def _distribution_list(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    return [{"level": level, "count": counts.get(level, 0)} for level in ("on_level", "approach", "below", "no_data")]
+
+
+def _quarter_summary(stats: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "distribution": _distribution_list(stats["counts"]),
+        "avg_total": stats["avg_total"],
+        "on_level_rate": stats["on_level_rate"],
+        "total_with_data": stats["total_with_data"],
+    }
+
+
+def _empty_quarter_summary() -> Dict[str, Any]:
+    return _quarter_summary(summarize_levels([]))
+
+
+def _class_breakdown(classes: List[Dict[str, Any]], students: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    per_class: Dict[str, int] = {}
+    for s in students:
+        per_class[s.get("class_id")] = per_class.get(s.get("class_id"), 0) + 1
+    return [{"class_name": c["name"], "student_count": per_class.get(c["id"], 0)} for c in classes]
+
+
 async def _build_class_summary_list(
     classes: List[Dict[str, Any]], semester: int = 1, quarter: int = 1
 ) -> List[Dict[str, Any]]:
@@ -3995,7 +5850,7 @@ async def _build_class_summary_list(
     if not classes:
         return []
     class_ids = [c["id"] for c in classes]
-    students = await db.students.find({"class_id": {"$in": class_ids}}, {"_id": 0}).to_list(5000)
+    students = await analytics_db.students.find({"class_id": {"$in": class_ids}}, {"_id": 0}).to_list(5000)
     if not students:
         return [
             {
@@ -4019,8 +5874,8 @@ async def _build_class_summary_list(
         ]
     # Build both Q1 and Q2 so each class shows insights for each quarter independently
     student_ids = [s["id"] for s in students]
-    scores_q1 = await build_quarter_score_map(student_ids, semester, 1)
-    scores_q2 = await build_quarter_score_map(student_ids, semester, 2)
+    scores_q1 = await build_quarter_score_map(student_ids, semester, 1, read_db=analytics_db)
+    scores_q2 = await build_quarter_score_map(student_ids, semester, 2, read_db=analytics_db)
     for student in students:
         sw1 = scores_q1.get(student["id"], {})
         sw2 = scores_q2.get(student["id"], {})
@@ -4038,31 +5893,11 @@ async def _build_class_summary_list(
     summaries = []
     for class_item in classes:
         class_students = student_map.get(class_item["id"], [])
-        # Q1 stats
-        q1_totals = [float(s["quarter1_total"]) for s in class_students if s.get("quarter1_total") is not None]
-        q1_on_level = sum(1 for s in class_students if s.get("performance_level_q1") == "on_level")
-        q1_with_data = sum(1 for s in class_students if s.get("performance_level_q1") != "no_data")
-        q1_rate = round((q1_on_level / q1_with_data) * 100, 1) if q1_with_data else 0
-        q1_avg = round(sum(q1_totals) / len(q1_totals), 2) if q1_totals else None
-        # Q2 stats
-        q2_totals = [float(s["quarter2_total"]) for s in class_students if s.get("quarter2_total") is not None]
-        q2_on_level = sum(1 for s in class_students if s.get("performance_level_q2") == "on_level")
-        q2_with_data = sum(1 for s in class_students if s.get("performance_level_q2") != "no_data")
-        q2_rate = round((q2_on_level / q2_with_data) * 100, 1) if q2_with_data else 0
-        q2_avg = round(sum(q2_totals) / len(q2_totals), 2) if q2_totals else None
+        q1_stats = summarize_levels(class_students, "performance_level_q1", "quarter1_total")
+        q2_stats = summarize_levels(class_students, "performance_level_q2", "quarter2_total")
         # Current quarter (selected) for distribution and avg_total_score
-        quarter_totals = [float(s["semester_total"]) for s in class_students if s.get("semester_total") is not None]
-        counts = {"on_level": 0, "approach": 0, "below": 0, "no_data": 0}
-        needing_support = 0
-        top_performers = 0
-        for s in class_students:
-            level = s.get("performance_level", "no_data")
-            counts[level] = counts.get(level, 0) + 1
-            if level in ("approach", "below"):
-                needing_support += 1
-            if level == "on_level":
-                top_performers += 1
-        avg_total = round(sum(quarter_totals) / len(quarter_totals), 2) if quarter_totals else None
+        current = summarize_levels(class_students)
+        counts = current["counts"]
         summaries.append({
             "class_id": class_item["id"],
             "class_name": class_item["name"],
@@ -4071,14 +5906,14 @@ async def _build_class_summary_list(
             "student_count": len(class_students),
             "avg_quiz_score": None,
             "avg_chapter_score": None,
-            "avg_total_score": avg_total,
+            "avg_total_score": current["avg_total"],
             "distribution": counts,
-            "quarter1_on_level_rate": q1_rate,
-            "quarter2_on_level_rate": q2_rate,
-            "quarter1_avg_total": q1_avg,
-            "quarter2_avg_total": q2_avg,
-            "students_needing_support_count": needing_support,
-            "top_performers_count": top_performers,
+            "quarter1_on_level_rate": q1_stats["on_level_rate"],
+            "quarter2_on_level_rate": q2_stats["on_level_rate"],
+            "quarter1_avg_total": q1_stats["avg_total"],
+            "quarter2_avg_total": q2_stats["avg_total"],
+            "students_needing_support_count": counts["approach"] + counts["below"],
+            "top_performers_count": counts["on_level"],
         })
     return summaries
 
@@ -4119,18 +5954,20 @@ async def get_grade_report(
     grade: int = Query(...),
     semester: Optional[int] = Query(default=1),
     quarter: Optional[int] = Query(default=1),
+    academic_year: Optional[str] = Query(default=None),
 ):
     """
     Grade report for one (semester, quarter) only. Full separation S1Q1, S1Q2, S2Q1, S2Q2.
     """
     sem = semester or 1
     q = quarter or 1
-    classes = await db.classes.find({"grade": grade}, {"_id": 0}).to_list(200)
+    classes_collection, students_collection, year_filter = await year_roster(academic_year, read_db=analytics_db)
+    classes = await classes_collection.find({**year_filter, "grade": grade}, {"_id": 0, "academic_year": 0}).to_list(200)
     class_ids = [c["id"] for c in classes]
-    students = await db.students.find({"class_id": {"$in": class_ids}}, {"_id": 0}).to_list(5000)
-    class_id_to_name = {c["id"]: c.get("name", c["id"]) for c in classes}
+    students = await students_collection.find(
+        {**year_filter, "class_id": {"$in": class_ids}}, {"_id": 0, "academic_year": 0}
+    ).to_list(5000)
     for s in students:
-        s["class_name"] = class_id_to_name.get(s.get("class_id"), s.get("class_name", ""))
         s["full_name"] = s.get("full_name") or f"{s.get('first_name', '')} {s.get('last_name', '')}".strip()
 
     if not students:
@@ -4155,37 +5992,22 @@ async def get_grade_report(
             "class_breakdown": [{"class_name": c["name"], "student_count": 0} for c in classes],
         }
 
-    scores_by_student = await build_quarter_score_map([s["id"] for s in students], sem, q)
+    student_ids = [s["id"] for s in students]
+    scores_by_student = await build_quarter_score_map(student_ids, sem, q, read_db=analytics_db, academic_year=academic_year)
+    insights_by_student = await load_student_insights(
+        student_ids, sem, q, scores_by_student, read_db=analytics_db, academic_year=academic_year
+    )
     for student in students:
         sw = scores_by_student.get(student["id"], {})
-        insights = compute_student_insights(sw)
+        insights = insights_by_student[student["id"]]
         student["weak_areas"] = insights["weak_areas"]
         student["strengths"] = insights["strengths"]
         _enrich_student_single_quarter(student, sw, q)
 
-    report_level_counts = {"on_level": 0, "approach": 0, "below": 0, "no_data": 0}
-    quarter_totals: List[float] = []
-    for s in students:
-        report_level_counts[s["performance_level"]] = report_level_counts.get(s["performance_level"], 0) + 1
-        if s.get("semester_total") is not None:
-            quarter_totals.append(float(s["semester_total"]))
-
-    total_with_data = len(students) - report_level_counts.get("no_data", 0)
-    on_level_count = report_level_counts["on_level"]
-    exceeding_rate = round((on_level_count / total_with_data) * 100, 1) if total_with_data else 0
-    avg_total = round(sum(quarter_totals) / len(quarter_totals), 2) if quarter_totals else None
-
-    quarter_summary = {
-        "distribution": [
-            {"level": "on_level", "count": report_level_counts["on_level"]},
-            {"level": "approach", "count": report_level_counts["approach"]},
-            {"level": "below", "count": report_level_counts["below"]},
-            {"level": "no_data", "count": report_level_counts["no_data"]},
-        ],
-        "avg_total": avg_total,
-        "on_level_rate": exceeding_rate,
-        "total_with_data": total_with_data,
-    }
+    stats = summarize_levels(students)
+    avg_total = stats["avg_total"]
+    exceeding_rate = stats["on_level_rate"]
+    quarter_summary = _quarter_summary(stats)
     empty = _empty_quarter_summary()
     quarter1 = quarter_summary if q == 1 else empty
     quarter2 = quarter_summary if q == 2 else empty
@@ -4225,10 +6047,7 @@ async def get_grade_report(
         for s in students
         if s.get("performance_level") == "on_level"
     ]
-    class_breakdown = [
-        {"class_name": c["name"], "student_count": len([s for s in students if s["class_id"] == c["id"]])}
-        for c in classes
-    ]
+    class_breakdown = _class_breakdown(classes, students)
     return {
         "grade": grade,
         "semester": sem,
@@ -4247,6 +6066,9 @@ async def get_grade_report(
 
 
 async def get_report_settings() -> Dict[str, Any]:
+    cached = cache_get("settings", "weekly_report")
+    if cached is not None:
+        return dict(cached)
     settings = await db.report_settings.find_one({"id": "weekly_report"}, {"_id": 0})
     if not settings:
         settings = {
@@ -4256,9 +6078,10 @@ async def get_report_settings() -> Dict[str, Any]:
             "updated_at": iso_now(),
         }
         await db.report_settings.insert_one(settings)
-        # Return the settings without MongoDB _id
-        return settings
-    return settings
+        # insert_one adds _id to the dict; return the settings without it
+        settings.pop("_id", None)
+    cache_set("settings", "weekly_report", settings)
+    return dict(settings)
 
 
 @api_router.get("/reports/settings")
@@ -4275,15 +6098,21 @@ async def update_report_settings(payload: ReportSettings):
         {"$set": {"id": "weekly_report", **update_data}},
         upsert=True,
     )
+    await publish_cache_invalidation("settings", "weekly_report")
     return {"status": "scheduled", **update_data}
 
 
 async def get_promotion_settings() -> Dict[str, Any]:
+    cached = cache_get("settings", "promotion")
+    if cached is not None:
+        return dict(cached)
     settings = await db.app_settings.find_one({"id": "promotion"}, {"_id": 0})
     if not settings:
         settings = {"id": "promotion", "enabled": False, "updated_at": iso_now()}
         await db.app_settings.insert_one(settings)
-    return settings
+        settings.pop("_id", None)
+    cache_set("settings", "promotion", settings)
+    return dict(settings)
 
 
 @api_router.get("/settings/promotion")
@@ -4296,13 +6125,14 @@ async def update_promotion_settings(payload: Dict[str, bool], current_user: Dict
     enabled = bool(payload.get("enabled"))
     settings = {"id": "promotion", "enabled": enabled, "updated_at": iso_now()}
     await db.app_settings.update_one({"id": "promotion"}, {"$set": settings}, upsert=True)
+    await publish_cache_invalidation("settings", "promotion")
     return settings
 
 
 @api_router.get("/calendar/events", response_model=List[CalendarEventRecord])
 async def get_calendar_events(current_user: Dict[str, Any] = Depends(require_admin)):
-    events = await db.calendar_events.find({}, {"_id": 0}).to_list(500)
-    return events
+    events = await db.calendar_events.find({}, model_projection(CalendarEventRecord)).to_list(500)
+    return trusted_list(events, CalendarEventRecord)
 
 
 @api_router.get("/calendar/status")
@@ -4321,13 +6151,38 @@ async def sync_calendar_events(current_user: Dict[str, Any] = Depends(require_ad
     return {"status": "synced", "count": count}
 
 
-@api_router.get("/notifications", response_model=List[NotificationLogRecord])
-async def get_notifications(event_type: Optional[str] = Query(None), current_user: Dict[str, Any] = Depends(require_admin)):
+def _notification_query(event_type: Optional[str]) -> Dict[str, Any]:
     query: Dict[str, Any] = {}
     if event_type:
         query["event_type"] = event_type
-    logs = await db.notification_logs.find(query, {"_id": 0}).sort("created_at", -1).to_list(500)
-    return logs
+    return query
+
+
+@api_router.get("/notifications", response_model=List[NotificationLogRecord])
+async def get_notifications(
+    event_type: Optional[str] = Query(None),
+    limit: int = Query(NOTIFICATION_PAGE_SIZE, ge=1, le=NOTIFICATION_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    current_user: Dict[str, Any] = Depends(require_admin),
+):
+    """Newest first. When more logs remain, X-Next-Cursor holds the value to pass as `cursor` for the next page."""
+    query = _notification_query(event_type)
+    if cursor:
+        created_at, _, log_id = cursor.partition("|")
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": log_id}},
+        ]
+    logs = await db.notification_logs.find(query, model_projection(NotificationLogRecord)).sort(NOTIFICATION_SORT).to_list(limit + 1)
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = f"{logs[-1]['created_at']}|{logs[-1]['id']}"
+    result = trusted_list(logs, NotificationLogRecord)
+    if next_cursor:
+        # trusted_list returns the response itself, so the header goes on it directly.
+        result.headers["X-Next-Cursor"] = next_cursor
+    return result
 
 
 @api_router.delete("/notifications")
@@ -4337,22 +6192,50 @@ async def remove_all_notifications(current_user: Dict[str, Any] = Depends(requir
     return {"status": "ok", "deleted_count": result.deleted_count}
 
 
+async def _stream_notifications_csv(query: Dict[str, Any]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the Arabic messages as UTF-8.
+    buffer.write("\ufeff")
+    writer.writerow(NOTIFICATION_EXPORT_HEADERS)
+    async for log in db.notification_logs.find(query, {"_id": 0}).sort(NOTIFICATION_SORT).batch_size(1000):
+        writer.writerow(notification_export_row(log))
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
 @api_router.get("/notifications/export")
 async def export_notifications(format: str = Query("pdf"), event_type: Optional[str] = Query(None), current_user: Dict[str, Any] = Depends(require_admin)):
-    query: Dict[str, Any] = {}
-    if event_type:
-        query["event_type"] = event_type
-    logs = await db.notification_logs.find(query, {"_id": 0}).sort("created_at", -1).to_list(500)
+    query = _notification_query(event_type)
+    if format == "csv":
+        headers = {"Content-Disposition": "attachment; filename=notifications.csv"}
+        return StreamingResponse(_stream_notifications_csv(query), media_type="text/csv; charset=utf-8", headers=headers)
+    if format not in ("excel", "csv"):
+        total = await db.notification_logs.count_documents(query, limit=NOTIFICATION_PDF_MAX_ROWS + 1)
+        if total > NOTIFICATION_PDF_MAX_ROWS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"More than {NOTIFICATION_PDF_MAX_ROWS} notifications: export as CSV or Excel, or filter by event type",
+            )
+    cursor = db.notification_logs.find(query, {"_id": 0}).sort(NOTIFICATION_SORT).batch_size(1000)
+    output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
     if format == "excel":
-        content = generate_notifications_excel(logs)
+        workbook, sheet = new_notifications_workbook()
+        async for log in cursor:
+            sheet.append(notification_export_row(log))
+        await asyncio.to_thread(workbook.save, output)
         filename = "notifications.xlsx"
-        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        media_type = EXCEL_MEDIA_TYPE
     else:
-        content = generate_notifications_pdf(logs)
+        rows = [notification_export_row(log) async for log in cursor]
+        await asyncio.to_thread(generate_notifications_pdf, rows, output)
         filename = "notifications.pdf"
         media_type = "application/pdf"
     headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(io.BytesIO(content), media_type=media_type, headers=headers)
+    return StreamingResponse(iter_file_chunks(output), media_type=media_type, headers=headers)
 
 
 @api_router.get("/notifications/templates")
@@ -4366,9 +6249,18 @@ async def update_sms_templates(payload: SmsTemplatesPayload, current_user: Dict[
     templates = payload.templates
     settings = {"id": "sms_templates", "templates": templates, "updated_at": iso_now()}
     await db.app_settings.update_one({"id": "sms_templates"}, {"$set": settings}, upsert=True)
+    await publish_cache_invalidation("settings", "sms_templates")
     return {"status": "updated", "templates": templates}
 
 
+async def enter_login_school(school_id: Optional[str]) -> None:
+    """Point this login request at the requested school; unknown schools are rejected before any user lookup."""
+    school_id = (school_id or "").strip().lower() or DEFAULT_SCHOOL_ID
+    if school_id != DEFAULT_SCHOOL_ID and not await root_db.schools.find_one({"_id": school_id}, {"_id": 1}):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown school")
+    _current_school.set(school_id)
+
+
 # One-time recovery credentials (must be configured in env to enable recovery flow).
 RECOVERY_PASSWORD = (os.environ.get("RECOVERY_PASSWORD") or "").strip()
 RECOVERY_ID = (os.environ.get("RECOVERY_ID") or "").strip()
@@ -4376,6 +6268,7 @@ RECOVERY_ID = (os.environ.get("RECOVERY_ID") or "").strip()
 
 @auth_router.post("/login", response_model=AuthToken)
 async def login(payload: AuthLogin):
+    await enter_login_school(payload.school_id)
     try:
         identifier = payload.username.strip()
         if not identifier:
@@ -4417,7 +6310,7 @@ async def login(payload: AuthLogin):
                     "updated_at": iso_now(),
                 }
                 await db.users.insert_one(new_user)
-                token = create_access_token({"sub": new_user["id"], "role": new_user["role_name"]})
+                token = create_access_token({"sub": new_user["id"], "role": new_user["role_name"], "school_id": current_school_id()})
                 return AuthToken(access_token=token)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
@@ -4431,11 +6324,12 @@ async def login(payload: AuthLogin):
             # One-time recovery: user has no password set yet, set it and log in
             new_hash = get_password_hash(RECOVERY_PASSWORD)
             await db.users.update_one({"id": user["id"]}, {"$set": {"password_hash": new_hash}})
+            await publish_cache_invalidation("users", user["id"])
             password_ok = True
 
         if not password_ok:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-        token = create_access_token({"sub": user["id"], "role": user["role_name"]})
+        token = create_access_token({"sub": user["id"], "role": user["role_name"], "school_id": current_school_id()})
         return AuthToken(access_token=token)
     except HTTPException:
         raise
@@ -4464,6 +6358,7 @@ async def login_google(payload: AuthGooglePayload):
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Google sign-in is not configured. Set GOOGLE_CLIENT_ID in the server environment.",
         )
+    await enter_login_school(payload.school_id)
     id_token_str = (payload.id_token or "").strip()
     if not id_token_str:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="id_token is required")
@@ -4485,7 +6380,7 @@ async def login_google(payload: AuthGooglePayload):
         {"_id": 0},
     )
     if user:
-        token = create_access_token({"sub": user["id"], "role": user["role_name"]})
+        token = create_access_token({"sub": user["id"], "role": user["role_name"], "school_id": current_school_id()})
         return AuthToken(access_token=token)
     teacher_role = await db.roles.find_one({"name": "Teacher"}, {"_id": 0})
     if not teacher_role:
@@ -4521,7 +6416,7 @@ async def login_google(payload: AuthGooglePayload):
         "schedule": default_schedule(),
     }
     await db.users.insert_one(new_user)
-    token = create_access_token({"sub": new_user["id"], "role": new_user["role_name"]})
+    token = create_access_token({"sub": new_user["id"], "role": new_user["role_name"], "school_id": current_school_id()})
     return AuthToken(access_token=token)
 
 
@@ -4536,6 +6431,7 @@ async def reset_all_passwords(payload: ResetAllPasswordsPayload):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password required")
     new_hash = get_password_hash(pwd)
     result = await db.users.update_many({}, {"$set": {"password_hash": new_hash}})
+    await publish_cache_invalidation("users")
     return {"status": "ok", "updated_count": result.modified_count, "message": f"All users can now log in with the new password."}
 
 
@@ -4558,7 +6454,7 @@ async def export_grade_report(
     analysis_actions: Optional[str] = Query(default=None),
     analysis_recommendations: Optional[str] = Query(default=None),
 ):
-    summary = await get_grade_report(grade, semester, quarter)
+    summary = await get_grade_report(grade, semester, quarter, academic_year=None)
     if format == "excel":
         content = generate_report_excel(summary, grade)
         filename = f"grade_{grade}_report.xlsx"
@@ -4587,21 +6483,15 @@ async def export_analytics_summary(
 ):
     sem = semester or 1
     q = quarter or 1
-    students = await db.students.find({}, {"_id": 0}).to_list(5000)
-    classes = await db.classes.find({}, {"_id": 0}).to_list(200)
+    students = await analytics_db.students.find({}, {"_id": 0}).to_list(5000)
+    classes = await analytics_db.classes.find({}, {"_id": 0}).to_list(200)
     if students:
-        scores_by_student = await build_quarter_score_map([s["id"] for s in students], sem, q)
+        scores_by_student = await build_quarter_score_map([s["id"] for s in students], sem, q, read_db=analytics_db)
         for student in students:
             sw = scores_by_student.get(student["id"], {})
             _enrich_student_single_quarter(student, sw, q)
     summary = build_summary(students, classes)
-    summary["class_breakdown"] = [
-        {
-            "class_name": c["name"],
-            "student_count": len([s for s in students if s["class_id"] == c["id"]])
-        }
-        for c in classes
-    ]
+    summary["class_breakdown"] = _class_breakdown(classes, students)
     if format == "excel":
         content = generate_report_excel(summary, "All Grades")
         filename = "analytics_summary.xlsx"
@@ -4828,15 +6718,15 @@ async def import_excel(
                         column_lookup["student_name"] = c
                         break
 
-    classes = await db.classes.find({}, {"_id": 0}).to_list(200)
+    # name_key -> class document (None when missing), filled lazily with indexed lookups.
+    class_map: Dict[str, Optional[Dict[str, Any]]] = {}
 
-    def normalize_class_name(value: str) -> str:
-        cleaned = re.sub(r"[^A-Za-z0-9]", "", value.upper())
-        if cleaned.startswith("G"):
-            cleaned = cleaned[1:]
-        return cleaned
+    async def find_class(name: str) -> Optional[Dict[str, Any]]:
+        key = class_name_key(name)
+        if key not in class_map:
+            class_map[key] = await db.classes.find_one({"name_key": key}, {"_id": 0})
+        return class_map[key]
 
-    class_map = {normalize_class_name(cls["name"]): cls for cls in classes}
     inferred_class_name = None
     for candidate in [file.filename, best_sheet]:
         if not candidate:
@@ -4847,17 +6737,11 @@ async def import_excel(
             break
     default_class_doc = None
     if inferred_class_name:
-        default_class_doc = class_map.get(normalize_class_name(inferred_class_name))
+        default_class_doc = await find_class(inferred_class_name)
         if not default_class_doc:
             parsed = parse_class_name(inferred_class_name)
-            class_record = ClassRecord(
-                name=inferred_class_name,
-                grade=parsed.get("grade"),
-                section=parsed.get("section"),
-            )
-            await db.classes.insert_one(class_record.model_dump())
-            default_class_doc = class_record.model_dump()
-            class_map[normalize_class_name(inferred_class_name)] = default_class_doc
+            default_class_doc, _ = await get_or_create_class(inferred_class_name, parsed.get("grade"), parsed.get("section"))
+            class_map[class_name_key(inferred_class_name)] = default_class_doc
     created_students = 0
     updated_students = 0
     existing_students_docs = await db.students.find({}, {"_id": 0, "id": 1, "full_name": 1, "class_id": 1}).to_list(20000)
@@ -4873,6 +6757,8 @@ async def import_excel(
 
     created_classes = 0
     processed_rows = 0
+    imported_student_ids: List[str] = []
+    score_entries = []
     for _, row in df.iterrows():
         student_name = row.get(column_lookup["student_name"])
         class_doc = None
@@ -4885,23 +6771,17 @@ async def import_excel(
             if not class_name:
                 class_name = None
             else:
-                class_doc = class_map.get(normalize_class_name(class_name))
+                class_doc = await find_class(class_name)
             if not class_doc and class_name:
                 # Try to create new class from class name (e.g. 5A, 6B) so enrollment works without pre-creating classes
                 parsed = parse_class_name(class_name)
                 if parsed.get("grade") is not None and parsed.get("section"):
                     new_class_name = f"{parsed['grade']}{parsed['section']}"
-                    class_doc = class_map.get(normalize_class_name(new_class_name))
+                    class_doc = await find_class(new_class_name)
                     if not class_doc:
-                        class_record = ClassRecord(
-                            name=new_class_name,
-                            grade=parsed["grade"],
-                            section=parsed["section"],
-                        )
-                        await db.classes.insert_one(class_record.model_dump())
-                        class_doc = class_record.model_dump()
-                        class_map[normalize_class_name(new_class_name)] = class_doc
-                        created_classes += 1
+                        class_doc, created = await get_or_create_class(new_class_name, parsed["grade"], parsed["section"])
+                        class_map[class_name_key(new_class_name)] = class_doc
+                        created_classes += int(created)
                 else:
                     continue
         if not class_doc and default_class_doc:
@@ -4911,7 +6791,7 @@ async def import_excel(
             section_value = row.get(column_lookup.get("section"))
             if grade_value == grade_value and section_value == section_value:
                 class_name = f"{str(grade_value).strip()}{str(section_value).strip()}".upper()
-                class_doc = class_map.get(normalize_class_name(class_name))
+                class_doc = await find_class(class_name)
                 if not class_doc:
                     # Marks-only import: do not create new classes; skip row
                     continue
@@ -4975,11 +6855,8 @@ async def import_excel(
                 set_fields = {k: payload.get(k) for k in fields_in_file if _has_value(payload.get(k))}
                 set_fields["updated_at"] = iso_now()
                 if set_fields:
-                    await db.student_scores.update_one(
-                        {"student_id": student_id, "week_id": week_id},
-                        {"$set": set_fields},
-                        upsert=True,
-                    )
+                    score_entries.append((student_id, week_id, set_fields))
+            imported_student_ids.append(student_id)
             processed_rows += 1
             continue
         payload["updated_at"] = iso_now()
@@ -5008,17 +6885,21 @@ async def import_excel(
             set_fields = {k: payload.get(k) for k in fields_in_file if _has_value(payload.get(k))}
             set_fields["updated_at"] = iso_now()
             if set_fields:
-                await db.student_scores.update_one(
-                    {"student_id": student_id, "week_id": week_id},
-                    {"$set": set_fields},
-                    upsert=True,
-                )
+                score_entries.append((student_id, week_id, set_fields))
+        imported_student_ids.append(student_id)
         processed_rows += 1
+    await write_scores(score_entries)
     if processed_rows == 0:
         raise HTTPException(
             status_code=400,
             detail="No students were imported. Please use an Excel file with one column for student names and one for class (e.g. 4A, 5B, 6A). Columns can be in any order.",
         )
+    await publish_cache_invalidation("class_performance")
+    await publish_cache_invalidation("transcripts")
+    if week_id:
+        await refresh_insights_for_week(imported_student_ids, week_id)
+    else:
+        await refresh_student_insights(imported_student_ids)
     await log_user_action(
         current_user,
         "import_excel",
@@ -5031,33 +6912,761 @@ async def import_excel(
     }
 
 
-async def send_weekly_admin_reports():
+async def _get_weekly_report_grades(settings: Dict[str, Any]) -> List[int]:
+    """Grades covered by the weekly email: settings.grades if configured, else every grade with classes."""
+    grades = [g for g in (settings.get("grades") or []) if g is not None]
+    if not grades:
+        grades = [g for g in await db.classes.distinct("grade") if g is not None]
+    if not grades:
+        grades = [settings.get("grade", 4)]
+    return sorted({int(g) for g in grades})
+
+
+async def _send_weekly_grade_report(grade: int, recipients: List[str], semester: int, quarter: int) -> Dict[str, Any]:
+    """Build one grade snapshot, render PDF + Excel from it in the process pool, send in a worker thread."""
+    timing: Dict[str, Any] = {"grade": grade, "status": "sent"}
+    started = time.perf_counter()
     try:
-        settings = await get_report_settings()
-        grade = int(settings.get("grade", 4))
-        summary = await get_grade_report(grade)
-        report_pdf = generate_report_pdf(summary, grade)
-        report_excel = generate_report_excel(summary, grade)
-        admins = await db.users.find({"role_name": "Admin", "active": True}, {"_id": 0}).to_list(200)
-        recipients = [admin["email"] for admin in admins if admin.get("email")]
-        if recipients:
-            send_report_email(recipients, report_pdf, report_excel, grade)
+        summary = await get_grade_report(grade, semester, quarter, academic_year=None)
+        timing["snapshot_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        mark = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        report_pdf, report_excel = await loop.run_in_executor(
+            get_report_render_pool(), render_grade_report_files, summary, grade
+        )
+        timing["render_ms"] = round((time.perf_counter() - mark) * 1000, 1)
+        timing["pdf_bytes"] = len(report_pdf)
+        timing["excel_bytes"] = len(report_excel)
+        mark = time.perf_counter()
+        await asyncio.to_thread(send_report_email, recipients, report_pdf, report_excel, grade)
+        timing["send_ms"] = round((time.perf_counter() - mark) * 1000, 1)
     except Exception as exc:
-        logger.error("Weekly report email failed: %s", exc)
+        logger.error("Weekly report for grade %s failed: %s", grade, exc)
+        timing["status"] = "failed"
+        timing["error"] = str(exc)
+    timing["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return timing
+
+
+async def send_weekly_admin_reports() -> Dict[str, Any]:
+    settings = await get_report_settings()
+    admins = await db.users.find({"role_name": "Admin", "active": True}, {"_id": 0}).to_list(200)
+    recipients = [admin["email"] for admin in admins if admin.get("email")]
+    if not recipients:
+        return {"grades": [], "failed": 0, "message": "No admin recipients"}
+    grades = await _get_weekly_report_grades(settings)
+    semester = int(settings.get("semester") or 1)
+    quarter = int(settings.get("quarter") or 1)
+    started_at = iso_now()
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *[_send_weekly_grade_report(grade, recipients, semester, quarter) for grade in grades]
+    )
+    run = {
+        "id": str(uuid.uuid4()),
+        "job": "weekly_admin_report",
+        "transport": REPORT_EMAIL_TRANSPORT,
+        "started_at": started_at,
+        "finished_at": iso_now(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "grades": results,
+    }
+    await db.report_runs.insert_one(run)
+    for item in results:
+        logger.info("Weekly report grade %s: %s in %sms", item["grade"], item["status"], item["total_ms"])
+    failed = [item["grade"] for item in results if item["status"] != "sent"]
+    if failed and len(failed) == len(results):
+        raise RuntimeError(f"Weekly report failed for all grades: {failed}")
+    return {"grades": grades, "failed": len(failed)}
+
+
+async def send_weekly_admin_reports_all_schools() -> Dict[str, Any]:
+    """Weekly reports for every school in turn; one school's failure does not stop the others."""
+    results: Dict[str, Any] = {}
+    failed = 0
+    for school_id in await list_school_ids():
+        with school_context(school_id):
+            try:
+                results[school_id] = await send_weekly_admin_reports()
+            except Exception as exc:
+                logger.exception("Weekly report failed for school %s", school_id)
+                results[school_id] = {"error": str(exc)}
+                failed += 1
+    if failed and failed == len(results):
+        raise RuntimeError("Weekly report failed for all schools")
+    return results
+
+
+# Cluster-safe scheduling: every worker runs an AsyncIOScheduler, but scheduled jobs only execute on the worker
+# holding the Mongo lease in scheduler_locks. The lease is renewed every SCHEDULER_LEASE_SECONDS / 3; if the leader
+# dies the lease expires and the next renewal on another worker takes over.
+SCHEDULER_LEASE_NAME = "scheduler_leader"
+SCHEDULER_LEASE_SECONDS = max(15, int(os.environ.get("SCHEDULER_LEASE_SECONDS") or 60))
+_scheduler_is_leader = False
+
+
+async def acquire_scheduler_lease() -> bool:
+    """Take or renew the scheduler lease. Returns True when this worker is the leader."""
+    global _scheduler_is_leader
+    now = datetime.now(timezone.utc)
+    try:
+        await root_db.scheduler_locks.find_one_and_update(
+            {
+                "_id": SCHEDULER_LEASE_NAME,
+                "$or": [{"owner": WORKER_ID}, {"expires_at": {"$lt": now}}],
+            },
+            {
+                "$set": {
+                    "owner": WORKER_ID,
+                    "renewed_at": now,
+                    "expires_at": now + timedelta(seconds=SCHEDULER_LEASE_SECONDS),
+                }
+            },
+            upsert=True,
+        )
+        leader = True
+    except DuplicateKeyError:
+        # Lease document exists and belongs to another live worker.
+        leader = False
+    except Exception as exc:
+        logger.warning("Scheduler lease renewal failed: %s", exc)
+        leader = False
+    if leader != _scheduler_is_leader:
+        logger.info("Scheduler leadership %s by %s", "acquired" if leader else "lost", WORKER_ID)
+    _scheduler_is_leader = leader
+    return leader
+
+
+async def release_scheduler_lease():
+    global _scheduler_is_leader
+    if _scheduler_is_leader:
+        await root_db.scheduler_locks.delete_one({"_id": SCHEDULER_LEASE_NAME, "owner": WORKER_ID})
+        _scheduler_is_leader = False
+
+
+async def _job_already_ran(job_name: str, fired_at: datetime) -> bool:
+    """True if any worker recorded a run of this job for the same trigger (within 5 minutes of fired_at)."""
+    existing = await root_db.job_runs.find_one(
+        {"job": job_name, "fired_at": {"$gte": fired_at - timedelta(minutes=5)}}, {"_id": 0, "id": 1}
+    )
+    return existing is not None
+
+
+async def run_scheduled_job(job_name: str, func):
+    """Run a scheduled job on the lease holder only, recording duration and outcome in job_runs.
+    Non-leaders keep polling for one lease period so a leader that died at trigger time is failed over."""
+    fired_at = datetime.now(timezone.utc)
+    deadline = time.monotonic() + SCHEDULER_LEASE_SECONDS + 5
+    while not await acquire_scheduler_lease():
+        if await _job_already_ran(job_name, fired_at) or time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(5)
+    if await _job_already_ran(job_name, fired_at):
+        return
+    run = {
+        "id": str(uuid.uuid4()),
+        "job": job_name,
+        "owner": WORKER_ID,
+        "fired_at": fired_at,
+        "started_at": iso_now(),
+        "status": "running",
+    }
+    await root_db.job_runs.insert_one(run)
+    started = time.perf_counter()
+    update: Dict[str, Any] = {"status": "success"}
+    try:
+        result = await func()
+        if isinstance(result, dict):
+            update["result"] = result
+    except Exception as exc:
+        logger.exception("Scheduled job %s failed", job_name)
+        update["status"] = "failed"
+        update["error"] = str(exc)
+    update["finished_at"] = iso_now()
+    update["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    SCHEDULED_JOB_DURATION.observe((job_name, update["status"]), update["duration_ms"] / 1000)
+    await root_db.job_runs.update_one({"id": run["id"]}, {"$set": update})
+
+
+@api_router.get("/scheduler/status")
+async def get_scheduler_status(current_user: Dict[str, Any] = Depends(require_admin)):
+    lease = await root_db.scheduler_locks.find_one({"_id": SCHEDULER_LEASE_NAME})
+    runs = await root_db.job_runs.find({}, {"_id": 0}).sort("fired_at", -1).to_list(50)
+    return {
+        "worker_id": WORKER_ID,
+        "is_leader": _scheduler_is_leader,
+        "leader": lease.get("owner") if lease else None,
+        "lease_expires_at": lease.get("expires_at") if lease else None,
+        "runs": runs,
+    }
+
+
+@app.on_event("startup")
+async def start_cache_invalidation_bus():
+    await start_cache_bus()
 
 
 @app.on_event("startup")
 async def start_scheduler():
+    try:
+        await root_db.scheduler_locks.create_index([("expires_at", 1)], expireAfterSeconds=0)
+        await root_db.job_runs.create_index([("job", 1), ("fired_at", -1)])
+    except Exception as exc:
+        logger.warning("Scheduler index setup failed: %s", exc)
     if not scheduler.running:
         scheduler.start()
     scheduler.add_job(
-        send_weekly_admin_reports,
+        acquire_scheduler_lease,
+        "interval",
+        seconds=max(5, SCHEDULER_LEASE_SECONDS // 3),
+        id="scheduler_lease",
+        replace_existing=True,
+        next_run_time=datetime.now(REPORT_TIMEZONE),
+    )
+    scheduler.add_job(
+        run_scheduled_job,
         CronTrigger(day_of_week="sun", hour=8, minute=0, timezone=REPORT_TIMEZONE),
+        args=["weekly_admin_report", send_weekly_admin_reports_all_schools],
         id="weekly_admin_report",
         replace_existing=True,
     )
 
 
+# Startup migrations: each entry runs once, is recorded in schema_migrations with its duration, and is skipped on
+# later boots, so a warm start only reads the applied versions. Append new migrations; never renumber old ones.
+MIGRATION_STALE_MINUTES = 10
+
+
+async def migrate_create_indexes():
+    """Performance: ensure key indexes exist for frequent reads/writes."""
+    index_specs = {
+        "students": [[("id", 1)], [("class_id", 1)], [("full_name", 1), ("class_id", 1)]],
+        "student_scores": [[("student_id", 1)], [("week_id", 1)], [("student_id", 1), ("week_id", 1)]],
+        "weeks": [[("id", 1)], [("semester", 1), ("quarter", 1), ("number", 1)]],
+        "classes": [[("id", 1)], [("name", 1)]],
+        "users": [[("id", 1)], [("role_name", 1)]],
+    }
+    for collection, keys_list in index_specs.items():
+        await db[collection].create_indexes([IndexModel(keys) for keys in keys_list])
+
+
+async def migrate_seed_default_records():
+    if await db.classes.count_documents({}) == 0:
+        default_classes = []
+        for grade in range(4, 9):
+            for section in ["A", "B"]:
+                name = f"{grade}{section}"
+                default_classes.append(
+                    ClassRecord(name=name, grade=grade, section=section).model_dump()
+                )
+        await db.classes.insert_many(default_classes)
+    if await db.roles.count_documents({}) == 0:
+        roles = [
+            RoleRecord(name="Admin", description="Full access", permissions=["all"]).model_dump(),
+            RoleRecord(
+                name="Teacher",
+                description="Manage classes and students",
+                permissions=["students:view", "scores:edit", "remedial:manage", "reports:view", "timetable:manage"],
+            ).model_dump(),
+            RoleRecord(name="Counselor", description="Remedial and rewards", permissions=["remedial", "rewards", "reports"]).model_dump(),
+        ]
+        await db.roles.insert_many(roles)
+    if await db.users.count_documents({}) == 0:
+        admin_role = await db.roles.find_one({"name": "Admin"}, {"_id": 0})
+        if admin_role:
+            admin_user = UserRecord(
+                name="Administrator",
+                email="admin@school.local",
+                username="admin",
+                role_id=admin_role["id"],
+                role_name=admin_role["name"],
+                active=True,
+                permissions=admin_role.get("permissions", []),
+                password_hash=get_password_hash("Admin@123"),
+            )
+            await db.users.insert_one(admin_user.model_dump())
+    admin_user = await db.users.find_one({"role_name": "Admin"}, {"_id": 0})
+    if admin_user:
+        updates = {}
+        if not admin_user.get("username"):
+            updates["username"] = "admin"
+        if not admin_user.get("password_hash"):
+            updates["password_hash"] = get_password_hash("Admin@123")
+        if updates:
+            await db.users.update_one({"id": admin_user["id"]}, {"$set": updates})
+            await publish_cache_invalidation("users", admin_user["id"])
+
+
+async def migrate_week_semester_quarter():
+    """Set semester/quarter on existing weeks (1-9 -> Q1, 10-18 -> Q2) for full S1Q1/S1Q2/S2Q1/S2Q2 separation."""
+    changed = (await db.weeks.update_many({"semester": {"$exists": False}}, {"$set": {"semester": 1}})).modified_count
+    result = await db.weeks.update_many(
+        {"$or": [{"quarter": {"$exists": False}}, {"quarter": {"$nin": [1, 2]}}]},
+        [{"$set": {"quarter": {"$cond": [{"$lte": [{"$ifNull": ["$number", 1]}, 9]}, 1, 2]}}}],
+    )
+    if changed or result.modified_count:
+        await publish_cache_invalidation("weeks")
+
+
+async def migrate_seed_default_weeks():
+    existing_weeks = await db.weeks.find({}, {"_id": 0, "number": 1, "semester": 1, "quarter": 1}).to_list(None)
+    existing_map = {}
+    for week in existing_weeks:
+        sem = week.get("semester", 1)
+        q = week.get("quarter", 1 if week.get("number", 1) <= 9 else 2)
+        existing_map.setdefault((sem, q), set()).add(week.get("number"))
+    weeks_to_insert = []
+    academic_year = await get_active_academic_year()
+    for semester in [1, 2]:
+        for quarter in [1, 2]:
+            lo, hi = (1, 9) if quarter == 1 else (10, 18)
+            existing_numbers = existing_map.get((semester, quarter), set())
+            for i in range(lo, hi + 1):
+                if i not in existing_numbers:
+                    weeks_to_insert.append(WeekRecord(
+                        semester=semester, quarter=quarter, number=i, label=f"Week {i}", academic_year=academic_year
+                    ).model_dump())
+    if weeks_to_insert:
+        await db.weeks.insert_many(weeks_to_insert)
+        await publish_cache_invalidation("weeks")
+
+
+async def migrate_remove_sample_student():
+    """Remove legacy sample student "Sara Ali" (4A) if present – was never a real student."""
+    sample_ids = await db.students.distinct("id", {"full_name": "Sara Ali", "class_name": "4A"})
+    if sample_ids:
+        await db.student_scores.delete_many({"student_id": {"$in": sample_ids}})
+        await db.students.delete_many({"id": {"$in": sample_ids}})
+        logger.info("Removed legacy sample student Sara Ali (4A)")
+
+
+# Index specification: one entry per collection, matching the filter + sort shapes the endpoints issue. Each migration
+# that changes a collection's entry applies it with ensure_indexes([collection]); QUERY_SHAPES below is what
+# /diagnostics/indexes and tests/test_query_shapes.py explain.
+INDEX_SPECS: Dict[str, List[tuple]] = {
+    "students": [
+        ([("id", 1)], {}),
+        ([("class_id", 1)], {}),
+        ([("full_name", 1), ("class_id", 1)], {}),
+        ([("deletion_id", 1)], {"partialFilterExpression": {"deletion_id": {"$exists": True}}}),
+    ],
+    "student_scores": [([("week_id", 1)], {}), ([("student_id", 1), ("week_id", 1)], {"unique": True})],
+    "weeks": [([("id", 1)], {}), ([("semester", 1), ("quarter", 1), ("number", 1)], {})],
+    "classes": [
+        ([("id", 1)], {}),
+        ([("name", 1)], {}),
+        ([("name_key", 1)], {"unique": True, "partialFilterExpression": {"name_key": {"$type": "string"}}}),
+    ],
+    "users": [([("id", 1)], {}), ([("role_name", 1)], {}), ([("assigned_class_ids", 1)], {})],
+    "notification_logs": [
+        ([("event_type", 1), ("created_at", -1), ("id", -1)], {}),
+        ([("created_at", -1), ("id", -1)], {}),
+        ([("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ],
+    "audit_logs": [([("target_user_id", 1), ("timestamp", -1), ("id", -1)], {})],
+    "remedial_plans": [([("id", 1)], {}), ([("created_at", -1)], {})],
+    "rewards": [([("id", 1)], {}), ([("created_at", -1)], {})],
+    "reward_events": [([("student_id", 1), ("created_at", -1)], {})],
+    "purge_jobs": [([("id", 1)], {}), ([("status", 1), ("created_at", 1)], {})],
+    "purge_tombstones": [([("job_id", 1), ("student_id", 1)], {"unique": True})],
+    SCORE_BUCKET_COLLECTION: [
+        ([("student_id", 1), ("semester", 1), ("quarter", 1)], {"unique": True}),
+        ([("weeks.week_id", 1)], {}),
+    ],
+    "student_insights": [
+        ([("student_id", 1), ("semester", 1), ("quarter", 1)], {"unique": True}),
+        # Insight search: equality on the tag (or not) and grade, then its (grade, class_name, full_name) order.
+        ([("semester", 1), ("quarter", 1), ("tags", 1), ("grade", 1), ("class_name", 1), ("full_name", 1)], {}),
+        ([("semester", 1), ("quarter", 1), ("grade", 1), ("class_name", 1), ("full_name", 1)], {}),
+        ([("stale", 1), ("student_id", 1)], {"partialFilterExpression": {"stale": True}}),
+    ],
+}
+
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"collection": "students", "filter": {"id": "x"}},
+    {"collection": "students", "filter": {"class_id": "x"}},
+    {"collection": "students", "filter": {"deletion_id": "x"}},
+    {"collection": "purge_tombstones", "filter": {"job_id": "x"}, "sort": {"student_id": 1}},
+    {"collection": "student_scores", "filter": {"student_id": "x", "week_id": "x"}},
+    {"collection": "student_scores", "filter": {"student_id": "x"}},
+    {"collection": "student_scores", "filter": {"student_id": {"$in": ["x"]}, "week_id": {"$in": ["x"]}}},
+    {"collection": "student_scores", "filter": {"week_id": {"$in": ["x"]}}},
+    {"collection": SCORE_BUCKET_COLLECTION, "filter": {"student_id": {"$in": ["x"]}, "weeks.week_id": {"$in": ["x"]}}},
+    {"collection": SCORE_BUCKET_COLLECTION, "filter": {"weeks.week_id": {"$in": ["x"]}}},
+    {"collection": "weeks", "filter": {"semester": 1, "quarter": 1}, "sort": {"number": 1}},
+    {"collection": "classes", "filter": {"id": "x"}},
+    {"collection": "classes", "filter": {"name_key": "x"}},
+    {"collection": "users", "filter": {"id": "x"}},
+    {"collection": "users", "filter": {"role_name": "Teacher"}},
+    {"collection": "users", "filter": {"assigned_class_ids": "x"}},
+    {"collection": "notification_logs", "filter": {}, "sort": {"created_at": -1, "id": -1}},
+    {"collection": "notification_logs", "filter": {"event_type": "x"}, "sort": {"created_at": -1, "id": -1}},
+    {"collection": "audit_logs", "filter": {"target_user_id": "x"}, "sort": {"timestamp": -1, "id": -1}},
+    {"collection": "remedial_plans", "filter": {}, "sort": {"created_at": -1}},
+    {"collection": "rewards", "filter": {}, "sort": {"created_at": -1}},
+    {"collection": "reward_events", "filter": {"student_id": "x"}, "sort": {"created_at": -1}},
+    {
+        "collection": "student_insights",
+        "filter": {"semester": 1, "quarter": 1, "tags": "x", "grade": 6},
+        "sort": {"grade": 1, "class_name": 1, "full_name": 1},
+    },
+    {
+        "collection": "student_insights",
+        "filter": {"semester": 1, "quarter": 1, "grade": 6},
+        "sort": {"grade": 1, "class_name": 1, "full_name": 1},
+    },
+    {"collection": "student_insights", "filter": {"student_id": {"$in": ["x"]}, "semester": 1, "quarter": 1}},
+    {"collection": "student_insights", "filter": {"stale": True, "student_id": {"$gt": "x"}}, "sort": {"student_id": 1}},
+    {"collection": "student_scores_archive", "filter": {"academic_year": "x", "student_id": {"$in": ["x"]}, "week_id": {"$in": ["x"]}}},
+    {"collection": "classes_archive", "filter": {"academic_year": "x", "grade": 6}},
+    {"collection": "students_archive", "filter": {"academic_year": "x", "class_id": {"$in": ["x"]}}},
+]
+
+
+async def ensure_indexes(collections: Optional[List[str]] = None):
+    for collection, specs in INDEX_SPECS.items():
+        if collections and collection not in collections:
+            continue
+        await db[collection].create_indexes([IndexModel(keys, **options) for keys, options in specs])
+
+
+async def migrate_dedupe_student_scores():
+    """Keep the most recently updated score per (student_id, week_id) so the unique index can be built."""
+    pipeline = [
+        {"$sort": {"updated_at": -1, "_id": -1}},
+        {"$group": {"_id": {"student_id": "$student_id", "week_id": "$week_id"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    duplicate_ids = []
+    async for group in db.student_scores.aggregate(pipeline, allowDiskUse=True):
+        duplicate_ids.extend(group["ids"][1:])
+    for i in range(0, len(duplicate_ids), 1000):
+        await db.student_scores.delete_many({"_id": {"$in": duplicate_ids[i:i + 1000]}})
+    if duplicate_ids:
+        logger.info("Removed %s duplicate student score documents", len(duplicate_ids))
+
+
+async def migrate_query_shape_indexes():
+    """The indexes of the query shapes at the time of this migration; later migrations change their own collections."""
+    # The non-unique (student_id, week_id) index has the same name as the unique one, and student_id alone is a
+    # prefix of it; drop both before creating the unique one.
+    existing = await db.student_scores.index_information()
+    for name in ("student_id_1_week_id_1", "student_id_1"):
+        if name in existing and not existing[name].get("unique"):
+            await db.student_scores.drop_index(name)
+    index_specs = {
+        "students": [([("id", 1)], {}), ([("class_id", 1)], {}), ([("full_name", 1), ("class_id", 1)], {})],
+        "student_scores": [([("week_id", 1)], {}), ([("student_id", 1), ("week_id", 1)], {"unique": True})],
+        "weeks": [([("id", 1)], {}), ([("semester", 1), ("quarter", 1), ("number", 1)], {})],
+        "classes": [([("id", 1)], {}), ([("name", 1)], {})],
+        "users": [([("id", 1)], {}), ([("role_name", 1)], {}), ([("assigned_class_ids", 1)], {})],
+        "notification_logs": [([("event_type", 1), ("created_at", -1)], {}), ([("created_at", -1)], {})],
+        "audit_logs": [([("target_user_id", 1), ("timestamp", -1)], {})],
+        "remedial_plans": [([("id", 1)], {}), ([("created_at", -1)], {})],
+        "rewards": [([("id", 1)], {}), ([("created_at", -1)], {})],
+        "reward_events": [([("student_id", 1), ("created_at", -1)], {})],
+    }
+    for collection, specs in index_specs.items():
+        await db[collection].create_indexes([IndexModel(keys, **options) for keys, options in specs])
+
+
+async def migrate_notification_log_pagination_ttl():
+    """Replace the notification indexes with cursor-friendly ones (id tie-breaker) and stamp expires_at on existing
+    action logs so the TTL index can remove them."""
+    existing = await db.notification_logs.index_information()
+    for name in ("event_type_1_created_at_-1", "created_at_-1"):
+        if name in existing:
+            await db.notification_logs.drop_index(name)
+    await ensure_indexes(["notification_logs"])
+    if ACTION_LOG_RETENTION_DAYS > 0:
+        await db.notification_logs.update_many(
+            {"event_type": {"$regex": "^action_"}, "expires_at": {"$exists": False}},
+            [{"$set": {"expires_at": {"$add": [
+                {"$dateFromString": {"dateString": "$created_at", "onError": "$$NOW"}},
+                ACTION_LOG_RETENTION_DAYS * 86400 * 1000,
+            ]}}}],
+        )
+
+
+async def migrate_audit_log_pagination_index():
+    """Add the id tie-breaker to the audit log index so profile pages can use a (timestamp, id) cursor."""
+    existing = await db.audit_logs.index_information()
+    if "target_user_id_1_timestamp_-1" in existing:
+        await db.audit_logs.drop_index("target_user_id_1_timestamp_-1")
+    await ensure_indexes(["audit_logs"])
+
+
+async def migrate_class_name_keys():
+    """Store name_key on every class and build its unique index. Classes that already duplicate an older one
+    (e.g. "5A" and "5 a") get "<key>#<id>" so the index can be built; they are logged for an admin to merge."""
+    seen = set()
+    operations = []
+    async for class_doc in db.classes.find({}, {"_id": 1, "id": 1, "name": 1}).sort("created_at", 1):
+        key = class_name_key(class_doc.get("name") or "") or class_doc.get("id")
+        if key in seen:
+            logger.warning("Class %s (%s) duplicates the name of another class", class_doc.get("name"), class_doc.get("id"))
+            key = f"{key}#{class_doc.get('id')}"
+        seen.add(key)
+        operations.append(UpdateOne({"_id": class_doc["_id"]}, {"$set": {"name_key": key}}))
+    if operations:
+        await db.classes.bulk_write(operations, ordered=False)
+    await ensure_indexes(["classes"])
+
+
+async def migrate_purge_job_indexes():
+    await ensure_indexes(["purge_jobs"])
+
+
+async def migrate_sync_student_class_names():
+    """Existing students may carry the name their class had before a rename; copy the current names once."""
+    await db.classes.update_many({}, {"$set": {"students_name_version": -1}})
+    await sync_class_names()
+
+
+async def migrate_academic_year():
+    """Stamp the active academic year on existing weeks and create the compressed archive collections."""
+    academic_year = await get_active_academic_year()
+    result = await db.weeks.update_many({"academic_year": None}, {"$set": {"academic_year": academic_year}})
+    if result.modified_count:
+        await publish_cache_invalidation("weeks")
+    await _ensure_archive_collections()
+
+
+async def migrate_student_insights():
+    """Build the insight tags of every student once; score writes keep them current afterwards."""
+    await ensure_indexes(["student_insights"])
+    student_ids = [s["id"] for s in await db.students.find({}, {"_id": 0, "id": 1}).to_list(None)]
+    await refresh_student_insights(student_ids)
+
+
+async def migrate_score_bucket_indexes():
+    await ensure_indexes([SCORE_BUCKET_COLLECTION])
+
+
+async def migrate_purge_tombstone_indexes():
+    await ensure_indexes(["students", "purge_tombstones"])
+
+
+async def migrate_insight_search_indexes():
+    """Replace the insight search index with ones that also serve its sort, with and without a tag."""
+    existing = await db.student_insights.index_information()
+    if "semester_1_quarter_1_tags_1_grade_1_class_id_1" in existing:
+        await db.student_insights.drop_index("semester_1_quarter_1_tags_1_grade_1_class_id_1")
+    await ensure_indexes(["student_insights"])
+
+
+async def migrate_insight_stale_index():
+    """Add student_id to the partial stale index so refresh_stale_insights can page through it."""
+    existing = await db.student_insights.index_information()
+    if "stale_1" in existing:
+        await db.student_insights.drop_index("stale_1")
+    await ensure_indexes(["student_insights"])
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage")] if plan.get("stage") else []
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+@api_router.get("/diagnostics/indexes")
+async def audit_query_indexes(current_user: Dict[str, Any] = Depends(require_admin)):
+    """Explain every registered query shape and flag those whose winning plan scans the whole collection."""
+    results = []
+    for shape in QUERY_SHAPES:
+        command: Dict[str, Any] = {"find": shape["collection"], "filter": shape["filter"]}
+        if shape.get("sort"):
+            command["sort"] = shape["sort"]
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        results.append({**shape, "stages": stages, "collscan": "COLLSCAN" in stages})
+    return {"collscans": sum(1 for item in results if item["collscan"]), "shapes": results}
+
+
+def _find_first(doc: Any, key: str) -> Any:
+    """Depth-first search for a key in an explain document (aggregate explains nest the find plan in stages)."""
+    if isinstance(doc, dict):
+        if key in doc:
+            return doc[key]
+        values = doc.values()
+    elif isinstance(doc, list):
+        values = doc
+    else:
+        return None
+    for value in values:
+        found = _find_first(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    stages = _plan_stages(_find_first(explain, "winningPlan") or {})
+    execution = _find_first(explain, "executionStats") or {}
+    docs_examined = execution.get("totalDocsExamined", 0)
+    returned = execution.get("nReturned", 0)
+    ratio = round(docs_examined / max(returned, 1), 1)
+    return {
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "docs_examined": docs_examined,
+        "keys_examined": execution.get("totalKeysExamined", 0),
+        "returned": returned,
+        "examined_ratio": ratio,
+        "inefficient": "COLLSCAN" in stages or (docs_examined >= 1000 and ratio >= MONGO_EXAMINED_RATIO_LIMIT),
+    }
+
+
+async def _explain_worker():
+    while True:
+        key, database, command = await _explain_queue.get()
+        try:
+            explain = await client[database].command({"explain": command, "verbosity": "executionStats"})
+            summary = summarize_explain(explain)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            summary = {"error": str(exc)}
+        with _slow_commands_lock:
+            if key in _slow_commands:
+                _slow_commands[key]["explain"] = summary
+        if summary.get("inefficient"):
+            logger.warning("Inefficient Mongo %s on %s.%s: %s", key[2], key[0], key[1], summary)
+
+
+_explain_task: Optional["asyncio.Task"] = None
+
+
+@app.on_event("startup")
+async def start_slow_command_explainer():
+    global _explain_queue, _explain_loop, _explain_task
+    _explain_loop = asyncio.get_running_loop()
+    _explain_queue = asyncio.Queue(maxsize=100)
+    _explain_task = asyncio.create_task(_explain_worker())
+
+
+@api_router.get("/diagnostics/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=MONGO_SLOW_SHAPES_MAX), current_user: Dict[str, Any] = Depends(require_admin)):
+    """Slowest command shapes seen by this worker, by total time, with their latest explain summary."""
+    with _slow_commands_lock:
+        entries = [dict(entry) for entry in _slow_commands.values()]
+    entries.sort(key=lambda e: e["total_ms"], reverse=True)
+    for entry in entries:
+        entry.pop("explained_at", None)
+        entry["total_ms"] = round(entry["total_ms"], 1)
+        entry["max_ms"] = round(entry["max_ms"], 1)
+        entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 1)
+    return {"worker_id": WORKER_ID, "threshold_ms": MONGO_SLOW_COMMAND_MS, "commands": entries[:limit]}
+
+
+@api_router.delete("/diagnostics/slow-queries")
+async def reset_slow_queries(current_user: Dict[str, Any] = Depends(require_admin)):
+    with _slow_commands_lock:
+        _slow_commands.clear()
+    return {"status": "ok"}
+
+
+@app.on_event("startup")
+async def warm_mongo_pool():
+    """Open minPoolSize connections up front so the first requests don't pay for TLS handshakes to Atlas."""
+    size = client.options.pool_options.min_pool_size
+    if size <= 0:
+        return
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client.admin.command("ping") for _ in range(size)), return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    logger.info("Warmed Mongo pool with %s connections in %.0fms (%s failed)", size, (time.perf_counter() - started) * 1000, failed)
+
+
+@api_router.get("/diagnostics/mongo-pool")
+async def get_mongo_pool(current_user: Dict[str, Any] = Depends(require_admin)):
+    """Pool settings, this worker's connection counters and the server's view of its connections."""
+    stats = dict(mongo_pool_monitor.stats)
+    stats["avg_checkout_wait_ms"] = round(stats.pop("checkout_wait_ms_total") / stats["checked_out"], 2) if stats["checked_out"] else 0.0
+    options = client.options.pool_options
+    result = {
+        "worker_id": WORKER_ID,
+        "config": {
+            "max_pool_size": options.max_pool_size,
+            "min_pool_size": options.min_pool_size,
+            "max_idle_time_ms": int(options.max_idle_time_seconds * 1000) if options.max_idle_time_seconds else None,
+            "compressors": MONGO_CLIENT_OPTIONS.get("compressors") or [c for c in MONGO_URL_OPTIONS.get("compressors", "").split(",") if c],
+            "analytics_read_preference": ANALYTICS_READ_PREFERENCE.document if ANALYTICS_READ_PREFERENCE else {"mode": "primary"},
+        },
+        "pool": stats,
+    }
+    try:
+        server_status = await client.admin.command("serverStatus")
+        result["server_connections"] = server_status.get("connections")
+        result["network"] = {k: server_status.get("network", {}).get(k) for k in ("bytesIn", "bytesOut", "compression")}
+    except Exception as exc:  # Atlas shared tiers don't allow serverStatus
+        result["server_connections"] = {"error": str(exc)}
+    return result
+
+
+SCHEMA_MIGRATIONS = [
+    ("0001_create_indexes", migrate_create_indexes),
+    ("0002_seed_default_records", migrate_seed_default_records),
+    ("0003_week_semester_quarter", migrate_week_semester_quarter),
+    ("0004_seed_default_weeks", migrate_seed_default_weeks),
+    ("0005_remove_sample_student", migrate_remove_sample_student),
+    ("0006_dedupe_student_scores", migrate_dedupe_student_scores),
+    ("0007_query_shape_indexes", migrate_query_shape_indexes),
+    ("0008_notification_log_pagination_ttl", migrate_notification_log_pagination_ttl),
+    ("0009_audit_log_pagination_index", migrate_audit_log_pagination_index),
+    ("0010_class_name_keys", migrate_class_name_keys),
+    ("0011_purge_job_indexes", migrate_purge_job_indexes),
+    ("0012_sync_student_class_names", migrate_sync_student_class_names),
+    ("0013_academic_year", migrate_academic_year),
+    ("0014_student_insights", migrate_student_insights),
+    ("0015_score_bucket_indexes", migrate_score_bucket_indexes),
+    ("0016_purge_tombstone_indexes", migrate_purge_tombstone_indexes),
+    ("0017_insight_search_indexes", migrate_insight_search_indexes),
+    ("0018_insight_stale_index", migrate_insight_stale_index),
+]
+
+
+async def _claim_migration(version: str) -> bool:
+    """Mark a migration as running for this worker. Another worker's claim is only taken over once it is stale."""
+    now = datetime.now(timezone.utc)
+    claim = {"status": "running", "owner": WORKER_ID, "started_at": now}
+    try:
+        await db.schema_migrations.insert_one({"_id": version, **claim})
+        return True
+    except DuplicateKeyError:
+        stale = await db.schema_migrations.find_one_and_update(
+            {"_id": version, "status": "running", "started_at": {"$lt": now - timedelta(minutes=MIGRATION_STALE_MINUTES)}},
+            {"$set": claim},
+        )
+        return stale is not None
+
+
+async def run_schema_migrations():
+    applied = set(await db.schema_migrations.distinct("_id", {"status": "applied"}))
+    pending = [(version, func) for version, func in SCHEMA_MIGRATIONS if version not in applied]
+    if not pending:
+        return
+    for version, func in pending:
+        # Migrations build on each other (0007's unique index needs 0006's de-duplication), so never skip ahead:
+        # the worker holding this claim goes on to apply the later ones in order.
+        if not await _claim_migration(version):
+            logger.info("Migration %s is being applied by another worker; leaving the rest to it", version)
+            break
+        started = time.perf_counter()
+        try:
+            await func()
+        except Exception:
+            await db.schema_migrations.delete_one({"_id": version, "owner": WORKER_ID})
+            raise
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        await db.schema_migrations.update_one(
+            {"_id": version},
+            {"$set": {"status": "applied", "applied_at": iso_now(), "duration_ms": duration_ms}},
+        )
+        logger.info("Applied migration %s in %sms", version, duration_ms)
+
+
 @app.on_event("startup")
 async def seed_defaults():
     try:
@@ -5070,116 +7679,203 @@ async def seed_defaults():
         return  # Don't proceed if connection fails
     
     try:
-        # Performance: ensure key indexes exist for frequent reads/writes.
-        await db.students.create_index([("id", 1)])
-        await db.students.create_index([("class_id", 1)])
-        await db.students.create_index([("full_name", 1), ("class_id", 1)])
-        await db.student_scores.create_index([("student_id", 1)])
-        await db.student_scores.create_index([("week_id", 1)])
-        await db.student_scores.create_index([("student_id", 1), ("week_id", 1)])
-        await db.weeks.create_index([("id", 1)])
-        await db.weeks.create_index([("semester", 1), ("quarter", 1), ("number", 1)])
-        await db.classes.create_index([("id", 1)])
-        await db.classes.create_index([("name", 1)])
-        await db.users.create_index([("id", 1)])
-        await db.users.create_index([("role_name", 1)])
-
-        if await db.classes.count_documents({}) == 0:
-            default_classes = []
-            for grade in range(4, 9):
-                for section in ["A", "B"]:
-                    name = f"{grade}{section}"
-                    default_classes.append(
-                        ClassRecord(name=name, grade=grade, section=section).model_dump()
-                    )
-            await db.classes.insert_many(default_classes)
-        if await db.roles.count_documents({}) == 0:
-            roles = [
-                RoleRecord(name="Admin", description="Full access", permissions=["all"]).model_dump(),
-                RoleRecord(
-                    name="Teacher",
-                    description="Manage classes and students",
-                    permissions=["students:view", "scores:edit", "remedial:manage", "reports:view", "timetable:manage"],
-                ).model_dump(),
-                RoleRecord(name="Counselor", description="Remedial and rewards", permissions=["remedial", "rewards", "reports"]).model_dump(),
-            ]
-            await db.roles.insert_many(roles)
-        await db.weeks.update_many({"semester": {"$exists": False}}, {"$set": {"semester": 1}})
-        # Migration: set quarter on existing weeks (1-9 -> Q1, 10-18 -> Q2) for full S1Q1/S1Q2/S2Q1/S2Q2 separation
-        async for doc in db.weeks.find({"$or": [{"quarter": {"$exists": False}}, {"quarter": {"$nin": [1, 2]}}]}, {"_id": 1, "number": 1}):
-            q = 1 if (doc.get("number", 1) <= 9) else 2
-            await db.weeks.update_one({"_id": doc["_id"]}, {"$set": {"quarter": q}})
-        existing_weeks = await db.weeks.find({}, {"_id": 0, "number": 1, "semester": 1, "quarter": 1}).to_list(500)
-        existing_map = {}
-        for week in existing_weeks:
-            sem = week.get("semester", 1)
-            q = week.get("quarter", 1 if week.get("number", 1) <= 9 else 2)
-            existing_map.setdefault((sem, q), set()).add(week.get("number"))
-        weeks_to_insert = []
-        for semester in [1, 2]:
-            for quarter in [1, 2]:
-                lo, hi = (1, 9) if quarter == 1 else (10, 18)
-                existing_numbers = existing_map.get((semester, quarter), set())
-                for i in range(lo, hi + 1):
-                    if i not in existing_numbers:
-                        weeks_to_insert.append(
-                            WeekRecord(semester=semester, quarter=quarter, number=i, label=f"Week {i}").model_dump()
-                        )
-        if weeks_to_insert:
-            await db.weeks.insert_many(weeks_to_insert)
-        if await db.users.count_documents({}) == 0:
-            admin_role = await db.roles.find_one({"name": "Admin"}, {"_id": 0})
-            if admin_role:
-                admin_user = UserRecord(
-                    name="Administrator",
-                    email="admin@school.local",
-                    username="admin",
-                    role_id=admin_role["id"],
-                    role_name=admin_role["name"],
-                    active=True,
-                    permissions=admin_role.get("permissions", []),
-                    password_hash=get_password_hash("Admin@123"),
-                )
-                await db.users.insert_one(admin_user.model_dump())
-        admin_user = await db.users.find_one({"role_name": "Admin"}, {"_id": 0})
-        if admin_user:
-            updates = {}
-            if not admin_user.get("username"):
-                updates["username"] = "admin"
-            if not admin_user.get("password_hash"):
-                updates["password_hash"] = get_password_hash("Admin@123")
-            if updates:
-                await db.users.update_one({"id": admin_user["id"]}, {"$set": updates})
-        # Remove legacy sample student "Sara Ali" (4A) if present – was never a real student
-        sample_students = await db.students.find(
-            {"full_name": "Sara Ali", "class_name": "4A"}, {"_id": 0, "id": 1}
-        ).to_list(10)
-        for s in sample_students:
-            sid = s.get("id")
-            if sid:
-                await db.student_scores.delete_many({"student_id": sid})
-                await db.students.delete_one({"id": sid})
-                logger.info("Removed legacy sample student Sara Ali (4A)")
+        school_ids = await list_school_ids()
     except Exception as e:
-        logger.error(f"Error during database seeding: {e}")
-        logger.warning("Continuing without seeding defaults. Some features may not work correctly.")
+        logger.error(f"Could not read the schools registry: {e}")
+        school_ids = [DEFAULT_SCHOOL_ID]
+    for school_id in school_ids:
+        try:
+            with school_context(school_id):
+                await run_schema_migrations()
+        except Exception as e:
+            logger.error(f"Error during database seeding for school {school_id}: {e}")
+            logger.warning("Continuing without seeding defaults. Some features may not work correctly.")
+
+
+async def require_platform_admin(current_user: Dict[str, Any] = Depends(require_admin)):
+    """Admins of the default school manage the schools registry."""
+    if current_school_id() != DEFAULT_SCHOOL_ID:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Platform admin access required")
+    return current_user
+
+
+@api_router.get("/schools")
+async def list_schools(current_user: Dict[str, Any] = Depends(require_platform_admin)):
+    schools = await root_db.schools.find({}).sort("_id", 1).to_list(None)
+    default = {"id": DEFAULT_SCHOOL_ID, "name": "Default", "db_name": tenant_db_name(DEFAULT_SCHOOL_ID)}
+    return [default] + [{"id": s.pop("_id"), **s} for s in schools if s["_id"] != DEFAULT_SCHOOL_ID]
+
+
+@api_router.post("/schools")
+async def create_school(payload: SchoolCreate, current_user: Dict[str, Any] = Depends(require_platform_admin)):
+    """Register a school and run the migrations on its database (indexes, default classes/roles/admin, weeks)."""
+    school_id = payload.id.strip().lower()
+    if not SCHOOL_ID_PATTERN.match(school_id) or school_id == DEFAULT_SCHOOL_ID:
+        raise HTTPException(status_code=400, detail="School id must be 1-20 lowercase letters, digits, '-' or '_'")
+    school = {"_id": school_id, "name": payload.name.strip(), "db_name": tenant_db_name(school_id), "created_at": iso_now()}
+    try:
+        await root_db.schools.insert_one(school)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="School already exists")
+    with school_context(school_id):
+        await run_schema_migrations()
+    await log_user_action(current_user, "school_create", f"Created school {school['name']} ({school_id})")
+    return {"id": school.pop("_id"), **school}
+
+
+@api_router.delete("/schools/{school_id}")
+async def delete_school(school_id: str, current_user: Dict[str, Any] = Depends(require_platform_admin)):
+    """Unregister a school and drop its database."""
+    if school_id == DEFAULT_SCHOOL_ID:
+        raise HTTPException(status_code=400, detail="The default school cannot be deleted")
+    result = await root_db.schools.delete_one({"_id": school_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="School not found")
+    await client.drop_database(tenant_db_name(school_id))
+    _tenant_databases.pop((school_id, False), None)
+    _tenant_databases.pop((school_id, True), None)
+    await log_user_action(current_user, "school_delete", f"Deleted school {school_id}")
+    return {"status": "deleted"}
 
 
 app.include_router(auth_router)
 app.include_router(api_router)
 
+# Requests slower than this are logged with their route and query string.
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS") or 1000)
+# Admins may send "X-Profile: 1" to get a pyinstrument HTML profile instead of the response (needs pyinstrument).
+REQUEST_PROFILING_ENABLED = (os.environ.get("REQUEST_PROFILING_ENABLED") or "").strip().lower() in ("1", "true", "yes")
+
+
+def _is_admin_token(headers: Dict[str, str]) -> bool:
+    auth = headers.get("authorization", "")
+    secret = os.environ.get("JWT_SECRET")
+    if not auth.lower().startswith("bearer ") or not secret:
+        return False
+    try:
+        payload = jwt.decode(auth[7:], secret, algorithms=["HS256"])
+    except Exception:
+        return False
+    return payload.get("role") == "Admin"
+
+
+class RequestProfilingMiddleware:
+    """Pure ASGI middleware: wall time, Mongo time and command count, event-loop CPU time and response size per
+    request, sent as a Server-Timing header. CPU is thread time of the loop thread, so it includes other requests
+    interleaved with this one."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        if REQUEST_PROFILING_ENABLED and headers.get("x-profile") == "1" and _PYINSTRUMENT_AVAILABLE and _is_admin_token(headers):
+            await self._profile(scope, receive, send)
+            return
+        stats = {"mongo_ms": 0.0, "mongo_commands": 0, "bytes": 0, "request_bytes": 0, "status": None}
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                stats["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                stats["status"] = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                cpu_ms = (time.thread_time() - cpu_started) * 1000
+                timing = (
+                    f'app;dur={elapsed_ms:.1f}, db;dur={stats["mongo_ms"]:.1f};desc="{stats["mongo_commands"]} commands", '
+                    f"cpu;dur={cpu_ms:.1f}"
+                )
+                message.setdefault("headers", []).append((b"server-timing", timing.encode("latin-1")))
+            elif message["type"] == "http.response.body":
+                stats["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # Route template, not the raw path, so ids do not explode the label set.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe((scope["method"], route, str(stats["status"] or 500)), elapsed_ms / 1000)
+            HTTP_RESPONSE_SIZE.observe((route,), stats["bytes"])
+            if stats["request_bytes"]:
+                HTTP_REQUEST_SIZE.observe((route,), stats["request_bytes"])
+            if elapsed_ms >= SLOW_REQUEST_MS:
+                endpoint = scope.get("endpoint")
+                logger.warning(
+                    "Slow request %s %s (%s) query=%r status=%s %.0fms db=%.0fms/%d cpu=%.0fms bytes=%d",
+                    scope["method"],
+                    scope["path"],
+                    getattr(endpoint, "__name__", "-"),
+                    scope.get("query_string", b"").decode("latin-1"),
+                    stats["status"],
+                    elapsed_ms,
+                    stats["mongo_ms"],
+                    stats["mongo_commands"],
+                    (time.thread_time() - cpu_started) * 1000,
+                    stats["bytes"],
+                )
+
+    async def _profile(self, scope, receive, send):
+        profiler = Profiler(async_mode="enabled")
+
+        async def discard(message):
+            pass
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        body = profiler.output_html().encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/html; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
 _cors_origins_raw = os.environ.get("CORS_ORIGINS", "*").strip()
 _cors_origins = [o.strip() for o in _cors_origins_raw.split(",") if o.strip()] if _cors_origins_raw else ["*"]
+app.add_middleware(RequestProfilingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=_cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await stop_cache_bus()
+    if _event_loop_lag_task is not None:
+        _event_loop_lag_task.cancel()
+    if _explain_task is not None:
+        _explain_task.cancel()
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    try:
+        await release_scheduler_lease()
+    except Exception as exc:
+        logger.warning("Scheduler lease release failed: %s", exc)
+    if _report_render_pool is not None:
+        _report_render_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
\ No newline at end of file
@@ -93,7 +93,7 @@ export const AppShell = ({
 
   const loadNotifications = async () => {
     try {
-      const response = await api.get("/notifications");
+      const response = await api.get("/notifications", { params: { limit: 5 } });
       setNotifications(response.data.slice(0, 5));
     } catch (error) {
       setNotifications([]);
@@ -323,6 +323,7 @@ export const translations = {
     sync_calendar: "Sync Calendar",
     last_sync: "Last sync",
     audit_log: "Audit Log",
+    load_more: "Load more",
     edited_by: "Edited by",
     action_log: "Action",
     event_date: "Date",
@@ -666,6 +667,7 @@ export const translations = {
     sync_calendar: "تحديث التقويم",
     last_sync: "آخر تحديث",
     audit_log: "سجل التعديلات",
+    load_more: "عرض المزيد",
     edited_by: "تم التعديل بواسطة",
     action_log: "الإجراء",
     event_date: "التاريخ",
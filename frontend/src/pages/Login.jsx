@@ -11,6 +11,8 @@ import { toast } from "sonner";
 import { SocialLinks } from "@/components/SocialLinks";
 
 const GOOGLE_CLIENT_ID = process.env.REACT_APP_GOOGLE_CLIENT_ID || "";
+// Multi-school deployments: /login?school=<id> signs in to that school; omitted = default school.
+const SCHOOL_ID = new URLSearchParams(window.location.search).get("school") || undefined;
 
 export default function Login({
   language = "en",
@@ -65,7 +67,7 @@ export default function Login({
       if (!credential) return;
       setIsGoogleLoading(true);
       try {
-        const response = await api.post("auth/google", { id_token: credential });
+        const response = await api.post("auth/google", { id_token: credential, school_id: SCHOOL_ID });
         sessionStorage.setItem("auth_token", response.data.access_token);
         onLogin?.(response.data.access_token);
         navigate("/");
@@ -144,14 +146,14 @@ export default function Login({
     try {
       let response;
       try {
-        response = await api.post("/auth/login", form);
+        response = await api.post("/auth/login", { ...form, school_id: SCHOOL_ID });
       } catch (error) {
         const isNetwork = !error.response;
         if (isNetwork && isProductionBackendUrl) {
           toast.info("Waking the server and retrying login automatically...");
           const isReady = await waitForBackendReady();
           if (isReady) {
-            response = await api.post("/auth/login", form);
+            response = await api.post("/auth/login", { ...form, school_id: SCHOOL_ID });
           } else {
             throw error;
           }
@@ -155,6 +155,8 @@ export default function Reports() {
       await api.post("/reports/settings", {
         grade: Number(grade),
         report_type: reportType,
+        semester: semesterNumber,
+        quarter,
       });
       toast.success(t("schedule_success"));
     } catch (error) {
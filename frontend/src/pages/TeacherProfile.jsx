@@ -110,6 +110,21 @@ export default function TeacherProfile() {
     }
   };
 
+  const loadMoreAudit = async () => {
+    const cursor = teacherData?.audit_next_cursor;
+    if (!cursor) return;
+    try {
+      const response = await api.get(`/users/${teacherId}/audit`, { params: { limit: 20, cursor } });
+      setTeacherData((prev) => ({
+        ...prev,
+        audit_logs: [...(prev.audit_logs || []), ...(response.data || [])],
+        audit_next_cursor: response.headers["x-next-cursor"] || null,
+      }));
+    } catch (error) {
+      toast.error(getApiErrorMessage(error) || t("teacher_profile_failed"));
+    }
+  };
+
   useEffect(() => {
     const onVisibility = () => {
       if (document.visibilityState === "visible" && teacherId) loadData();
@@ -149,7 +164,7 @@ export default function TeacherProfile() {
 
   if (!teacherData) return null;
 
-  const { teacher, class_performance, audit_logs } = teacherData;
+  const { teacher, class_performance, audit_logs, audit_next_cursor } = teacherData;
 
   return (
     <div className="space-y-6" data-testid="teacher-profile-page">
@@ -310,6 +325,11 @@ export default function TeacherProfile() {
               {t("no_data")}
             </p>
           )}
+          {audit_next_cursor && (
+            <Button variant="outline" size="sm" onClick={loadMoreAudit} data-testid="audit-load-more">
+              {t("load_more")}
+            </Button>
+          )}
         </CardContent>
       </Card>
     </div>
@@ -0,0 +1,66 @@
+"""
+Backend tests run against a real mongod (TEST_MONGO_URL, default mongodb://localhost:27017), each in its own
+throwaway database, and are skipped when none is reachable or backend/requirements.txt is not installed.
+"""
+import importlib.util
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="session")
+def mongo_url() -> str:
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip(f"no mongod reachable at {TEST_MONGO_URL}")
+    finally:
+        client.close()
+    return TEST_MONGO_URL
+
+
+@pytest.fixture
+def test_db_name(mongo_url):
+    """A fresh DB_NAME; the database and its per-school databases are dropped afterwards."""
+    import pymongo
+
+    name = f"school_db_test_{uuid.uuid4().hex[:8]}"
+    yield name
+    client = pymongo.MongoClient(mongo_url)
+    for database in client.list_database_names():
+        if database == name or database.startswith(f"{name}__"):
+            client.drop_database(database)
+    client.close()
+
+
+@pytest.fixture
+def load_server(mongo_url, test_db_name, monkeypatch):
+    """Import backend/server.py as a new module per call, i.e. one more API instance (own caches, own Mongo
+    client, own WORKER_ID) against the test database."""
+    for package in ("fastapi", "motor", "pandas"):
+        pytest.importorskip(package)
+    monkeypatch.setenv("MONGO_URL", mongo_url)
+    monkeypatch.setenv("DB_NAME", test_db_name)
+    monkeypatch.setenv("JWT_SECRET", "test-secret")
+    monkeypatch.syspath_prepend(str(BACKEND_DIR))
+    loaded = []
+
+    def load(module_name: str = "server"):
+        spec = importlib.util.spec_from_file_location(f"{module_name}_{uuid.uuid4().hex[:6]}", BACKEND_DIR / "server.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        loaded.append(module)
+        return module
+
+    yield load
+    for module in loaded:
+        module.client.close()
+        sys.modules.pop(module.__name__, None)
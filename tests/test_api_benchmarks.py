@@ -0,0 +1,86 @@
+"""
+The benchmark_suite.py scenarios as pytest-benchmark tests: a synthetic school in a throwaway database, each endpoint
+driven in-process through httpx.ASGITransport.
+
+  python -m pytest tests/test_api_benchmarks.py --benchmark-json benchmark_results/<commit>.json
+  python -m pytest tests/test_api_benchmarks.py --benchmark-compare   # against the last --benchmark-autosave run
+
+BENCH_CLASSES / BENCH_STUDENTS (default 10 x 20) size the school and BENCH_ROUNDS (default 5) sets the timed
+requests per scenario. Skipped without a reachable mongod, pytest-benchmark or httpx.
+"""
+import asyncio
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+httpx = pytest.importorskip("httpx")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+BENCH_CLASSES = int(os.environ.get("BENCH_CLASSES") or 10)
+BENCH_STUDENTS = int(os.environ.get("BENCH_STUDENTS") or 20)
+BENCH_ROUNDS = int(os.environ.get("BENCH_ROUNDS") or 5)
+# Same order as benchmark_suite.build_scenarios; the fixture fails if they drift apart.
+SCENARIO_NAMES = [
+    "students_by_week",
+    "students_by_class_week",
+    "analytics_overview",
+    "classes_summary",
+    "grade_report",
+    "missed_assessments",
+    "bulk_scores",
+    "import_excel",
+    "export_students_excel",
+    "export_grade_report_pdf",
+    "export_grade_report_excel",
+    "export_analytics_summary_pdf",
+    "export_classes_summary_excel",
+]
+
+
+@pytest.fixture(scope="module")
+def bench(mongo_url):
+    """(event loop, http client, scenarios by name) for a freshly generated school."""
+    for package in ("fastapi", "motor", "pandas"):
+        pytest.importorskip(package)
+    db_name = f"school_db_bench_{uuid.uuid4().hex[:8]}"
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("BENCH_MONGO_URL", mongo_url)
+        patch.setenv("BENCH_DB_NAME", db_name)
+        # benchmark_suite points MONGO_URL / DB_NAME at the BENCH_ values on import; restored afterwards.
+        patch.setenv("MONGO_URL", mongo_url)
+        patch.setenv("DB_NAME", db_name)
+        patch.syspath_prepend(str(BACKEND_DIR))
+        import benchmark_suite
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(benchmark_suite.generate(BENCH_CLASSES, BENCH_STUDENTS, seed=7))
+        token, scenarios = loop.run_until_complete(benchmark_suite.build_scenarios())
+        assert [name for name, *_ in scenarios] == SCENARIO_NAMES
+        http = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=benchmark_suite.server.app),
+            base_url="http://bench",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=600,
+        )
+        yield loop, http, {name: (method, url, kwargs) for name, method, url, kwargs in scenarios}
+        loop.run_until_complete(http.aclose())
+        loop.run_until_complete(benchmark_suite.server.client.drop_database(db_name))
+        loop.close()
+
+
+@pytest.mark.parametrize("name", SCENARIO_NAMES)
+def test_scenario(benchmark, bench, name):
+    loop, http, scenarios = bench
+    method, url, kwargs = scenarios[name]
+    benchmark.group = "api"
+    benchmark.extra_info["url"] = url
+    response = benchmark.pedantic(
+        lambda: loop.run_until_complete(http.request(method, url, **kwargs)),
+        rounds=BENCH_ROUNDS,
+        warmup_rounds=1,  # the first request warms caches and connections
+    )
+    assert response.status_code == 200, response.text[:200]
+    benchmark.extra_info["bytes"] = len(response.content)
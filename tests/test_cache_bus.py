@@ -0,0 +1,38 @@
+"""Cache invalidations published by one API instance reach the other instances through the cache_invalidations bus."""
+import asyncio
+import time
+
+
+async def _wait_for_miss(server, namespace: str, key: str, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.cache_get(namespace, key) is None:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+def test_invalidation_reaches_other_instance(load_server):
+    first, second = load_server("server_a"), load_server("server_b")
+    assert first.WORKER_ID != second.WORKER_ID
+
+    async def scenario():
+        await first.start_cache_bus()
+        await second.start_cache_bus()
+        try:
+            await asyncio.sleep(0.5)  # let both listeners open their cursors
+            for server in (first, second):
+                server.cache_set("weeks", "all", ["cached"])
+                server.cache_set("weeks", "archive:2024-2025", ["kept"])
+            await first.publish_cache_invalidation("weeks", "all")
+            assert first.cache_get("weeks", "all") is None
+            assert await _wait_for_miss(second, "weeks", "all")
+            assert second.cache_get("weeks", "archive:2024-2025") == ["kept"]
+
+            await second.publish_cache_invalidation("weeks")
+            assert await _wait_for_miss(first, "weeks", "archive:2024-2025")
+        finally:
+            await first.stop_cache_bus()
+            await second.stop_cache_bus()
+
+    asyncio.run(scenario())
@@ -0,0 +1,15 @@
+"""Every registered query shape is answered from an index once the schema migrations have run."""
+import asyncio
+
+
+def test_query_shapes_avoid_collscan(load_server):
+    server = load_server()
+
+    async def scenario():
+        await server.run_schema_migrations()
+        return await server.audit_query_indexes(current_user={})
+
+    report = asyncio.run(scenario())
+    assert len(report["shapes"]) == len(server.QUERY_SHAPES)
+    collscans = [(shape["collection"], shape["filter"], shape["stages"]) for shape in report["shapes"] if shape["collscan"]]
+    assert not collscans, f"query shapes without an index: {collscans}"